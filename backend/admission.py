@@ -0,0 +1,185 @@
+"""
+Admission control for expensive endpoints.
+
+Heavy routes (calendar expansion, budget summaries) draw from a shared
+capacity measured in cost units. A request that does not fit waits in a
+bounded FIFO queue for up to ADMISSION_QUEUE_TIMEOUT seconds; each user may
+only have a few such requests admitted or queued at once. When limits are
+hit the request is shed straight away with a Retry-After header:
+
+- 429 when the user already has ADMISSION_PER_USER_LIMIT requests in flight
+- 503 when the queue is full or the wait times out
+
+Admission runs before authentication touches the database, so queued
+requests do not hold pool connections. Limits apply per worker process.
+"""
+
+from collections import deque
+from typing import Annotated
+import asyncio
+import math
+import os
+
+from fastapi import Depends, HTTPException, status
+
+from auth import oauth2_scheme, get_token_subject
+
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "16"))
+ADMISSION_PER_USER_LIMIT = int(os.getenv("ADMISSION_PER_USER_LIMIT", "4"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+
+
+class AdmissionController:
+    """Cost-weighted concurrency limiter with per-user caps and a bounded queue."""
+
+    def __init__(
+        self,
+        capacity: int = ADMISSION_CAPACITY,
+        per_user_limit: int = ADMISSION_PER_USER_LIMIT,
+        queue_size: int = ADMISSION_QUEUE_SIZE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT
+    ):
+        self.capacity = capacity
+        self.per_user_limit = per_user_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+
+        self._in_use = 0
+        self._waiters: deque = deque()
+        self._user_in_flight: dict[str, int] = {}
+
+        self.admitted = 0
+        self.queued = 0
+        self.shed_user_limit = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    def _shed(self, status_code: int, detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+    async def acquire(self, user_key: str, cost: int = 1) -> None:
+        """Wait for capacity or raise HTTPException when the request is shed."""
+        cost = min(cost, self.capacity)
+
+        if self._user_in_flight.get(user_key, 0) >= self.per_user_limit:
+            self.shed_user_limit += 1
+            raise self._shed(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many concurrent requests, please retry shortly",
+                1
+            )
+        self._user_in_flight[user_key] = self._user_in_flight.get(user_key, 0) + 1
+
+        try:
+            if not self._waiters and self._in_use + cost <= self.capacity:
+                self._in_use += cost
+                self.admitted += 1
+                return
+
+            if len(self._waiters) >= self.queue_size:
+                self.shed_queue_full += 1
+                raise self._shed(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "Server is busy, please retry shortly",
+                    self.queue_timeout
+                )
+
+            waiter = (asyncio.get_running_loop().create_future(), cost)
+            self._waiters.append(waiter)
+            self.queued += 1
+            try:
+                # Not wait_for: on Python 3.11 it swallows a cancellation
+                # that arrives once the slot is granted
+                done, _ = await asyncio.wait({waiter[0]}, timeout=self.queue_timeout)
+            except BaseException:
+                # Client went away while queued; hand back a slot granted meanwhile
+                if waiter[0].done():
+                    self._in_use -= cost
+                    self._wake()
+                else:
+                    self._waiters.remove(waiter)
+                    waiter[0].cancel()
+                raise
+            if not done:
+                self._waiters.remove(waiter)
+                waiter[0].cancel()
+                self.shed_timeout += 1
+                raise self._shed(
+                    status.HTTP_503_SERVICE_UNAVAILABLE,
+                    "Server is busy, please retry shortly",
+                    self.queue_timeout
+                )
+            self.admitted += 1
+        except BaseException:
+            self._release_user(user_key)
+            raise
+
+    def release(self, user_key: str, cost: int = 1) -> None:
+        self._in_use -= min(cost, self.capacity)
+        self._release_user(user_key)
+        self._wake()
+
+    def _release_user(self, user_key: str) -> None:
+        remaining = self._user_in_flight.get(user_key, 0) - 1
+        if remaining > 0:
+            self._user_in_flight[user_key] = remaining
+        else:
+            self._user_in_flight.pop(user_key, None)
+
+    def _wake(self) -> None:
+        # Grant capacity to waiters in FIFO order while it fits
+        while self._waiters and self._in_use + self._waiters[0][1] <= self.capacity:
+            future, cost = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_use += cost
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self._in_use,
+            "queue_depth": len(self._waiters),
+            "queue_size": self.queue_size,
+            "queue_timeout": self.queue_timeout,
+            "per_user_limit": self.per_user_limit,
+            "users_in_flight": len(self._user_in_flight),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_user_limit": self.shed_user_limit,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+controller = AdmissionController()
+
+
+def admission(cost: int = 1):
+    """
+    Route dependency admitting the request through the shared controller.
+
+    Use it in the route decorator's `dependencies` so it runs before the
+    other dependencies open a database session.
+    """
+    async def admit(token: Annotated[str, Depends(oauth2_scheme)]):
+        user_key = get_token_subject(token)
+        if user_key is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+
+        await controller.acquire(user_key, cost)
+        try:
+            yield
+        finally:
+            controller.release(user_key, cost)
+
+    return admit
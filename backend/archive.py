@@ -0,0 +1,332 @@
+"""
+Archival of closed transaction history.
+
+Every calendar and summary request reads all of a user's incomes, expenses
+and savings, and those tables only ever grow. Archival keeps them bounded:
+rows that can no longer produce an occurrence on or after a cutoff (one-off
+rows dated before it, recurring rules that ended before it) are moved to
+incomes_archive, expenses_archive and savings_archive, after every month
+before the cutoff has been given an immutable calendar and summary snapshot
+in month_snapshots. Requests for those months are served from the
+snapshots; later months only need the hot rows, which still hold every
+open recurring rule.
+
+Archived rows stay visible through the API: the list endpoints include
+them, and reading, editing or deleting one by id works as before (a row
+that is edited or deleted is moved back to its hot table first). A write
+that touches an archived month drops the snapshots it affects, and those
+months are computed from hot and archived rows together until the next run
+snapshots them again.
+
+Run it periodically, e.g. nightly from cron:
+
+    python archive.py                # every active user
+    python archive.py --user-id 42   # one user
+    python archive.py --months 12    # archive history older than 12 months
+"""
+
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from typing import Iterable, Optional
+import argparse
+import json
+import logging
+import os
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import and_, insert, literal, or_, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, select, delete
+
+from budget import build_budget_summary, build_calendar
+from models import (
+    User, Income, Expense, Saving, RecurrenceType, DataVersion, ArchiveState, MonthSnapshot,
+    income_archive, expense_archive, saving_archive
+)
+from queries import fetch_history, CALENDAR_COLUMNS
+from view_store import conflict_insert, ensure_data_version, VIEW_CALENDAR, VIEW_SUMMARY
+
+logger = logging.getLogger("nassets.archive")
+
+# History older than this many whole months is archived
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+
+ARCHIVE_TABLES = {
+    Income: income_archive,
+    Expense: expense_archive,
+    Saving: saving_archive,
+}
+
+VIEW_BUILDERS = {
+    VIEW_CALENDAR: build_calendar,
+    VIEW_SUMMARY: build_budget_summary,
+}
+
+
+def archive_cutoff(months: int = ARCHIVE_AFTER_MONTHS, today: Optional[date] = None) -> date:
+    """First day of the month `months` months before today's."""
+    today = today or date.today()
+    return (today - relativedelta(months=months)).replace(day=1)
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+def _is_archived(archived_before: Optional[date], year: int, month: int) -> bool:
+    return (
+        archived_before is not None
+        and _month_index(year, month) < _month_index(archived_before.year, archived_before.month)
+    )
+
+
+def get_archived_before(session: Session, user_id: int) -> Optional[date]:
+    """The user's archive cutoff, or None if nothing was archived yet."""
+    statement = select(ArchiveState.archived_before).where(ArchiveState.user_id == user_id)
+    return session.exec(statement).first()
+
+
+# Reads
+def archived_view(
+    session: Session, user_id: int, view: str, year: int, month: int, data_version: Optional[int] = None
+) -> Optional[dict]:
+    """
+    The calendar or summary payload of an archived month, or None if the
+    month is not archived and should be computed from the hot tables.
+    
+    An archived month without a snapshot (no rows that early, or dropped by
+    a write) is computed from hot and archived rows. Given the data version
+    read before the rows, that payload is stored as the month's snapshot,
+    so later requests read it instead of recomputing it every time.
+    """
+    statement = (
+        select(ArchiveState.archived_before, MonthSnapshot.payload)
+        .outerjoin(MonthSnapshot, and_(
+            MonthSnapshot.user_id == ArchiveState.user_id,
+            MonthSnapshot.view == view,
+            MonthSnapshot.year == year,
+            MonthSnapshot.month == month
+        ))
+        .where(ArchiveState.user_id == user_id)
+    )
+    state = session.exec(statement).first()
+    if state is None or not _is_archived(state.archived_before, year, month):
+        return None
+    if state.payload is not None:
+        return state.payload
+
+    rows = fetch_history(session, [user_id], CALENDAR_COLUMNS)
+    payload = jsonable_encoder(VIEW_BUILDERS[view](rows["income"], rows["expense"], rows["saving"], year, month))
+    if data_version is not None:
+        _save_snapshot(session, user_id, view, year, month, payload, data_version)
+    return payload
+
+
+def _save_snapshot(
+    session: Session, user_id: int, view: str, year: int, month: int, payload: dict, data_version: int
+) -> None:
+    """
+    Store and commit a snapshot computed by a read, unless the user has
+    written since data_version: the rows it was computed from may then be
+    stale, and the write may already have dropped the month's snapshots.
+    The version row is share-locked, so a write still in progress is
+    waited for. Failures are only logged; the read has its payload anyway.
+    """
+    snapshot = MonthSnapshot.__table__
+    current = (
+        select(
+            literal(user_id), literal(view), literal(year), literal(month),
+            literal(payload, snapshot.c.payload.type), literal(datetime.utcnow(), snapshot.c.created_at.type)
+        )
+        .where(DataVersion.user_id == user_id, DataVersion.version == data_version)
+        .with_for_update(read=True)
+    )
+    try:
+        session.execute(
+            conflict_insert(session, snapshot)
+            .from_select(["user_id", "view", "year", "month", "payload", "created_at"], current)
+            .on_conflict_do_nothing(index_elements=["user_id", "view", "year", "month"])
+        )
+        session.commit()
+    except SQLAlchemyError as error:
+        session.rollback()
+        logger.warning("Could not save the %s snapshot of %d-%02d for user %d: %s", view, year, month, user_id, error)
+
+
+def _from_archive(model, row):
+    values = dict(row._mapping)
+    values.pop("archived_at")
+    return model(**values)
+
+
+def find_archived(session: Session, model, row_id: int, user_id: int):
+    """A detached instance of an archived row, or None."""
+    archive = ARCHIVE_TABLES[model]
+    statement = select(archive).where(archive.c.id == row_id, archive.c.user_id == user_id)
+    row = session.execute(statement).first()
+    return _from_archive(model, row) if row is not None else None
+
+
+def archived_rows(session: Session, model, user_id: int) -> list:
+    """Detached instances of all of the user's archived rows of a kind."""
+    archive = ARCHIVE_TABLES[model]
+    statement = select(archive).where(archive.c.user_id == user_id).order_by(archive.c.id)
+    return [_from_archive(model, row) for row in session.execute(statement)]
+
+
+def get_transaction(session: Session, model, row_id: int, user_id: int, restore: bool = False):
+    """
+    An income, expense or saving by id, hot or archived. With `restore`, an
+    archived row is moved back to its hot table so it can be modified or
+    deleted like any other.
+    """
+    row = session.get(model, (row_id, user_id))
+    if row is not None:
+        return row
+
+    row = find_archived(session, model, row_id, user_id)
+    if row is not None and restore:
+        archive = ARCHIVE_TABLES[model]
+        session.execute(archive.delete().where(archive.c.id == row_id, archive.c.user_id == user_id))
+        session.add(row)
+        session.flush()
+    return row
+
+
+# Writes
+def invalidate_snapshots(
+    session: Session,
+    user_id: int,
+    dates: Iterable[Optional[date]],
+    recurring: bool = False
+) -> None:
+    """
+    Drop the snapshots a write changes: the months of the given dates, or
+    every month from the earliest of them on for a recurring row. Call
+    before committing the write.
+    """
+    months = {_month_index(d.year, d.month) for d in dates if d is not None}
+    if not months:
+        return
+
+    month_index = MonthSnapshot.year * 12 + MonthSnapshot.month - 1
+    affected = month_index >= min(months) if recurring else month_index.in_(sorted(months))
+    session.exec(delete(MonthSnapshot).where(MonthSnapshot.user_id == user_id, affected))
+
+
+def detach_archived_savings(session: Session, asset_id: int) -> None:
+    """Unlink archived savings from a deleted asset, as happens to hot ones."""
+    session.execute(
+        update(saving_archive).where(saving_archive.c.asset_id == asset_id).values(asset_id=None)
+    )
+
+
+def _months(start: date, end: date) -> Iterable[tuple[int, int]]:
+    """(year, month) from start's month up to, not including, end's month."""
+    current = start.replace(day=1)
+    while current < end:
+        yield current.year, current.month
+        current += relativedelta(months=1)
+
+
+def _lock_user_writes(session: Session, user_id: int) -> None:
+    """
+    Hold the user's data version row until commit. Every write bumps it, so
+    on PostgreSQL no write can land between snapshotting and moving rows.
+    """
+    ensure_data_version(session, user_id)
+    session.exec(select(DataVersion).where(DataVersion.user_id == user_id).with_for_update()).first()
+
+
+def archive_user(session: Session, user_id: int, cutoff: date) -> dict:
+    """
+    Snapshot every month before cutoff that has no snapshot yet (including
+    ones dropped by writes since the last run), then move the user's closed
+    rows to the archive tables. The cutoff never moves back. Commits.
+    """
+    _lock_user_writes(session, user_id)
+    state = session.get(ArchiveState, user_id)
+    if state is not None:
+        cutoff = max(cutoff, state.archived_before)
+    report = {"user_id": user_id, "archived_before": cutoff, "snapshots_created": 0, "rows_archived": 0}
+
+    rows = fetch_history(session, [user_id], CALENDAR_COLUMNS)
+    dates = [row.date for kind_rows in rows.values() for row in kind_rows]
+    existing = set(session.exec(
+        select(MonthSnapshot.view, MonthSnapshot.year, MonthSnapshot.month)
+        .where(MonthSnapshot.user_id == user_id)
+    ).all())
+
+    for year, month in (_months(min(dates), cutoff) if dates else ()):
+        for view, build in VIEW_BUILDERS.items():
+            if (view, year, month) in existing:
+                continue
+            payload = build(rows["income"], rows["expense"], rows["saving"], year, month)
+            session.add(MonthSnapshot(
+                user_id=user_id, view=view, year=year, month=month, payload=jsonable_encoder(payload)
+            ))
+            report["snapshots_created"] += 1
+
+    archived_at = datetime.utcnow()
+    for model, archive in ARCHIVE_TABLES.items():
+        table = model.__table__
+        closed = and_(
+            table.c.user_id == user_id,
+            or_(
+                and_(table.c.recurrence_type == RecurrenceType.NONE, table.c.date < cutoff),
+                and_(table.c.recurrence_type != RecurrenceType.NONE, table.c.recurrence_end_date < cutoff)
+            )
+        )
+        columns = [column.name for column in table.columns]
+        session.execute(insert(archive).from_select(
+            columns + ["archived_at"],
+            select(*table.columns, literal(archived_at, archive.c.archived_at.type)).where(closed)
+        ))
+        report["rows_archived"] += session.execute(table.delete().where(closed)).rowcount
+
+    if state is None:
+        session.add(ArchiveState(user_id=user_id, archived_before=cutoff))
+    else:
+        state.archived_before = cutoff
+        state.updated_at = archived_at
+        session.add(state)
+    session.commit()
+    return report
+
+
+def run_archival(cutoff: Optional[date] = None, user_ids: Optional[Iterable[int]] = None) -> dict:
+    """Archive every active user's history before cutoff, one transaction per user."""
+    from database import engine
+
+    cutoff = cutoff or archive_cutoff()
+    with Session(engine) as session:
+        if user_ids is None:
+            statement = select(User.id).where(User.is_active == True).order_by(User.id)  # noqa: E712
+            user_ids = session.exec(statement).all()
+
+    totals = {"archived_before": cutoff, "users": 0, "snapshots_created": 0, "rows_archived": 0}
+    for user_id in user_ids:
+        with Session(engine) as session:
+            report = archive_user(session, user_id, cutoff)
+        totals["users"] += 1
+        totals["snapshots_created"] += report["snapshots_created"]
+        totals["rows_archived"] += report["rows_archived"]
+        logger.info(
+            "Archived user %d before %s: %d rows moved, %d snapshots created",
+            user_id, report["archived_before"], report["rows_archived"], report["snapshots_created"]
+        )
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move closed transaction history to the archive tables")
+    parser.add_argument("--user-id", type=int, help="only archive this user's history")
+    parser.add_argument(
+        "--months", type=int, default=ARCHIVE_AFTER_MONTHS,
+        help=f"archive history older than this many months (default {ARCHIVE_AFTER_MONTHS})"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    user_ids = [args.user_id] if args.user_id is not None else None
+    print(json.dumps(jsonable_encoder(run_archival(archive_cutoff(args.months), user_ids)), indent=2))
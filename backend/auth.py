@@ -14,13 +14,14 @@ import re
 import jwt
 from jwt.exceptions import InvalidTokenError
 from pwdlib import PasswordHash
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 from pydantic import BaseModel, field_validator
 
 from models import User, TokenData
 from database import get_session
+from cache import get_cache, user_key, CACHE_USER_TTL
 
 # Security configuration
 # Generate a secure key with: openssl rand -hex 32
@@ -28,6 +29,14 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Lifetime of the query-string tokens that open /api/events (EventSource cannot send headers)
+EVENTS_TOKEN_EXPIRE_SECONDS = int(os.getenv("EVENTS_TOKEN_EXPIRE_SECONDS", "60"))
+
+# Comma-separated usernames allowed to use the /api/admin endpoints
+ADMIN_USERNAMES = {
+    name.strip().lower() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()
+}
+
 # Password hashing configuration using Argon2 (recommended)
 password_hash = PasswordHash.recommended()
 
@@ -124,43 +133,109 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-async def get_current_user(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    session: Session = Depends(get_session)
-) -> User:
+def create_events_token(username: str) -> str:
     """
-    Dependency to get the current user from JWT token.
+    Create a short-lived token that only opens the user's event stream.
+    
+    It travels in the /api/events query string, where it may end up in
+    access logs, so it expires after EVENTS_TOKEN_EXPIRE_SECONDS and is
+    not accepted as a bearer token.
+    """
+    now = datetime.now(timezone.utc)
+    return jwt.encode({
+        "sub": username,
+        "exp": now + timedelta(seconds=EVENTS_TOKEN_EXPIRE_SECONDS),
+        "iat": now,
+        "type": "events"
+    }, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def get_token_subject(token: str, token_type: str = "access") -> Optional[str]:
+    """
+    Decode a JWT and return its subject (the username).
     
-    Validates the token, extracts the username, and fetches the user from the database.
-    Raises HTTPException if token is invalid or user doesn't exist.
+    Returns None if the token is invalid, expired, has no subject or is
+    not of the given type.
     """
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except InvalidTokenError:
+        return None
+    if payload.get("type") != token_type:
+        return None
+    return payload.get("sub")
+
+
+def token_has_admin_access(token: str) -> bool:
+    """Whether the token belongs to a user listed in ADMIN_USERNAMES."""
+    return get_token_subject(token) in ADMIN_USERNAMES
+
+
+# User fields kept in the shared cache; never the password hash
+CACHED_USER_FIELDS = ("id", "email", "username", "full_name", "is_active")
+
+
+def _cache_user(user: User) -> None:
+    fields = {name: getattr(user, name) for name in CACHED_USER_FIELDS}
+    fields["created_at"] = user.created_at.isoformat()
+    get_cache().set(user_key(user.username), fields, CACHE_USER_TTL)
+
+
+def _cached_user(username: str) -> Optional[User]:
+    """A detached User built from the cache, without its password hash."""
+    fields = get_cache().get(user_key(username))
+    if fields is None:
+        return None
+    fields["created_at"] = datetime.fromisoformat(fields["created_at"])
+    return User(**fields)
+
+
+def _load_user(session: Session, username: Optional[str]) -> User:
+    """The user named by a validated token, from the shared cache or the database."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        
-        if username is None:
-            raise credentials_exception
-        
-        token_data = TokenData(username=username)
-        
-    except InvalidTokenError:
+    if username is None:
         raise credentials_exception
     
-    statement = select(User).where(User.username == token_data.username)
-    user = session.exec(statement).first()
+    token_data = TokenData(username=username)
     
+    user = _cached_user(token_data.username)
     if user is None:
-        raise credentials_exception
+        statement = select(User).where(User.username == token_data.username)
+        user = session.exec(statement).first()
+        
+        if user is None and session.uses_replica():
+            # Accounts created moments ago may not have reached the replica yet
+            session.info["force_primary"] = True
+            user = session.exec(statement).first()
+        
+        if user is None:
+            raise credentials_exception
+        _cache_user(user)
     
+    # Lets the session keep this user's reads on the primary after a write
+    session.info["user_id"] = user.id
     return user
 
 
+async def get_current_user(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    session: Session = Depends(get_session)
+) -> User:
+    """
+    Dependency to get the current user from JWT token.
+    
+    Validates the token, extracts the username, and fetches the user from the
+    shared cache or the database. Raises HTTPException if token is invalid or
+    user doesn't exist.
+    """
+    return _load_user(session, get_token_subject(token))
+
+
 async def get_current_active_user(
     current_user: Annotated[User, Depends(get_current_user)]
 ) -> User:
@@ -176,3 +251,38 @@ async def get_current_active_user(
             detail="Inactive user"
         )
     return current_user
+
+
+async def get_events_user(
+    token: Annotated[Optional[str], Query()] = None,
+    session: Session = Depends(get_session)
+) -> User:
+    """
+    Dependency to get the active user from a token made by create_events_token.
+    
+    Used by /api/events only: the browser's EventSource cannot send an
+    Authorization header, so the token comes in the query string.
+    """
+    user = _load_user(session, get_token_subject(token, "events") if token else None)
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    return user
+
+
+async def get_current_admin_user(
+    current_user: Annotated[User, Depends(get_current_active_user)]
+) -> User:
+    """
+    Dependency to get the current user, restricted to administrators.
+    
+    Raises HTTPException if the user is not listed in ADMIN_USERNAMES.
+    """
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Administrator access required"
+        )
+    return current_user
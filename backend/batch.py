@@ -0,0 +1,246 @@
+"""
+Transactional batches of create, update and delete operations.
+
+POST /api/batch applies an ordered list of operations on the user's
+incomes, expenses, assets and savings as one transaction: if any operation
+fails, none of them is applied. Each operation is checked and applied like
+its single-row endpoint (ownership, archived rows moved back before being
+changed, asset contributions), but the batch pays the per-write overhead
+once: one data version bump, at most two snapshot invalidations, one
+commit, and one contribution update per asset however many of its savings
+the batch changes.
+
+A saving can be linked to an asset created earlier in the same batch with
+asset_ref, the index of the operation that created it.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session
+
+from archive import detach_archived_savings, get_transaction, invalidate_snapshots
+from models import (
+    Asset, AssetResponse, BatchAction, BatchKind, BatchOperation, BatchRequest,
+    Income, IncomeResponse, Expense, ExpenseResponse, Saving, SavingResponse, RecurrenceType
+)
+from money import from_minor_units
+from reconcile import linked_savings_total
+from view_store import bump_data_version
+
+BATCH_MODELS = {
+    BatchKind.INCOME: Income,
+    BatchKind.EXPENSE: Expense,
+    BatchKind.ASSET: Asset,
+    BatchKind.SAVING: Saving,
+}
+
+BATCH_RESPONSE_MODELS = {
+    BatchKind.INCOME: IncomeResponse,
+    BatchKind.EXPENSE: ExpenseResponse,
+    BatchKind.ASSET: AssetResponse,
+    BatchKind.SAVING: SavingResponse,
+}
+
+
+class BatchError(Exception):
+    """An operation that cannot be applied; the whole batch is rolled back."""
+
+    def __init__(self, index: int, status_code: int, message: str):
+        super().__init__(f"Operation {index}: {message}")
+        self.index = index
+        self.status_code = status_code
+
+
+class _Batch:
+    def __init__(self, session: Session, user_id: int):
+        self.session = session
+        self.user_id = user_id
+        # Net contribution change per asset, applied once at the end
+        self.contributions = defaultdict(int)
+        self.created = {}
+        self.dates = []
+        self.recurring_dates = []
+        self.asset_ids = set()
+
+    def touch(self, row_date: Optional[date], recurring: bool) -> None:
+        (self.recurring_dates if recurring else self.dates).append(row_date)
+
+    def asset(self, index: int, asset_id: int) -> Asset:
+        asset = self.session.get(Asset, asset_id)
+        if not asset or asset.user_id != self.user_id:
+            raise BatchError(index, 404, "Asset not found")
+        return asset
+
+    def transaction(self, index: int, operation: BatchOperation):
+        model = BATCH_MODELS[operation.kind]
+        row = get_transaction(self.session, model, operation.id, self.user_id, restore=True)
+        if not row:
+            raise BatchError(index, 404, f"{model.__name__} not found")
+        return row
+
+    def linked_asset_id(self, index: int, operation: BatchOperation, data: dict) -> Optional[int]:
+        """The asset a created or updated saving links to, checked, or None."""
+        if operation.asset_ref is not None:
+            created = self.created.get(operation.asset_ref)
+            if operation.asset_ref >= index or not isinstance(created, Asset):
+                raise BatchError(index, 422, "asset_ref must be the index of an earlier asset create")
+            data["asset_id"] = created.id
+        if data.get("asset_id"):
+            self.asset(index, data["asset_id"])
+        return data.get("asset_id")
+
+    def apply(self, index: int, operation: BatchOperation):
+        """Apply one operation; returns the created or updated row, None for deletes."""
+        if operation.kind == BatchKind.ASSET:
+            return self.apply_asset(index, operation)
+        if operation.kind == BatchKind.SAVING:
+            return self.apply_saving(index, operation)
+
+        model = BATCH_MODELS[operation.kind]
+        if operation.action == BatchAction.CREATE:
+            row = model(**operation.payload.dict(), user_id=self.user_id)
+            self.session.add(row)
+            self.touch(row.date, row.recurrence_type != RecurrenceType.NONE)
+            return row
+
+        row = self.transaction(index, operation)
+        self.touch(row.date, row.recurrence_type != RecurrenceType.NONE)
+        if operation.action == BatchAction.DELETE:
+            self.session.delete(row)
+            return None
+
+        for key, value in operation.payload.dict(exclude_unset=True).items():
+            setattr(row, key, value)
+        self.session.add(row)
+        self.touch(row.date, row.recurrence_type != RecurrenceType.NONE)
+        return row
+
+    def apply_asset(self, index: int, operation: BatchOperation):
+        if operation.action == BatchAction.CREATE:
+            asset = Asset(**operation.payload.dict(), user_id=self.user_id)
+            asset.opening_contributed = asset.contributed
+            self.session.add(asset)
+            return asset
+
+        asset = self.asset(index, operation.id)
+        if operation.action == BatchAction.DELETE:
+            self.asset_ids.discard(asset.id)
+            self.contributions.pop(asset.id, None)
+            self.session.delete(asset)
+            detach_archived_savings(self.session, asset.id)
+            return None
+
+        asset_data = operation.payload.dict(exclude_unset=True)
+        for key, value in asset_data.items():
+            setattr(asset, key, value)
+        # A manual total replaces whatever the savings do not account for;
+        # savings the batch changed so far are flushed and counted
+        if "contributed" in asset_data:
+            self.contributions.pop(asset.id, None)
+            self.session.flush()
+            asset.opening_contributed = asset.contributed - linked_savings_total(self.session, asset.id)
+        self.session.add(asset)
+        return asset
+
+    def apply_saving(self, index: int, operation: BatchOperation):
+        if operation.action == BatchAction.CREATE:
+            data = operation.payload.dict()
+            asset_id = self.linked_asset_id(index, operation, data)
+            saving = Saving(**data, user_id=self.user_id)
+            self.session.add(saving)
+            self.contribute(asset_id, saving.amount)
+            self.touch(saving.date, saving.recurrence_type != RecurrenceType.NONE)
+            return saving
+
+        saving = self.transaction(index, operation)
+        self.contribute(saving.asset_id, -saving.amount)
+        self.touch(saving.date, saving.recurrence_type != RecurrenceType.NONE)
+        if operation.action == BatchAction.DELETE:
+            self.session.delete(saving)
+            return None
+
+        data = operation.payload.dict(exclude_unset=True)
+        if operation.asset_ref is not None or data.get("asset_id"):
+            self.linked_asset_id(index, operation, data)
+        for key, value in data.items():
+            setattr(saving, key, value)
+        self.session.add(saving)
+        self.contribute(saving.asset_id, saving.amount)
+        self.touch(saving.date, saving.recurrence_type != RecurrenceType.NONE)
+        return saving
+
+    def snapshot(self, operation: BatchOperation, row) -> dict:
+        """The operation's result, with the row as it stands after the operation."""
+        result = {
+            "kind": operation.kind,
+            "action": operation.action,
+            "id": row.id if row is not None else operation.id,
+            "row": None,
+        }
+        if row is not None:
+            result["row"] = BATCH_RESPONSE_MODELS[operation.kind].model_validate(row).model_dump()
+            if operation.kind == BatchKind.ASSET:
+                # Contributions so far are only applied at the end of the batch
+                pending = self.contributions.get(row.id, 0)
+                result["row"]["contributed"] = from_minor_units(row.contributed + pending)
+        return jsonable_encoder(result)
+
+    def contribute(self, asset_id: Optional[int], amount: int) -> None:
+        if asset_id:
+            self.contributions[asset_id] += amount
+            self.asset_ids.add(asset_id)
+
+    def apply_contributions(self) -> None:
+        for asset_id, amount in sorted(self.contributions.items()):
+            asset = self.session.get(Asset, asset_id)
+            if asset and amount:
+                asset.contributed += amount
+                self.session.add(asset)
+
+
+def apply_batch(session: Session, user_id: int, request: BatchRequest) -> Tuple[dict, dict]:
+    """
+    Apply the operations in order and commit them together. Returns the
+    response (per-operation results and the assets whose contribution
+    changed) and the dates and assets the batch touched, for
+    publish_change. Raises BatchError, with nothing committed, if an
+    operation cannot be applied.
+    """
+    batch = _Batch(session, user_id)
+    results = []
+    try:
+        for index, operation in enumerate(request.operations):
+            row = batch.apply(index, operation)
+            # Assigns ids and lets later operations see this one
+            session.flush()
+            if operation.action == BatchAction.CREATE:
+                batch.created[index] = row
+            results.append(batch.snapshot(operation, row))
+
+        batch.apply_contributions()
+        bump_data_version(session, user_id)
+        invalidate_snapshots(session, user_id, batch.dates)
+        invalidate_snapshots(session, user_id, batch.recurring_dates, recurring=True)
+        session.flush()
+    except BatchError:
+        session.rollback()
+        raise
+
+    # Serialized before commit, which would expire and reload every asset
+    assets = [
+        AssetResponse.model_validate(asset)
+        for asset in (session.get(Asset, asset_id) for asset_id in sorted(batch.asset_ids))
+        if asset is not None
+    ]
+    response = jsonable_encoder({"results": results, "assets": assets})
+    session.commit()
+
+    changes = {
+        "dates": batch.dates + batch.recurring_dates,
+        "recurring": bool(batch.recurring_dates),
+        "asset_ids": sorted(batch.asset_ids),
+    }
+    return response, changes
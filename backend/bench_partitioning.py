@@ -0,0 +1,163 @@
+"""
+Benchmark: per-user scans on a plain versus a hash-partitioned table.
+
+Loads the same synthetic transactions (10M rows by default) into a plain
+table and into one hash-partitioned by user_id, both indexed on user_id
+like incomes/expenses/savings, then times the per-user query the read path
+issues, VACUUM ANALYZE, and index size. Everything lives in its own schema,
+dropped afterwards unless --keep is given.
+
+    DATABASE_URL=postgresql://... python bench_partitioning.py
+    python bench_partitioning.py --rows 1000000 --partitions 16 --samples 200
+
+Use a scratch database: loading 10M rows twice takes a few GB and minutes.
+"""
+
+from statistics import median, quantiles
+import argparse
+import logging
+import random
+import re
+import time
+
+from sqlalchemy import text
+
+from database import engine
+
+SCHEMA = "partition_bench"
+
+COLUMNS = """
+    id bigint NOT NULL,
+    user_id integer NOT NULL,
+    amount bigint NOT NULL,
+    date date NOT NULL,
+    recurrence_type text NOT NULL,
+    recurrence_end_date date
+"""
+
+# Tables (or partitions) read by a plan, excluding the index side of bitmap scans
+SCANNED_RELATION = re.compile(r"(?:Seq Scan|Bitmap Heap Scan|(?<!Bitmap )Index Scan|Index Only Scan) on (\S+)")
+
+# Mirrors queries.fetch_transactions for one user
+USER_SCAN = "SELECT amount, date, recurrence_type, recurrence_end_date FROM {table} WHERE user_id = :user_id"
+
+
+def _timed(conn, sql: str, params: dict = None) -> float:
+    started = time.perf_counter()
+    conn.execute(text(sql), params or {}).fetchall()
+    return (time.perf_counter() - started) * 1000
+
+
+def setup(conn, rows: int, users: int, partitions: int) -> dict:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.plain ({COLUMNS})"))
+    conn.execute(text(f"CREATE TABLE {SCHEMA}.hashed ({COLUMNS}) PARTITION BY HASH (user_id)"))
+    for remainder in range(partitions):
+        conn.execute(text(
+            f"CREATE TABLE {SCHEMA}.hashed_p{remainder} PARTITION OF {SCHEMA}.hashed "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
+
+    timings = {}
+    started = time.perf_counter()
+    conn.execute(text(f"""
+        INSERT INTO {SCHEMA}.plain
+        SELECT g,
+               1 + (random() * (:users - 1))::integer,
+               (random() * 100000)::bigint,
+               DATE '2020-01-01' + (random() * 2000)::integer,
+               (ARRAY['NONE', 'NONE', 'NONE', 'DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY'])[1 + (random() * 6)::integer],
+               NULL
+        FROM generate_series(1, :rows) AS g
+    """), {"rows": rows, "users": users})
+    timings["load_plain_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    conn.execute(text(f"INSERT INTO {SCHEMA}.hashed SELECT * FROM {SCHEMA}.plain"))
+    timings["load_hashed_s"] = time.perf_counter() - started
+
+    for table in ("plain", "hashed"):
+        started = time.perf_counter()
+        conn.execute(text(f"ALTER TABLE {SCHEMA}.{table} ADD PRIMARY KEY (id, user_id)"))
+        conn.execute(text(f"CREATE INDEX ON {SCHEMA}.{table} (user_id)"))
+        timings[f"index_{table}_s"] = time.perf_counter() - started
+    return timings
+
+
+def maintenance(conn, partitions: int) -> dict:
+    timings = {}
+    for table in ("plain", "hashed"):
+        started = time.perf_counter()
+        conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.{table}"))
+        timings[f"vacuum_{table}_s"] = time.perf_counter() - started
+
+    # A single partition is the unit autovacuum and reindexing work on
+    started = time.perf_counter()
+    conn.execute(text(f"VACUUM ANALYZE {SCHEMA}.hashed_p0"))
+    timings["vacuum_one_partition_s"] = time.perf_counter() - started
+
+    timings["user_index_plain_mb"] = conn.execute(text(
+        f"SELECT pg_relation_size('{SCHEMA}.plain_user_id_idx') / 1048576.0"
+    )).scalar()
+    timings["user_index_largest_partition_mb"] = conn.execute(text(
+        f"SELECT max(pg_relation_size(format('{SCHEMA}.%I', 'hashed_p' || n || '_user_id_idx'))) / 1048576.0 "
+        f"FROM generate_series(0, {partitions - 1}) AS n"
+    )).scalar()
+    return timings
+
+
+def scan(conn, users: int, samples: int) -> dict:
+    user_ids = random.sample(range(1, users + 1), min(samples, users))
+    results = {}
+    for table in ("plain", "hashed"):
+        sql = USER_SCAN.format(table=f"{SCHEMA}.{table}")
+        # Warm up so both tables are compared from the same cache state
+        for user_id in user_ids[:10]:
+            _timed(conn, sql, {"user_id": user_id})
+
+        latencies = sorted(_timed(conn, sql, {"user_id": user_id}) for user_id in user_ids)
+        plan = conn.execute(text(f"EXPLAIN {sql}"), {"user_id": user_ids[0]}).scalars().all()
+        results[table] = {
+            "p50_ms": median(latencies),
+            "p95_ms": quantiles(latencies, n=20)[-1],
+            "total_ms": sum(latencies),
+            "tables_scanned": len({m.group(1) for line in plan for m in SCANNED_RELATION.finditer(line)}),
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-user scans on plain and hash-partitioned tables")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=500, help="users to time the per-user scan for")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("the benchmark requires PostgreSQL")
+    # Every load and maintenance statement here is slow by design
+    logging.getLogger("nassets.slow_query").setLevel(logging.ERROR)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        print(f"Loading {args.rows:,} rows for {args.users:,} users, {args.partitions} partitions...")
+        report = setup(conn, args.rows, args.users, args.partitions)
+        report.update(maintenance(conn, args.partitions))
+        scans = scan(conn, args.users, args.samples)
+        if not args.keep:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+    for key, value in report.items():
+        print(f"{key:34} {value:10.2f}")
+    print(f"\n{'per-user scan':15} {'p50 ms':>8} {'p95 ms':>8} {'total ms':>10} {'tables':>8}")
+    for table, result in scans.items():
+        print(
+            f"{table:15} {result['p50_ms']:8.3f} {result['p95_ms']:8.3f} "
+            f"{result['total_ms']:10.1f} {result['tables_scanned']:8d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
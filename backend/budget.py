@@ -0,0 +1,181 @@
+"""
+Budget computations shared by the API endpoints.
+
+Expands recurring incomes, expenses and savings over a date window and
+aggregates the occurrences into monthly totals and per-day balances.
+Amounts are summed as integer minor units and converted to decimals only
+when the payload is built.
+"""
+
+from datetime import date
+from typing import Iterator, Optional
+from dateutil.relativedelta import relativedelta
+import calendar
+
+from models import RecurrenceType
+from money import from_minor_units
+
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    """Return the first and last day of the given month."""
+    last_day = calendar.monthrange(year, month)[1]
+    return date(year, month, 1), date(year, month, last_day)
+
+
+def occurrence_dates(item, start_date: date, end_date: date) -> Iterator[date]:
+    """Yield the dates within [start_date, end_date] on which the item occurs."""
+    if item.recurrence_type == RecurrenceType.NONE:
+        if start_date <= item.date <= end_date:
+            yield item.date
+        return
+
+    current_date = item.date
+    recurrence_end = item.recurrence_end_date or end_date
+
+    while current_date <= min(recurrence_end, end_date):
+        if current_date >= start_date:
+            yield current_date
+
+        if item.recurrence_type == RecurrenceType.DAILY:
+            current_date += relativedelta(days=1)
+        elif item.recurrence_type == RecurrenceType.WEEKLY:
+            current_date += relativedelta(weeks=1)
+        elif item.recurrence_type == RecurrenceType.MONTHLY:
+            current_date += relativedelta(months=1)
+        elif item.recurrence_type == RecurrenceType.YEARLY:
+            current_date += relativedelta(years=1)
+
+
+def expand_recurring_items(items, start_date: date, end_date: date, item_type: str = "transaction"):
+    """
+    Expand items into one dict per occurrence within the window.
+
+    Accepts SQLModel rows or the named tuples returned by queries.py; each
+    occurrence carries the item's fields plus occurrence_date and
+    is_recurring.
+    """
+    expanded = []
+
+    for item in items:
+        item_dict = item._asdict() if hasattr(item, "_asdict") else item.dict()
+        item_dict["amount"] = from_minor_units(item.amount)
+        is_recurring = item.recurrence_type != RecurrenceType.NONE
+
+        for occurrence in occurrence_dates(item, start_date, end_date):
+            expanded.append({
+                **item_dict,
+                "occurrence_date": occurrence.isoformat(),
+                "is_recurring": is_recurring
+            })
+
+    return expanded
+
+
+def build_calendar(incomes, expenses, savings, year: int, month: int) -> dict:
+    """Build the /api/calendar payload: every occurrence in the month by kind."""
+    start_date, end_date = month_bounds(year, month)
+
+    return {
+        "incomes": expand_recurring_items(incomes, start_date, end_date),
+        "expenses": expand_recurring_items(expenses, start_date, end_date),
+        "savings": expand_recurring_items(savings, start_date, end_date),
+        "month": month,
+        "year": year
+    }
+
+
+def _sum_occurrences(items, start_date: date, end_date: date, daily: Optional[dict] = None):
+    """
+    Total the items' amounts (minor units) over the window, also bucketing
+    by day if given.
+    """
+    total = 0
+    for item in items:
+        occurrences = list(occurrence_dates(item, start_date, end_date))
+        total += item.amount * len(occurrences)
+        if daily is not None:
+            for occurrence in occurrences:
+                daily[occurrence.day] = daily.get(occurrence.day, 0) + item.amount
+    return total
+
+
+def _totals(total_income: int, total_expenses: int, total_savings: int, year: int, month: int) -> dict:
+    return {
+        "month": month,
+        "year": year,
+        "total_income": from_minor_units(total_income),
+        "total_expenses": from_minor_units(total_expenses),
+        "total_savings": from_minor_units(total_savings),
+        "remaining": from_minor_units(total_income - total_expenses - total_savings)
+    }
+
+
+def month_totals(incomes, expenses, savings, year: int, month: int) -> dict:
+    """The month's headline totals, without the per-day breakdown."""
+    start_date, end_date = month_bounds(year, month)
+
+    return _totals(
+        _sum_occurrences(incomes, start_date, end_date),
+        _sum_occurrences(expenses, start_date, end_date),
+        _sum_occurrences(savings, start_date, end_date),
+        year, month
+    )
+
+
+def build_budget_summary(incomes, expenses, savings, year: int, month: int) -> dict:
+    """
+    Build the /api/budget/summary payload for one month.
+
+    Returns the monthly totals plus a per-day breakdown of incomes,
+    expenses, savings and net balance. Only amount, date and recurrence
+    fields are read from the items.
+    """
+    start_date, end_date = month_bounds(year, month)
+
+    daily_incomes, daily_expenses, daily_savings = {}, {}, {}
+    summary = _totals(
+        _sum_occurrences(incomes, start_date, end_date, daily_incomes),
+        _sum_occurrences(expenses, start_date, end_date, daily_expenses),
+        _sum_occurrences(savings, start_date, end_date, daily_savings),
+        year, month
+    )
+
+    summary["daily_balance"] = _daily_balance(daily_incomes, daily_expenses, daily_savings, year, month)
+    return summary
+
+
+def summary_from_daily_totals(daily_incomes: dict, daily_expenses: dict, daily_savings: dict,
+                              year: int, month: int) -> dict:
+    """
+    Build the /api/budget/summary payload from per-day totals in minor
+    units already aggregated elsewhere (e.g. by the database), keyed by day
+    of month.
+    """
+    summary = _totals(
+        sum(daily_incomes.values()),
+        sum(daily_expenses.values()),
+        sum(daily_savings.values()),
+        year, month
+    )
+    summary["daily_balance"] = _daily_balance(daily_incomes, daily_expenses, daily_savings, year, month)
+    return summary
+
+
+def _daily_balance(daily_incomes: dict, daily_expenses: dict, daily_savings: dict,
+                   year: int, month: int) -> dict:
+    _, end_date = month_bounds(year, month)
+
+    daily_balance = {}
+    for day in range(1, end_date.day + 1):
+        day_income_total = daily_incomes.get(day, 0)
+        day_expense_total = daily_expenses.get(day, 0)
+        day_savings_total = daily_savings.get(day, 0)
+
+        daily_balance[day] = {
+            "date": date(year, month, day).isoformat(),
+            "incomes": from_minor_units(day_income_total),
+            "expenses": from_minor_units(day_expense_total),
+            "savings": from_minor_units(day_savings_total),
+            "net": from_minor_units(day_income_total - day_expense_total - day_savings_total)
+        }
+    return daily_balance
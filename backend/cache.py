@@ -0,0 +1,312 @@
+"""
+Cache shared by the API workers.
+
+Holds the user lookups behind authentication, the computed calendar and
+summary payloads, and the read-your-writes pins of database.py. Two
+backends:
+
+- MemoryCache (default): per process and bounded, for single-worker setups
+- RedisCache (CACHE_URL=redis://...): one store for every worker and
+  restart, plus a short-lived local copy of hot keys in each worker
+
+Values are msgpack-encoded and every key has its own TTL. Month view keys
+include the user's data version, so a write never serves a stale view even
+if an invalidation is missed. Writes still call invalidate(), which drops
+the user's views on this worker and, through Redis pub/sub, the local
+copies on every other worker, so superseded entries are freed right away.
+"""
+
+from collections import OrderedDict
+from typing import Any, Optional
+import logging
+import os
+import threading
+import time
+
+import msgpack
+
+logger = logging.getLogger("nassets.cache")
+
+CACHE_URL = os.getenv("CACHE_URL")
+CACHE_USER_TTL = float(os.getenv("CACHE_USER_TTL", "60"))
+CACHE_VIEW_TTL = float(os.getenv("CACHE_VIEW_TTL", "300"))
+# Seconds a worker keeps its local copy of a Redis entry
+CACHE_LOCAL_TTL = float(os.getenv("CACHE_LOCAL_TTL", "5"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# Connect and read timeout of Redis calls, and how long to bypass Redis after an error
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.5"))
+CACHE_RETRY_SECONDS = float(os.getenv("CACHE_RETRY_SECONDS", "5"))
+
+# Namespace of the keys and invalidation channel in a shared Redis
+REDIS_KEY_PREFIX = "nassets:cache:"
+INVALIDATION_CHANNEL = "nassets:cache:invalidate"
+
+
+def user_key(username: str) -> str:
+    return f"user:{username}"
+
+
+def view_key(user_id: int, view: str, year: int, month: int, data_version: int) -> str:
+    return f"{user_views_prefix(user_id)}{view}:{year}:{month}:{data_version}"
+
+
+def user_views_prefix(user_id: int) -> str:
+    return f"view:{user_id}:"
+
+
+def pin_key(user_id: int) -> str:
+    return f"pin:{user_id}"
+
+
+def _pack(value: Any) -> bytes:
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _unpack(data: bytes) -> Any:
+    # Summary payloads are keyed by day number
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class Cache:
+    """Interface of the cache backends. Values must be msgpack-serializable."""
+
+    # Whether every worker sees the same entries
+    shared = False
+
+    def healthy(self, for_seconds: float = 0.0) -> bool:
+        """
+        Whether reads and writes have reached the store for the last
+        for_seconds. Misses from an unhealthy cache may hide real entries.
+        """
+        return True
+
+    def get(self, key: str) -> Optional[Any]:
+        """The cached value, or None if missing or expired."""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds."""
+        raise NotImplementedError
+
+    def invalidate(self, prefix: str) -> None:
+        """Drop the entries whose keys start with prefix, on every worker."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class MemoryCache(Cache):
+    """Bounded per-process cache, evicting the least recently used entry."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _unpack(entry[1])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        entry = (time.monotonic() + ttl, _pack(value))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class RedisCache(Cache):
+    """
+    Cache in Redis (or anything speaking its protocol), shared by every
+    worker. Each worker also keeps entries it read for local_ttl seconds;
+    invalidations reach those copies over pub/sub.
+
+    Nothing connects until first use. Redis errors are logged and treated
+    as misses, and Redis is then left alone for CACHE_RETRY_SECONDS, so an
+    outage (including one at startup) makes requests read the database
+    instead of failing them. Local copies are only used while the
+    invalidation listener is subscribed.
+    """
+
+    shared = True
+
+    def __init__(self, url: str, local_ttl: float = CACHE_LOCAL_TTL):
+        import redis
+
+        self._errors = (redis.RedisError,)
+        self._redis = redis.Redis.from_url(
+            url, socket_connect_timeout=CACHE_TIMEOUT, socket_timeout=CACHE_TIMEOUT
+        )
+        self.local_ttl = local_ttl
+        self._local = MemoryCache() if local_ttl > 0 else None
+        self._lock = threading.Lock()
+        self._listener = None
+        self._down_until = 0.0
+        self._failed_at = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations_received = 0
+
+    def _failed(self, action: str, error: Exception) -> None:
+        self.errors += 1
+        self._failed_at = time.monotonic()
+        self._down_until = self._failed_at + CACHE_RETRY_SECONDS
+        logger.warning("Cache %s failed: %s", action, error)
+
+    def _available(self) -> bool:
+        """Whether to use Redis now; subscribes the listener on first use."""
+        if time.monotonic() < self._down_until:
+            return False
+        if self._local is None or self._listener is not None:
+            return True
+
+        with self._lock:
+            if self._listener is None:
+                try:
+                    pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+                except self._errors as error:
+                    self._failed("subscription", error)
+                    return False
+                self._listener = pubsub.run_in_thread(
+                    sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+                )
+        return True
+
+    def healthy(self, for_seconds: float = 0.0) -> bool:
+        if not self._available():
+            return False
+        return self._failed_at is None or time.monotonic() - self._failed_at >= for_seconds
+
+    def _on_invalidation(self, message: dict) -> None:
+        self.invalidations_received += 1
+        self._local.invalidate(message["data"].decode())
+
+    def _on_listener_error(self, error: BaseException, pubsub, thread) -> None:
+        # Invalidations may be lost while disconnected; the listener
+        # resubscribes on its next read
+        self._failed("invalidation listener", error)
+        self._local.invalidate("")
+        time.sleep(1.0)
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self._available():
+            self.misses += 1
+            return None
+
+        if self._local is not None:
+            value = self._local.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        try:
+            data = self._redis.get(REDIS_KEY_PREFIX + key)
+        except self._errors as error:
+            self._failed("read", error)
+            return None
+        if data is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        value = _unpack(data)
+        if self._local is not None:
+            self._local.set(key, value, self.local_ttl)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        if not self._available():
+            return
+        if self._local is not None:
+            self._local.set(key, value, min(ttl, self.local_ttl))
+        try:
+            self._redis.set(REDIS_KEY_PREFIX + key, _pack(value), px=max(1, int(ttl * 1000)))
+        except self._errors as error:
+            self._failed("write", error)
+
+    def invalidate(self, prefix: str) -> None:
+        # Shared entries are versioned or short-lived and simply expire;
+        # scanning Redis for the prefix would cost more than they do
+        if self._local is not None:
+            self._local.invalidate(prefix)
+        if not self._available():
+            return
+        try:
+            self._redis.publish(INVALIDATION_CHANNEL, prefix)
+        except self._errors as error:
+            self._failed("invalidation", error)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "available": time.monotonic() >= self._down_until,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "invalidations_received": self.invalidations_received,
+            "local": self._local.stats() if self._local is not None else None,
+        }
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener.join(timeout=5)
+        self._redis.close()
+
+
+_cache: Optional[Cache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """The process-wide cache, created from CACHE_URL on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _create_cache()
+    return _cache
+
+
+def _create_cache() -> Cache:
+    if CACHE_URL:
+        try:
+            return RedisCache(CACHE_URL)
+        except (ImportError, ValueError) as error:
+            logger.error("Cannot use CACHE_URL, falling back to the in-memory cache: %s", error)
+    return MemoryCache()
+
+
+def set_cache(cache: Cache) -> None:
+    """Replace the process-wide cache."""
+    global _cache
+    _cache = cache
@@ -0,0 +1,161 @@
+"""
+Per-user push channel for budget changes.
+
+Successful writes publish a compact delta (the changed row, updated asset
+contributions and recomputed month totals) to the user's channel. Clients
+subscribe over Server-Sent Events, so they no longer need to refetch every
+view after a mutation.
+
+Fan-out goes through an EventBroker. The default InProcessBroker delivers to
+subscribers connected to the same worker; multi-worker deployments install a
+shared broker with set_broker() at startup.
+"""
+
+from typing import AsyncIterator, Optional
+import asyncio
+import contextlib
+import json
+import threading
+
+# Events buffered per subscriber before it is considered too slow to keep up
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Seconds between keepalive comments on an idle stream
+KEEPALIVE_INTERVAL = 15.0
+
+
+class EventBroker:
+    """Interface for delivering events to a user's subscribers."""
+
+    def publish(self, user_id: int, event: dict) -> None:
+        """
+        Publish an event to every subscriber of a user.
+
+        Must be safe to call from worker threads, since the sync route
+        handlers run in the threadpool.
+        """
+        raise NotImplementedError
+
+    def has_subscribers(self, user_id: int) -> bool:
+        """
+        Whether anyone may be listening for the user's events.
+
+        Lets publishers skip building deltas nobody will receive. Brokers
+        that cannot tell should return True.
+        """
+        return True
+
+    def subscribe(self, user_id: int) -> AsyncIterator[dict]:
+        """Yield the user's events until the consumer stops iterating."""
+        raise NotImplementedError
+
+
+class _Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: dict) -> None:
+        # Runs on the subscriber's event loop
+        if self.queue.full():
+            # Too far behind to apply deltas; tell the client to refetch
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = {"type": "resync"}
+        self.queue.put_nowait(event)
+
+
+class InProcessBroker(EventBroker):
+    """Delivers events to subscribers connected to this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[int, set[_Subscriber]] = {}
+
+    def publish(self, user_id: int, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # Event loop already closed; the subscription is going away
+                pass
+
+    def has_subscribers(self, user_id: int) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(user_id))
+
+    async def subscribe(self, user_id: int) -> AsyncIterator[dict]:
+        subscriber = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscriber)
+
+        try:
+            while True:
+                yield await subscriber.queue.get()
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del self._subscribers[user_id]
+
+
+_broker: EventBroker = InProcessBroker()
+
+
+def get_broker() -> EventBroker:
+    return _broker
+
+
+def set_broker(broker: EventBroker) -> None:
+    """Replace the broker used for publishing and subscribing."""
+    global _broker
+    _broker = broker
+
+
+def format_sse(event: dict, event_id: Optional[int] = None) -> str:
+    """Encode an event as a Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event.get('type', 'message')}")
+    lines.append(f"data: {json.dumps(event, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def sse_stream(user_id: int, is_disconnected) -> AsyncIterator[str]:
+    """
+    Stream a user's events as SSE messages.
+
+    Sends a keepalive comment whenever the channel is idle so proxies keep
+    the connection open, and stops once is_disconnected() reports the
+    client has gone away.
+    """
+    events = get_broker().subscribe(user_id)
+    next_event = None
+    event_id = 0
+
+    yield "retry: 3000\n\n"
+    try:
+        while not await is_disconnected():
+            if next_event is None:
+                next_event = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({next_event}, timeout=KEEPALIVE_INTERVAL)
+            if not done:
+                yield ": keepalive\n\n"
+                continue
+
+            event = next_event.result()
+            next_event = None
+            event_id += 1
+            yield format_sse(event, event_id)
+    finally:
+        if next_event is not None:
+            next_event.cancel()
+            with contextlib.suppress(asyncio.CancelledError, StopAsyncIteration):
+                await next_event
+        await events.aclose()
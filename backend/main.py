@@ -1,30 +1,57 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 from datetime import timedelta, date
-from dateutil.relativedelta import relativedelta
-from typing import List, Annotated
-import calendar
+from typing import List, Annotated, Iterable, Optional
+import logging
+import math
 import os
 import re
 
-from database import create_db_and_tables, get_session
+from database import check_replica_setup, create_db_and_tables, get_session
+from budget import build_calendar, build_budget_summary, month_totals
+from queries import fetch_history, fetch_transactions, CALENDAR_COLUMNS, SUMMARY_COLUMNS, KIND_MODELS
+from recurrence_sql import build_budget_summary_in_database, database_engine_enabled
+from archive import (
+    archived_rows, archived_view, detach_archived_savings, get_archived_before, get_transaction,
+    invalidate_snapshots
+)
+from reconcile import linked_savings_total, reconcile_contributions
+from search import search_transactions, SEARCH_LIMIT_MAX, SEARCH_QUERY_MIN_LENGTH
+from portfolio import build_asset_summary, ASSET_SUMMARY_MONTHS
+from scenarios import evaluate_scenarios
+from batch import apply_batch, BatchError
+from view_store import (
+    load_view, bump_data_version, get_data_versions, VIEW_CALENDAR, VIEW_SUMMARY
+)
+from singleflight import SingleFlight
+from cache import get_cache, view_key, CACHE_VIEW_TTL
+from events import get_broker, sse_stream
+import scheduler
+from admission import admission, controller as admission_controller
+from profiling import DiagnosticsMiddleware, ProfiledRoute, profile_store
 from models import (
     User, UserCreate, UserResponse,
     Income, IncomeCreate, IncomeUpdate, IncomeResponse,
     Expense, ExpenseCreate, ExpenseUpdate, ExpenseResponse,
     Asset, AssetCreate, AssetUpdate, AssetResponse,
     Saving, SavingCreate, SavingUpdate, SavingResponse,
-    Token, RecurrenceType
+    BatchRequest, ScenarioRequest, Token, RecurrenceType
 )
 from auth import (
     get_password_hash, verify_password, create_access_token,
-    get_current_active_user, authenticate_user, ACCESS_TOKEN_EXPIRE_MINUTES,
-    PasswordValidator
+    get_current_active_user, get_current_admin_user, get_events_user, authenticate_user,
+    create_events_token, token_has_admin_access, ACCESS_TOKEN_EXPIRE_MINUTES,
+    EVENTS_TOKEN_EXPIRE_SECONDS, PasswordValidator
 )
 
 app = FastAPI(title="Nassets - Financial Planner API")
+# Lets the on-demand profiler sample sync handlers in the threadpool
+app.router.route_class = ProfiledRoute
 
 # Configure CORS - in production, specify exact origins
 ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000").split(",")
@@ -34,13 +61,35 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS if os.getenv("ENVIRONMENT") == "production" else ["*"],
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "X-Profile"],
+    expose_headers=["X-Profile-Id"],
 )
 
+app.add_middleware(DiagnosticsMiddleware, authorize=token_has_admin_access)
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request: Request, exc: RequestValidationError):
+    """The default 422 response, except that NaN or Infinity inputs are echoed as strings."""
+    errors = jsonable_encoder(exc.errors(), custom_encoder={
+        float: lambda value: value if math.isfinite(value) else str(value)
+    })
+    return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, content={"detail": errors})
+
 
 @app.on_event("startup")
 def on_startup():
+    check_replica_setup()
     create_db_and_tables()
+    if os.getenv("PRECOMPUTE_IN_PROCESS", "false").lower() == "true":
+        app.state.precompute_stop = scheduler.start_background_scheduler()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    precompute_stop = getattr(app.state, "precompute_stop", None)
+    if precompute_stop is not None:
+        precompute_stop.set()
 
 
 @app.get("/")
@@ -53,6 +102,179 @@ def health_check():
     return {"status": "healthy"}
 
 
+# Admin endpoints
+@app.get("/api/admin/precompute")
+def get_precompute_progress(
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    """Progress counters of the current or last upcoming-month precompute run."""
+    return scheduler.load_progress(session)
+
+
+@app.get("/api/admin/admission")
+def get_admission_stats(admin: User = Depends(get_current_admin_user)):
+    """Capacity, queue depth and shed counters of this worker's admission control."""
+    return admission_controller.stats()
+
+
+@app.get("/api/admin/cache")
+def get_cache_stats(admin: User = Depends(get_current_admin_user)):
+    """Hit, miss and error counters of this worker's cache."""
+    return get_cache().stats()
+
+
+@app.get("/api/admin/coalescing")
+def get_coalescing_stats(admin: User = Depends(get_current_admin_user)):
+    """How many calendar/summary computations ran versus joined an in-flight one."""
+    return month_views.stats()
+
+
+@app.post("/api/admin/reconcile")
+def reconcile_all_assets(
+    user_id: Optional[int] = None,
+    dry_run: bool = False,
+    admin: User = Depends(get_current_admin_user),
+    session: Session = Depends(get_session)
+):
+    """Recompute contributed for every asset, or one user's, from the savings."""
+    return reconcile_contributions(session, user_id, dry_run)
+
+
+@app.get("/api/admin/profiles")
+def list_profiles(admin: User = Depends(get_current_admin_user)):
+    """Recent request profiles, newest first."""
+    return profile_store.list()
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+def get_profile(profile_id: int, admin: User = Depends(get_current_admin_user)):
+    """A stored request profile with its hottest frames and collapsed stacks."""
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+# Live updates
+events_logger = logging.getLogger("nassets.events")
+
+RESPONSE_MODELS = {
+    "income": IncomeResponse,
+    "expense": ExpenseResponse,
+    "asset": AssetResponse,
+    "saving": SavingResponse,
+}
+
+
+def publish_change(
+    session: Session,
+    user_id: int,
+    kind: str,
+    action: str,
+    row=None,
+    row_id: Optional[int] = None,
+    dates: Iterable[Optional[date]] = (),
+    recurring: bool = False,
+    asset_ids: Iterable[Optional[int]] = (),
+    results: Optional[list] = None
+):
+    """
+    Push a compact delta for a committed write to the user's event channel.
+    
+    The event carries the changed row (or just its id for deletes), the
+    current state of any asset whose contribution moved, and recomputed
+    totals for every month the write touched. Recurring rows also refresh
+    the current month, since their occurrences extend past the start date.
+    A batch sends one event with its per-operation results instead of a row.
+    
+    The write is already committed, so a failure here is logged and the
+    user's subscribers are told to resync instead of failing the request.
+    """
+    try:
+        _publish_change(session, user_id, kind, action, row, row_id, dates, recurring, asset_ids, results)
+    except Exception:
+        events_logger.exception("Could not publish %s.%s for user %s", kind, action, user_id)
+        try:
+            get_broker().publish(user_id, {"type": "resync"})
+        except Exception:
+            events_logger.exception("Could not ask user %s to resync", user_id)
+
+
+def _publish_change(session, user_id, kind, action, row, row_id, dates, recurring, asset_ids, results):
+    broker = get_broker()
+    if not broker.has_subscribers(user_id):
+        return
+    
+    months = {(d.year, d.month) for d in dates if d is not None}
+    if recurring:
+        today = date.today()
+        months.add((today.year, today.month))
+    
+    totals = []
+    if months:
+        # Totals of archived months need the archived rows too
+        archived_before = get_archived_before(session, user_id)
+        if archived_before and min(months) < (archived_before.year, archived_before.month):
+            rows = fetch_history(session, [user_id], SUMMARY_COLUMNS)
+        else:
+            rows = fetch_transactions(session, [user_id], SUMMARY_COLUMNS)
+        for year, month in sorted(months):
+            totals.append(month_totals(rows["income"], rows["expense"], rows["saving"], year, month))
+    
+    assets = []
+    for asset_id in sorted({a for a in asset_ids if a}):
+        asset = session.get(Asset, asset_id)
+        # Never leak another user's asset into this user's channel
+        if asset and asset.user_id == user_id:
+            assets.append(AssetResponse.model_validate(asset))
+    
+    broker.publish(user_id, jsonable_encoder({
+        "type": f"{kind}.{action}",
+        "id": row.id if row is not None else row_id,
+        "row": RESPONSE_MODELS[kind].model_validate(row) if row is not None else None,
+        "assets": assets,
+        "totals": totals,
+        **({"results": results} if results is not None else {}),
+    }))
+
+
+@app.post("/api/events/token")
+def create_events_stream_token(current_user: User = Depends(get_current_active_user)):
+    """
+    A short-lived token for opening the event stream.
+    
+    EventSource cannot send the Authorization header, so clients fetch one
+    of these and pass it as `/api/events?token=...`. It is only checked
+    when the stream opens; fetch a new one to reconnect.
+    """
+    return {"token": create_events_token(current_user.username), "expires_in": EVENTS_TOKEN_EXPIRE_SECONDS}
+
+
+@app.get("/api/events")
+async def stream_events(
+    request: Request,
+    current_user: User = Depends(get_events_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Server-Sent Events stream of the current user's data changes.
+    
+    Authenticated with a token from POST /api/events/token in the query
+    string. Each event is named after the write (e.g. `saving.created`)
+    and carries the changed row, affected assets and recomputed month
+    totals. A `resync` event means deltas were dropped and views should be
+    refetched.
+    """
+    # The stream can stay open for hours; do not hold a pooled connection
+    session.close()
+    return StreamingResponse(
+        sse_stream(current_user.id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Auth endpoints
 @app.post("/api/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user_data: UserCreate, session: Session = Depends(get_session)):
@@ -167,8 +389,16 @@ def create_income(
 ):
     db_income = Income(**income.dict(), user_id=current_user.id)
     session.add(db_income)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [db_income.date], recurring=db_income.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(db_income)
+    publish_change(
+        session, current_user.id, "income", "created", db_income,
+        dates=[db_income.date], recurring=db_income.recurrence_type != RecurrenceType.NONE
+    )
     return db_income
 
 
@@ -179,7 +409,7 @@ def get_incomes(
 ):
     statement = select(Income).where(Income.user_id == current_user.id)
     incomes = session.exec(statement).all()
-    return incomes
+    return incomes + archived_rows(session, Income, current_user.id)
 
 
 @app.get("/api/incomes/{income_id}", response_model=IncomeResponse)
@@ -188,8 +418,8 @@ def get_income(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    income = session.get(Income, income_id)
-    if not income or income.user_id != current_user.id:
+    income = get_transaction(session, Income, income_id, current_user.id)
+    if not income:
         raise HTTPException(status_code=404, detail="Income not found")
     return income
 
@@ -201,17 +431,30 @@ def update_income(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    income = session.get(Income, income_id)
-    if not income or income.user_id != current_user.id:
+    income = get_transaction(session, Income, income_id, current_user.id, restore=True)
+    if not income:
         raise HTTPException(status_code=404, detail="Income not found")
     
+    old_date = income.date
+    was_recurring = income.recurrence_type != RecurrenceType.NONE
+    
     income_data = income_update.dict(exclude_unset=True)
     for key, value in income_data.items():
         setattr(income, key, value)
     
     session.add(income)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [old_date, income.date],
+        recurring=was_recurring or income.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(income)
+    publish_change(
+        session, current_user.id, "income", "updated", income,
+        dates=[old_date, income.date],
+        recurring=was_recurring or income.recurrence_type != RecurrenceType.NONE
+    )
     return income
 
 
@@ -221,12 +464,21 @@ def delete_income(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    income = session.get(Income, income_id)
-    if not income or income.user_id != current_user.id:
+    income = get_transaction(session, Income, income_id, current_user.id, restore=True)
+    if not income:
         raise HTTPException(status_code=404, detail="Income not found")
     
+    deleted_date = income.date
+    was_recurring = income.recurrence_type != RecurrenceType.NONE
+    
     session.delete(income)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(session, current_user.id, [deleted_date], recurring=was_recurring)
     session.commit()
+    publish_change(
+        session, current_user.id, "income", "deleted", row_id=income_id,
+        dates=[deleted_date], recurring=was_recurring
+    )
     return {"message": "Income deleted"}
 
 
@@ -239,8 +491,16 @@ def create_expense(
 ):
     db_expense = Expense(**expense.dict(), user_id=current_user.id)
     session.add(db_expense)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [db_expense.date], recurring=db_expense.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(db_expense)
+    publish_change(
+        session, current_user.id, "expense", "created", db_expense,
+        dates=[db_expense.date], recurring=db_expense.recurrence_type != RecurrenceType.NONE
+    )
     return db_expense
 
 
@@ -251,7 +511,7 @@ def get_expenses(
 ):
     statement = select(Expense).where(Expense.user_id == current_user.id)
     expenses = session.exec(statement).all()
-    return expenses
+    return expenses + archived_rows(session, Expense, current_user.id)
 
 
 @app.get("/api/expenses/{expense_id}", response_model=ExpenseResponse)
@@ -260,8 +520,8 @@ def get_expense(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    expense = session.get(Expense, expense_id)
-    if not expense or expense.user_id != current_user.id:
+    expense = get_transaction(session, Expense, expense_id, current_user.id)
+    if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     return expense
 
@@ -273,17 +533,30 @@ def update_expense(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    expense = session.get(Expense, expense_id)
-    if not expense or expense.user_id != current_user.id:
+    expense = get_transaction(session, Expense, expense_id, current_user.id, restore=True)
+    if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    old_date = expense.date
+    was_recurring = expense.recurrence_type != RecurrenceType.NONE
+    
     expense_data = expense_update.dict(exclude_unset=True)
     for key, value in expense_data.items():
         setattr(expense, key, value)
     
     session.add(expense)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [old_date, expense.date],
+        recurring=was_recurring or expense.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(expense)
+    publish_change(
+        session, current_user.id, "expense", "updated", expense,
+        dates=[old_date, expense.date],
+        recurring=was_recurring or expense.recurrence_type != RecurrenceType.NONE
+    )
     return expense
 
 
@@ -293,12 +566,21 @@ def delete_expense(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    expense = session.get(Expense, expense_id)
-    if not expense or expense.user_id != current_user.id:
+    expense = get_transaction(session, Expense, expense_id, current_user.id, restore=True)
+    if not expense:
         raise HTTPException(status_code=404, detail="Expense not found")
     
+    deleted_date = expense.date
+    was_recurring = expense.recurrence_type != RecurrenceType.NONE
+    
     session.delete(expense)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(session, current_user.id, [deleted_date], recurring=was_recurring)
     session.commit()
+    publish_change(
+        session, current_user.id, "expense", "deleted", row_id=expense_id,
+        dates=[deleted_date], recurring=was_recurring
+    )
     return {"message": "Expense deleted"}
 
 
@@ -310,9 +592,12 @@ def create_asset(
     session: Session = Depends(get_session)
 ):
     db_asset = Asset(**asset.dict(), user_id=current_user.id)
+    db_asset.opening_contributed = db_asset.contributed
     session.add(db_asset)
+    bump_data_version(session, current_user.id)
     session.commit()
     session.refresh(db_asset)
+    publish_change(session, current_user.id, "asset", "created", db_asset)
     return db_asset
 
 
@@ -326,6 +611,35 @@ def get_assets(
     return assets
 
 
+@app.get("/api/assets/summary")
+def get_asset_summary(
+    months: int = Query(ASSET_SUMMARY_MONTHS, ge=1, le=120),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Progress, number of linked savings, average monthly contribution over
+    the trailing `months` and next scheduled contribution of each asset.
+    """
+    return build_asset_summary(session, current_user.id, months)
+
+
+@app.post("/api/assets/reconcile")
+def reconcile_assets(
+    dry_run: bool = False,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """Recompute contributed for the user's assets from their savings."""
+    report = reconcile_contributions(session, current_user.id, dry_run)
+    if report["assets_corrected"]:
+        publish_change(
+            session, current_user.id, "asset", "reconciled",
+            asset_ids=[a["asset_id"] for a in report["assets"]]
+        )
+    return report
+
+
 @app.get("/api/assets/{asset_id}", response_model=AssetResponse)
 def get_asset(
     asset_id: int,
@@ -353,9 +667,15 @@ def update_asset(
     for key, value in asset_data.items():
         setattr(asset, key, value)
     
+    # A manual total replaces whatever the savings do not account for
+    if "contributed" in asset_data:
+        asset.opening_contributed = asset.contributed - linked_savings_total(session, asset.id)
+    
     session.add(asset)
+    bump_data_version(session, current_user.id)
     session.commit()
     session.refresh(asset)
+    publish_change(session, current_user.id, "asset", "updated", asset)
     return asset
 
 
@@ -370,7 +690,10 @@ def delete_asset(
         raise HTTPException(status_code=404, detail="Asset not found")
     
     session.delete(asset)
+    detach_archived_savings(session, asset_id)
+    bump_data_version(session, current_user.id)
     session.commit()
+    publish_change(session, current_user.id, "asset", "deleted", row_id=asset_id)
     return {"message": "Asset deleted"}
 
 
@@ -395,8 +718,17 @@ def create_saving(
             asset.contributed += saving.amount
             session.add(asset)
     
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [db_saving.date], recurring=db_saving.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(db_saving)
+    publish_change(
+        session, current_user.id, "saving", "created", db_saving,
+        dates=[db_saving.date], recurring=db_saving.recurrence_type != RecurrenceType.NONE,
+        asset_ids=[db_saving.asset_id]
+    )
     return db_saving
 
 
@@ -407,7 +739,7 @@ def get_savings(
 ):
     statement = select(Saving).where(Saving.user_id == current_user.id)
     savings = session.exec(statement).all()
-    return savings
+    return savings + archived_rows(session, Saving, current_user.id)
 
 
 @app.get("/api/savings/{saving_id}", response_model=SavingResponse)
@@ -416,8 +748,8 @@ def get_saving(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    saving = session.get(Saving, saving_id)
-    if not saving or saving.user_id != current_user.id:
+    saving = get_transaction(session, Saving, saving_id, current_user.id)
+    if not saving:
         raise HTTPException(status_code=404, detail="Saving not found")
     return saving
 
@@ -429,14 +761,21 @@ def update_saving(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    saving = session.get(Saving, saving_id)
-    if not saving or saving.user_id != current_user.id:
+    saving = get_transaction(session, Saving, saving_id, current_user.id, restore=True)
+    if not saving:
         raise HTTPException(status_code=404, detail="Saving not found")
     
     old_amount = saving.amount
     old_asset_id = saving.asset_id
+    old_date = saving.date
+    was_recurring = saving.recurrence_type != RecurrenceType.NONE
     
     saving_data = saving_update.dict(exclude_unset=True)
+    if saving_data.get("asset_id"):
+        asset = session.get(Asset, saving_data["asset_id"])
+        if not asset or asset.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Asset not found")
+    
     for key, value in saving_data.items():
         setattr(saving, key, value)
     
@@ -456,8 +795,19 @@ def update_saving(
             session.add(asset)
     
     session.add(saving)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(
+        session, current_user.id, [old_date, saving.date],
+        recurring=was_recurring or saving.recurrence_type != RecurrenceType.NONE
+    )
     session.commit()
     session.refresh(saving)
+    publish_change(
+        session, current_user.id, "saving", "updated", saving,
+        dates=[old_date, saving.date],
+        recurring=was_recurring or saving.recurrence_type != RecurrenceType.NONE,
+        asset_ids=[old_asset_id, saving.asset_id]
+    )
     return saving
 
 
@@ -467,8 +817,8 @@ def delete_saving(
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    saving = session.get(Saving, saving_id)
-    if not saving or saving.user_id != current_user.id:
+    saving = get_transaction(session, Saving, saving_id, current_user.id, restore=True)
+    if not saving:
         raise HTTPException(status_code=404, detail="Saving not found")
     
     if saving.asset_id:
@@ -477,136 +827,155 @@ def delete_saving(
             asset.contributed -= saving.amount
             session.add(asset)
     
+    deleted_date = saving.date
+    deleted_asset_id = saving.asset_id
+    was_recurring = saving.recurrence_type != RecurrenceType.NONE
+    
     session.delete(saving)
+    bump_data_version(session, current_user.id)
+    invalidate_snapshots(session, current_user.id, [deleted_date], recurring=was_recurring)
     session.commit()
+    publish_change(
+        session, current_user.id, "saving", "deleted", row_id=saving_id,
+        dates=[deleted_date], recurring=was_recurring, asset_ids=[deleted_asset_id]
+    )
     return {"message": "Saving deleted"}
 
 
+# Batch
+@app.post("/api/batch")
+def batch_write(
+    request: BatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Apply an ordered list of create/update/delete operations on incomes,
+    expenses, assets and savings in one transaction. If any operation
+    fails, nothing is applied and the error names the operation's index.
+    """
+    try:
+        response, changes = apply_batch(session, current_user.id, request)
+    except BatchError as error:
+        raise HTTPException(status_code=error.status_code, detail=str(error))
+    publish_change(
+        session, current_user.id, "batch", "applied",
+        dates=changes["dates"], recurring=changes["recurring"], asset_ids=changes["asset_ids"],
+        results=response["results"]
+    )
+    return response
+
+
+# Search
+@app.get("/api/search")
+def search(
+    q: str = Query(min_length=SEARCH_QUERY_MIN_LENGTH, max_length=100),
+    kind: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=SEARCH_LIMIT_MAX),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Search the user's incomes, expenses and savings, archived ones included,
+    by title, description and category. Pass next_offset back as offset for
+    the next page.
+    """
+    if kind is not None and kind not in KIND_MODELS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"kind must be one of: {', '.join(KIND_MODELS)}"
+        )
+    return search_transactions(session, current_user.id, q, [kind] if kind else None, limit, offset)
+
+
 # Calendar and budget overview
-def expand_recurring_items(items, start_date: date, end_date: date, item_type: str = "transaction"):
-    expanded = []
-    
-    for item in items:
-        item_dict = item.dict()
-        
-        if item.recurrence_type == RecurrenceType.NONE:
-            if start_date <= item.date <= end_date:
-                expanded.append({
-                    **item_dict,
-                    "occurrence_date": item.date.isoformat(),
-                    "is_recurring": False
-                })
-        else:
-            current_date = item.date
-            recurrence_end = item.recurrence_end_date or end_date
-            
-            while current_date <= min(recurrence_end, end_date):
-                if current_date >= start_date:
-                    expanded.append({
-                        **item_dict,
-                        "occurrence_date": current_date.isoformat(),
-                        "is_recurring": True
-                    })
-                
-                if item.recurrence_type == RecurrenceType.DAILY:
-                    current_date += relativedelta(days=1)
-                elif item.recurrence_type == RecurrenceType.WEEKLY:
-                    current_date += relativedelta(weeks=1)
-                elif item.recurrence_type == RecurrenceType.MONTHLY:
-                    current_date += relativedelta(months=1)
-                elif item.recurrence_type == RecurrenceType.YEARLY:
-                    current_date += relativedelta(years=1)
-    
-    return expanded
-
-
-@app.get("/api/calendar")
+# Concurrent identical month computations share one result, keyed by
+# (user, view, year, month, data version)
+month_views = SingleFlight()
+
+
+def cached_view(user_id: int, view: str, year: int, month: int, version: int, compute) -> dict:
+    """The month view from the shared cache, computing and storing it on a miss."""
+    key = view_key(user_id, view, year, month, version)
+    cache = get_cache()
+    payload = cache.get(key)
+    if payload is None:
+        payload = jsonable_encoder(compute())
+        cache.set(key, payload, CACHE_VIEW_TTL)
+    return payload
+
+
+@app.get("/api/calendar", dependencies=[Depends(admission(cost=2))])
 def get_calendar(
     year: int,
     month: int,
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    start_date = date(year, month, 1)
-    last_day = calendar.monthrange(year, month)[1]
-    end_date = date(year, month, last_day)
-    
-    income_statement = select(Income).where(Income.user_id == current_user.id)
-    expense_statement = select(Expense).where(Expense.user_id == current_user.id)
-    saving_statement = select(Saving).where(Saving.user_id == current_user.id)
-    
-    incomes = session.exec(income_statement).all()
-    expenses = session.exec(expense_statement).all()
-    savings = session.exec(saving_statement).all()
-    
-    expanded_incomes = expand_recurring_items(incomes, start_date, end_date)
-    expanded_expenses = expand_recurring_items(expenses, start_date, end_date)
-    expanded_savings = expand_recurring_items(savings, start_date, end_date)
-    
-    return {
-        "incomes": expanded_incomes,
-        "expenses": expanded_expenses,
-        "savings": expanded_savings,
-        "month": month,
-        "year": year
-    }
+    def compute():
+        cached = load_view(session, current_user.id, VIEW_CALENDAR, year, month)
+        if cached is None:
+            cached = archived_view(session, current_user.id, VIEW_CALENDAR, year, month, version)
+        if cached is not None:
+            return cached
+        
+        rows = fetch_transactions(session, [current_user.id], CALENDAR_COLUMNS)
+        return build_calendar(rows["income"], rows["expense"], rows["saving"], year, month)
+    
+    version = get_data_versions(session, [current_user.id])[current_user.id]
+    return month_views.do(
+        (current_user.id, VIEW_CALENDAR, year, month, version),
+        lambda: cached_view(current_user.id, VIEW_CALENDAR, year, month, version, compute),
+        # Followers only need the leader's result, not a pooled connection
+        before_wait=session.close
+    )
 
 
-@app.get("/api/budget/summary")
+@app.get("/api/budget/summary", dependencies=[Depends(admission(cost=2))])
 def get_budget_summary(
     year: int,
     month: int,
     current_user: User = Depends(get_current_active_user),
     session: Session = Depends(get_session)
 ):
-    start_date = date(year, month, 1)
-    last_day = calendar.monthrange(year, month)[1]
-    end_date = date(year, month, last_day)
-    
-    income_statement = select(Income).where(Income.user_id == current_user.id)
-    expense_statement = select(Expense).where(Expense.user_id == current_user.id)
-    saving_statement = select(Saving).where(Saving.user_id == current_user.id)
-    
-    incomes = session.exec(income_statement).all()
-    expenses = session.exec(expense_statement).all()
-    savings = session.exec(saving_statement).all()
-    
-    expanded_incomes = expand_recurring_items(incomes, start_date, end_date)
-    expanded_expenses = expand_recurring_items(expenses, start_date, end_date)
-    expanded_savings = expand_recurring_items(savings, start_date, end_date)
-    
-    total_income = sum(item["amount"] for item in expanded_incomes)
-    total_expenses = sum(item["amount"] for item in expanded_expenses)
-    total_savings = sum(item["amount"] for item in expanded_savings)
-    remaining = total_income - total_expenses - total_savings
-    
-    daily_balance = {}
-    for day in range(1, last_day + 1):
-        current_date = date(year, month, day)
-        current_date_str = current_date.isoformat()
-        
-        day_incomes = [i for i in expanded_incomes if i["occurrence_date"] == current_date_str]
-        day_expenses = [e for e in expanded_expenses if e["occurrence_date"] == current_date_str]
-        day_savings = [s for s in expanded_savings if s["occurrence_date"] == current_date_str]
+    def compute():
+        cached = load_view(session, current_user.id, VIEW_SUMMARY, year, month)
+        if cached is None:
+            cached = archived_view(session, current_user.id, VIEW_SUMMARY, year, month, version)
+        if cached is not None:
+            return cached
         
-        day_income_total = sum(i["amount"] for i in day_incomes)
-        day_expense_total = sum(e["amount"] for e in day_expenses)
-        day_savings_total = sum(s["amount"] for s in day_savings)
+        if database_engine_enabled(session):
+            return build_budget_summary_in_database(session, current_user.id, year, month)
         
-        daily_balance[day] = {
-            "date": current_date_str,
-            "incomes": day_income_total,
-            "expenses": day_expense_total,
-            "savings": day_savings_total,
-            "net": day_income_total - day_expense_total - day_savings_total
-        }
-    
-    return {
-        "month": month,
-        "year": year,
-        "total_income": total_income,
-        "total_expenses": total_expenses,
-        "total_savings": total_savings,
-        "remaining": remaining,
-        "daily_balance": daily_balance
-    }
+        rows = fetch_transactions(session, [current_user.id], SUMMARY_COLUMNS)
+        return build_budget_summary(rows["income"], rows["expense"], rows["saving"], year, month)
+    
+    version = get_data_versions(session, [current_user.id])[current_user.id]
+    return month_views.do(
+        (current_user.id, VIEW_SUMMARY, year, month, version),
+        lambda: cached_view(current_user.id, VIEW_SUMMARY, year, month, version, compute),
+        # Followers only need the leader's result, not a pooled connection
+        before_wait=session.close
+    )
+
+
+@app.post("/api/budget/scenarios", dependencies=[Depends(admission(cost=2))])
+def evaluate_budget_scenarios(
+    scenarios: ScenarioRequest,
+    current_user: User = Depends(get_current_active_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Evaluate what-if scenarios against the user's current rows without
+    changing them.
+    
+    Each scenario adds transactions, removes rows or scales a row (or every
+    row of a kind) by a factor. Returns monthly totals, the lowest running
+    balance and the ending balance for the baseline and each scenario.
+    """
+    try:
+        return evaluate_scenarios(session, current_user.id, scenarios)
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(error))
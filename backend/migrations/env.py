@@ -0,0 +1,57 @@
+"""
+Alembic environment.
+
+Runs against the engine from database.py, so migrations use DATABASE_URL
+like the application. Autogenerate compares against the SQLModel metadata.
+"""
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from database import MIGRATION_LOCK_ID, engine
+import models  # noqa: F401  (registers the tables on SQLModel.metadata)
+
+config = context.config
+
+# The API configures logging itself when it runs migrations at startup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=engine.url.render_as_string(hide_password=False),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite can only alter columns by copying the table
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
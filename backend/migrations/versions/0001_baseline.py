@@ -0,0 +1,160 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00.000000
+
+The schema as previously created by SQLModel.metadata.create_all. Tables
+that already exist are left alone, so databases created before migrations
+were introduced can be upgraded in place.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Shared by three tables, so the type is created once up front
+recurrence_type = postgresql.ENUM(
+    "NONE", "DAILY", "WEEKLY", "MONTHLY", "YEARLY", name="recurrencetype", create_type=False
+)
+
+
+def _transaction_columns() -> list:
+    return [
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+    ]
+
+
+def _recurrence_columns() -> list:
+    return [
+        sa.Column("recurrence_type", recurrence_type, nullable=False),
+        sa.Column("recurrence_end_date", sa.Date(), nullable=True),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    ]
+
+
+def _timestamps() -> list:
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    recurrence_type.create(bind, checkfirst=True)
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("email", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("username", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("hashed_password", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("full_name", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "assets" not in existing:
+        op.create_table(
+            "assets",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("contributed", sa.Float(), nullable=False),
+            sa.Column("target_date", sa.Date(), nullable=True),
+            sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            *_timestamps(),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_assets_user_id", "assets", ["user_id"])
+
+    if "incomes" not in existing:
+        op.create_table(
+            "incomes",
+            *_transaction_columns(),
+            *_recurrence_columns(),
+            *_timestamps(),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_incomes_user_id", "incomes", ["user_id"])
+
+    if "expenses" not in existing:
+        op.create_table(
+            "expenses",
+            *_transaction_columns(),
+            sa.Column("category", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            *_recurrence_columns(),
+            *_timestamps(),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_expenses_user_id", "expenses", ["user_id"])
+
+    if "savings" not in existing:
+        op.create_table(
+            "savings",
+            *_transaction_columns(),
+            sa.Column("asset_id", sa.Integer(), nullable=True),
+            *_recurrence_columns(),
+            sa.Column("percentage", sa.Float(), nullable=False),
+            *_timestamps(),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.ForeignKeyConstraint(["asset_id"], ["assets.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_savings_user_id", "savings", ["user_id"])
+        op.create_index("ix_savings_asset_id", "savings", ["asset_id"])
+
+    if "data_versions" not in existing:
+        op.create_table(
+            "data_versions",
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("user_id"),
+        )
+
+    if "monthly_views" not in existing:
+        op.create_table(
+            "monthly_views",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("view", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column("year", sa.Integer(), nullable=False),
+            sa.Column("month", sa.Integer(), nullable=False),
+            sa.Column("data_version", sa.Integer(), nullable=False),
+            sa.Column("payload", sa.JSON(), nullable=False),
+            sa.Column("computed_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("user_id", "view", "year", "month"),
+        )
+        op.create_index("ix_monthly_views_user_id", "monthly_views", ["user_id"])
+
+
+def downgrade() -> None:
+    for table in ("monthly_views", "data_versions", "savings", "expenses", "incomes", "assets", "users"):
+        op.drop_table(table)
+    recurrence_type.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,92 @@
+"""Store money as integer minor units
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:30:00.000000
+
+Converts every money column from a float to BIGINT cents, rounding
+existing values half away from zero the way money.to_minor_units does.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from money import to_minor_units
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MINOR_UNITS = 100
+
+MONEY_COLUMNS = {
+    "incomes": ("amount",),
+    "expenses": ("amount",),
+    "savings": ("amount",),
+    "assets": ("amount", "contributed"),
+}
+
+
+def _server_default(column: str):
+    return sa.text("0") if column == "contributed" else None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    for table, columns in MONEY_COLUMNS.items():
+        if bind.dialect.name == "postgresql":
+            for column in columns:
+                op.alter_column(
+                    table, column,
+                    type_=sa.BigInteger(),
+                    existing_nullable=False,
+                    server_default=_server_default(column),
+                    # numeric round() goes half away from zero; float8 round() does not
+                    postgresql_using=f"round(CAST({column} AS numeric) * {MINOR_UNITS})::bigint",
+                )
+            continue
+
+        # SQLite's round() works on the binary float, so 1.005 (1.00499...)
+        # would become 100 where the API stores 101; convert in Python
+        for column in columns:
+            rows = bind.execute(sa.text(f"SELECT id, {column} FROM {table}")).all()
+            if rows:
+                bind.execute(
+                    sa.text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+                    [{"id": row_id, "value": to_minor_units(value)} for row_id, value in rows],
+                )
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(
+                    column,
+                    type_=sa.BigInteger(),
+                    existing_nullable=False,
+                    server_default=_server_default(column),
+                )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    for table, columns in MONEY_COLUMNS.items():
+        if bind.dialect.name == "postgresql":
+            for column in columns:
+                op.alter_column(
+                    table, column,
+                    type_=sa.Float(),
+                    existing_nullable=False,
+                    server_default=None,
+                    postgresql_using=f"CAST({column} AS double precision) / {MINOR_UNITS}",
+                )
+            continue
+
+        with op.batch_alter_table(table) as batch:
+            for column in columns:
+                batch.alter_column(column, type_=sa.Float(), existing_nullable=False, server_default=None)
+        for column in columns:
+            op.execute(f"UPDATE {table} SET {column} = CAST({column} AS REAL) / {MINOR_UNITS}")
@@ -0,0 +1,38 @@
+"""Track the part of Asset.contributed not backed by savings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 10:00:00.000000
+
+Adds assets.opening_contributed, so that contributed can be recomputed as
+opening_contributed plus the sum of the asset's savings. Existing rows are
+backfilled from their current contributed value, which is taken as correct.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "assets",
+        sa.Column("opening_contributed", sa.BigInteger(), nullable=False, server_default=sa.text("0")),
+    )
+    op.execute("""
+        UPDATE assets SET opening_contributed = contributed - COALESCE(
+            (SELECT SUM(savings.amount) FROM savings WHERE savings.asset_id = assets.id), 0
+        )
+    """)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("assets") as batch:
+        batch.drop_column("opening_contributed")
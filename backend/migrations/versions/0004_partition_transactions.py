@@ -0,0 +1,46 @@
+"""Optionally hash-partition incomes, expenses and savings by user_id
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 10:30:00.000000
+
+PostgreSQL only, and only when a partition count is given, either as
+TRANSACTION_PARTITIONS or as `alembic -x partitions=N upgrade head`.
+Otherwise this revision changes nothing.
+
+This only takes effect on databases created with the count set: startup
+runs `upgrade head`, so existing databases have recorded 0004 without
+partitioning. Partition those (or change the count) with
+`python partitioning.py --partitions N`, which can be re-run at any
+revision; see partitioning.py for how the tables are rebuilt.
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+
+from partitioning import TRANSACTION_PARTITIONS, partition_tables
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _partition_count() -> int:
+    value = context.get_x_argument(as_dictionary=True).get("partitions")
+    return int(value) if value else TRANSACTION_PARTITIONS
+
+
+def upgrade() -> None:
+    partitions = _partition_count()
+    if op.get_bind().dialect.name != "postgresql" or partitions <= 0:
+        return
+    partition_tables(op.get_bind(), partitions)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    partition_tables(op.get_bind(), 0)
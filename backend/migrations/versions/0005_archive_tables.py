@@ -0,0 +1,107 @@
+"""Archive tables and per-month snapshots
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 11:00:00.000000
+
+Adds incomes_archive, expenses_archive and savings_archive, which hold
+closed rows moved out of the hot tables by archive.py, plus the
+month_snapshots they are served from and each user's archive_states
+watermark. Nothing is archived until archive.py runs. Downgrading moves
+archived rows back into the hot tables.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Created by the baseline
+recurrence_type = postgresql.ENUM(
+    "NONE", "DAILY", "WEEKLY", "MONTHLY", "YEARLY", name="recurrencetype", create_type=False
+)
+
+
+def _archive_columns(*extra: sa.Column) -> list:
+    """The columns shared by the hot tables, the table's own ones, and archived_at."""
+    return [
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("title", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("amount", sa.BigInteger(), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("recurrence_type", recurrence_type, nullable=False),
+        sa.Column("recurrence_end_date", sa.Date(), nullable=True),
+        sa.Column("description", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        *extra,
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    ]
+
+
+# Savings keep asset_id without a foreign key, since assets can be deleted
+ARCHIVE_TABLES = {
+    "incomes_archive": (),
+    "expenses_archive": (sa.Column("category", sqlmodel.sql.sqltypes.AutoString(), nullable=True),),
+    "savings_archive": (
+        sa.Column("asset_id", sa.Integer(), nullable=True),
+        sa.Column("percentage", sa.Float(), nullable=False),
+    ),
+}
+
+
+def upgrade() -> None:
+    for table, extra in ARCHIVE_TABLES.items():
+        op.create_table(table, *_archive_columns(*extra))
+        op.create_index(f"ix_{table}_user_id", table, ["user_id"])
+
+    op.create_table(
+        "archive_states",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("archived_before", sa.Date(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+
+    op.create_table(
+        "month_snapshots",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("view", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "view", "year", "month"),
+    )
+    op.create_index("ix_month_snapshots_user_id", "month_snapshots", ["user_id"])
+
+
+def downgrade() -> None:
+    for table, extra in ARCHIVE_TABLES.items():
+        columns = ", ".join(
+            column.name for column in _archive_columns(*extra)
+            if isinstance(column, sa.Column) and column.name != "archived_at"
+        )
+        op.execute(f"INSERT INTO {table.removesuffix('_archive')} ({columns}) SELECT {columns} FROM {table}")
+
+    op.drop_index("ix_month_snapshots_user_id", table_name="month_snapshots")
+    op.drop_table("month_snapshots")
+    op.drop_table("archive_states")
+    for table in reversed(list(ARCHIVE_TABLES)):
+        op.drop_index(f"ix_{table}_user_id", table_name=table)
+        op.drop_table(table)
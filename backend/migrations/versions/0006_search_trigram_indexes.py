@@ -0,0 +1,63 @@
+"""Trigram indexes for transaction search
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 11:30:00.000000
+
+GIN pg_trgm indexes on the searched columns of the hot and archive tables,
+so the ILIKE '%...%' filters of /api/search run as index scans.
+PostgreSQL only, and only where the pg_trgm extension is available;
+otherwise search scans the user's rows and this revision changes nothing.
+Once pg_trgm is installed, `alembic downgrade 0005` and
+`alembic upgrade head` add the indexes.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = {
+    "incomes": ("title", "description"),
+    "expenses": ("title", "description", "category"),
+    "savings": ("title", "description"),
+}
+
+TABLES = {
+    **SEARCH_COLUMNS,
+    **{f"{table}_archive": columns for table, columns in SEARCH_COLUMNS.items()},
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    available = bind.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+    ).scalar()
+    if not available:
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for table, columns in TABLES.items():
+        for column in columns:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # The extension stays; other objects may use it
+    for table, columns in TABLES.items():
+        for column in columns:
+            op.execute(f"DROP INDEX IF EXISTS ix_{table}_{column}_trgm")
@@ -0,0 +1,56 @@
+"""Never reuse transaction ids on SQLite
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-20 09:00:00.000000
+
+Without AUTOINCREMENT, SQLite hands out max(id) + 1 of the current rows,
+so after archival moved the newest incomes, expenses or savings to their
+archive tables, new rows got the archived rows' ids again. The hot tables
+are rebuilt with AUTOINCREMENT and their id counters raised past every
+archived id. Other dialects draw ids from sequences, which never go
+back; there this revision changes nothing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("incomes", "expenses", "savings")
+
+
+def _rebuild(autoincrement: bool) -> None:
+    for table in TABLES:
+        with op.batch_alter_table(
+            table, recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}
+        ):
+            pass
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    _rebuild(autoincrement=True)
+    for table in TABLES:
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', 0 "
+            f"WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = '{table}')"
+        )
+        op.execute(
+            f"UPDATE sqlite_sequence SET seq = MAX(seq, "
+            f"(SELECT COALESCE(MAX(id), 0) FROM {table}_archive)) WHERE name = '{table}'"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+
+    _rebuild(autoincrement=False)
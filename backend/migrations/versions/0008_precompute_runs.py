@@ -0,0 +1,44 @@
+"""Precompute run progress
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-20 10:00:00.000000
+
+The scheduler usually runs as its own service, so the progress of its
+runs is kept in precompute_runs, where /api/admin/precompute can read it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "precompute_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("months", sa.JSON(), nullable=False),
+        sa.Column("running", sa.Boolean(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("users_total", sa.Integer(), nullable=False),
+        sa.Column("users_done", sa.Integer(), nullable=False),
+        sa.Column("views_written", sa.Integer(), nullable=False),
+        sa.Column("batches_total", sa.Integer(), nullable=False),
+        sa.Column("batches_done", sa.Integer(), nullable=False),
+        sa.Column("batches_failed", sa.Integer(), nullable=False),
+        sa.Column("last_error", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("precompute_runs")
@@ -1,7 +1,12 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, JSON, Table, UniqueConstraint
+from pydantic import PrivateAttr, field_validator, model_validator
+from typing import Any, Dict, Optional, List
 from datetime import datetime, date as date_type
 from enum import Enum
+import math
+
+from money import to_minor_units, from_minor_units
 
 
 class RecurrenceType(str, Enum):
@@ -13,6 +18,7 @@ class RecurrenceType(str, Enum):
 
 
 # Database Models
+# Money columns hold integer minor units (see money.py)
 class User(SQLModel, table=True):
     __tablename__ = "users"
     
@@ -30,13 +36,23 @@ class User(SQLModel, table=True):
     savings: List["Saving"] = Relationship(back_populates="user")
 
 
+# Identity of incomes, expenses and savings includes user_id so lookups,
+# updates and deletes prune to one partition when the tables are
+# hash-partitioned by user
+TRANSACTION_MAPPER_ARGS = {"primary_key": ["id", "user_id"]}
+# Archived rows keep their ids, so SQLite must never hand them out again
+TRANSACTION_TABLE_ARGS = {"sqlite_autoincrement": True}
+
+
 class Income(SQLModel, table=True):
     __tablename__ = "incomes"
+    __mapper_args__ = TRANSACTION_MAPPER_ARGS
+    __table_args__ = TRANSACTION_TABLE_ARGS
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     title: str
-    amount: float
+    amount: int = Field(sa_column=Column(BigInteger, nullable=False))
     date: date_type
     recurrence_type: RecurrenceType = Field(default=RecurrenceType.NONE)
     recurrence_end_date: Optional[date_type] = None
@@ -49,11 +65,13 @@ class Income(SQLModel, table=True):
 
 class Expense(SQLModel, table=True):
     __tablename__ = "expenses"
+    __mapper_args__ = TRANSACTION_MAPPER_ARGS
+    __table_args__ = TRANSACTION_TABLE_ARGS
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     title: str
-    amount: float
+    amount: int = Field(sa_column=Column(BigInteger, nullable=False))
     date: date_type
     category: Optional[str] = None
     recurrence_type: RecurrenceType = Field(default=RecurrenceType.NONE)
@@ -71,8 +89,10 @@ class Asset(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     name: str
-    amount: float
-    contributed: float = Field(default=0.0)
+    amount: int = Field(sa_column=Column(BigInteger, nullable=False))
+    contributed: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
+    # Part of contributed not backed by linked savings (set on create or manual edit)
+    opening_contributed: int = Field(default=0, sa_column=Column(BigInteger, nullable=False, server_default="0"))
     target_date: Optional[date_type] = None
     description: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -84,12 +104,14 @@ class Asset(SQLModel, table=True):
 
 class Saving(SQLModel, table=True):
     __tablename__ = "savings"
+    __mapper_args__ = TRANSACTION_MAPPER_ARGS
+    __table_args__ = TRANSACTION_TABLE_ARGS
     
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", index=True)
     asset_id: Optional[int] = Field(default=None, foreign_key="assets.id", index=True)
     title: str
-    amount: float
+    amount: int = Field(sa_column=Column(BigInteger, nullable=False))
     date: date_type
     recurrence_type: RecurrenceType = Field(default=RecurrenceType.NONE)
     recurrence_end_date: Optional[date_type] = None
@@ -102,7 +124,117 @@ class Saving(SQLModel, table=True):
     asset: Optional[Asset] = Relationship(back_populates="savings")
 
 
+# Precomputed views, tagged with the data version they were built from
+class DataVersion(SQLModel, table=True):
+    __tablename__ = "data_versions"
+    
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    version: int = Field(default=0)
+
+
+class MonthlyView(SQLModel, table=True):
+    __tablename__ = "monthly_views"
+    __table_args__ = (UniqueConstraint("user_id", "view", "year", "month"),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    view: str
+    year: int
+    month: int
+    data_version: int
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    computed_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PrecomputeRun(SQLModel, table=True):
+    """Progress of an upcoming-month precompute run, written by scheduler.py."""
+    __tablename__ = "precompute_runs"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    months: list = Field(sa_column=Column(JSON, nullable=False))
+    running: bool = Field(default=True)
+    started_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    users_total: int = 0
+    users_done: int = 0
+    views_written: int = 0
+    batches_total: int = 0
+    batches_done: int = 0
+    batches_failed: int = 0
+    last_error: Optional[str] = None
+
+
+# Archived history: closed rows moved out of the hot tables (see archive.py),
+# with the same columns plus when they were archived
+def _archive_table(model) -> Table:
+    name = f"{model.__tablename__}_archive"
+    # Rows keep the id they were given in the hot table. Only user_id keeps
+    # its foreign key: an archived saving outlives a deleted asset
+    columns = [
+        Column(
+            column.name, column.type,
+            *([ForeignKey("users.id")] if column.name == "user_id" else []),
+            primary_key=column.name == "id", autoincrement=False, nullable=column.nullable
+        )
+        for column in model.__table__.columns
+    ]
+    return Table(
+        name, SQLModel.metadata,
+        *columns,
+        Column("archived_at", DateTime, nullable=False),
+        Index(f"ix_{name}_user_id", "user_id"),
+    )
+
+
+income_archive = _archive_table(Income)
+expense_archive = _archive_table(Expense)
+saving_archive = _archive_table(Saving)
+
+
+class ArchiveState(SQLModel, table=True):
+    __tablename__ = "archive_states"
+    
+    user_id: int = Field(foreign_key="users.id", primary_key=True)
+    # Closed rows dated before this are archived; earlier months are snapshotted
+    archived_before: date_type
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class MonthSnapshot(SQLModel, table=True):
+    __tablename__ = "month_snapshots"
+    __table_args__ = (UniqueConstraint("user_id", "view", "year", "month"),)
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="users.id", index=True)
+    view: str
+    year: int
+    month: int
+    payload: dict = Field(sa_column=Column(JSON, nullable=False))
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 # API Request/Response Models
+class MoneyInput(SQLModel):
+    """Request body whose decimal money fields are converted to minor units."""
+    
+    @field_validator("amount", "contributed", "opening_balance", check_fields=False)
+    @classmethod
+    def _to_minor_units(cls, value):
+        # JSON parsing accepts NaN and Infinity, which have no minor units
+        if value is not None and not math.isfinite(value):
+            raise ValueError("must be a finite number")
+        return to_minor_units(value)
+
+
+class MoneyOutput(SQLModel):
+    """Response body whose money fields are read from minor units."""
+    
+    @field_validator("amount", "contributed", mode="before", check_fields=False)
+    @classmethod
+    def _from_minor_units(cls, value):
+        return from_minor_units(value)
+
+
 class UserCreate(SQLModel):
     email: str = Field(min_length=5, max_length=255)
     username: str = Field(min_length=3, max_length=50)
@@ -123,7 +255,7 @@ class UserResponse(SQLModel):
     is_active: bool
 
 
-class IncomeCreate(SQLModel):
+class IncomeCreate(MoneyInput):
     title: str
     amount: float
     date: date_type
@@ -132,7 +264,7 @@ class IncomeCreate(SQLModel):
     description: Optional[str] = None
 
 
-class IncomeUpdate(SQLModel):
+class IncomeUpdate(MoneyInput):
     title: Optional[str] = None
     amount: Optional[float] = None
     date: Optional[date_type] = None
@@ -141,7 +273,7 @@ class IncomeUpdate(SQLModel):
     description: Optional[str] = None
 
 
-class IncomeResponse(SQLModel):
+class IncomeResponse(MoneyOutput):
     id: int
     user_id: int
     title: str
@@ -152,7 +284,7 @@ class IncomeResponse(SQLModel):
     description: Optional[str] = None
 
 
-class ExpenseCreate(SQLModel):
+class ExpenseCreate(MoneyInput):
     title: str
     amount: float
     date: date_type
@@ -162,7 +294,7 @@ class ExpenseCreate(SQLModel):
     description: Optional[str] = None
 
 
-class ExpenseUpdate(SQLModel):
+class ExpenseUpdate(MoneyInput):
     title: Optional[str] = None
     amount: Optional[float] = None
     date: Optional[date_type] = None
@@ -172,7 +304,7 @@ class ExpenseUpdate(SQLModel):
     description: Optional[str] = None
 
 
-class ExpenseResponse(SQLModel):
+class ExpenseResponse(MoneyOutput):
     id: int
     user_id: int
     title: str
@@ -184,7 +316,7 @@ class ExpenseResponse(SQLModel):
     description: Optional[str] = None
 
 
-class AssetCreate(SQLModel):
+class AssetCreate(MoneyInput):
     name: str
     amount: float
     contributed: float = 0.0
@@ -192,7 +324,7 @@ class AssetCreate(SQLModel):
     description: Optional[str] = None
 
 
-class AssetUpdate(SQLModel):
+class AssetUpdate(MoneyInput):
     name: Optional[str] = None
     amount: Optional[float] = None
     contributed: Optional[float] = None
@@ -200,7 +332,7 @@ class AssetUpdate(SQLModel):
     description: Optional[str] = None
 
 
-class AssetResponse(SQLModel):
+class AssetResponse(MoneyOutput):
     id: int
     user_id: int
     name: str
@@ -210,7 +342,7 @@ class AssetResponse(SQLModel):
     description: Optional[str] = None
 
 
-class SavingCreate(SQLModel):
+class SavingCreate(MoneyInput):
     asset_id: Optional[int] = None
     title: str
     amount: float
@@ -221,7 +353,7 @@ class SavingCreate(SQLModel):
     percentage: float = 100.0
 
 
-class SavingUpdate(SQLModel):
+class SavingUpdate(MoneyInput):
     asset_id: Optional[int] = None
     title: Optional[str] = None
     amount: Optional[float] = None
@@ -232,7 +364,7 @@ class SavingUpdate(SQLModel):
     percentage: Optional[float] = None
 
 
-class SavingResponse(SQLModel):
+class SavingResponse(MoneyOutput):
     id: int
     user_id: int
     asset_id: Optional[int] = None
@@ -245,6 +377,118 @@ class SavingResponse(SQLModel):
     percentage: float
 
 
+class TransactionKind(str, Enum):
+    INCOME = "income"
+    EXPENSE = "expense"
+    SAVING = "saving"
+
+
+class ScenarioAction(str, Enum):
+    ADD = "add"
+    REMOVE = "remove"
+    SCALE = "scale"
+
+
+class ScenarioChange(MoneyInput):
+    action: ScenarioAction
+    kind: TransactionKind
+    # remove/scale: the row to change; scale without an id applies to every row of the kind
+    id: Optional[int] = None
+    factor: Optional[float] = Field(default=None, ge=0)
+    # add: the hypothetical transaction
+    amount: Optional[float] = None
+    date: Optional[date_type] = None
+    recurrence_type: RecurrenceType = RecurrenceType.NONE
+    recurrence_end_date: Optional[date_type] = None
+    
+    @model_validator(mode="after")
+    def _check_action_fields(self):
+        if self.action == ScenarioAction.ADD and (self.amount is None or self.date is None):
+            raise ValueError("add requires amount and date")
+        if self.action == ScenarioAction.REMOVE and self.id is None:
+            raise ValueError("remove requires id")
+        if self.action == ScenarioAction.SCALE and self.factor is None:
+            raise ValueError("scale requires factor")
+        return self
+
+
+class Scenario(SQLModel):
+    name: str = Field(min_length=1, max_length=100)
+    changes: List[ScenarioChange] = Field(max_length=50)
+
+
+class ScenarioRequest(MoneyInput):
+    year: int = Field(ge=1, le=9998)
+    month: int = Field(ge=1, le=12)
+    months: int = Field(default=12, ge=1, le=36)
+    opening_balance: float = 0.0
+    scenarios: List[Scenario] = Field(min_length=1, max_length=20)
+
+
+class BatchKind(str, Enum):
+    INCOME = "income"
+    EXPENSE = "expense"
+    ASSET = "asset"
+    SAVING = "saving"
+
+
+class BatchAction(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+
+BATCH_INPUT_MODELS = {
+    (BatchKind.INCOME, BatchAction.CREATE): IncomeCreate,
+    (BatchKind.INCOME, BatchAction.UPDATE): IncomeUpdate,
+    (BatchKind.EXPENSE, BatchAction.CREATE): ExpenseCreate,
+    (BatchKind.EXPENSE, BatchAction.UPDATE): ExpenseUpdate,
+    (BatchKind.ASSET, BatchAction.CREATE): AssetCreate,
+    (BatchKind.ASSET, BatchAction.UPDATE): AssetUpdate,
+    (BatchKind.SAVING, BatchAction.CREATE): SavingCreate,
+    (BatchKind.SAVING, BatchAction.UPDATE): SavingUpdate,
+}
+
+
+class BatchOperation(SQLModel):
+    kind: BatchKind
+    action: BatchAction
+    # update/delete: the row to change
+    id: Optional[int] = None
+    # create/update: the same body as the single-row endpoint
+    data: Optional[Dict[str, Any]] = None
+    # saving create/update: link to the asset created by that earlier operation
+    asset_ref: Optional[int] = Field(default=None, ge=0)
+    
+    # data validated against the create or update model of the kind
+    _payload: Optional[SQLModel] = PrivateAttr(default=None)
+    
+    @model_validator(mode="after")
+    def _check_action_fields(self):
+        if self.action == BatchAction.CREATE and self.id is not None:
+            raise ValueError("create does not take an id")
+        if self.action != BatchAction.CREATE and self.id is None:
+            raise ValueError(f"{self.action.value} requires id")
+        if self.action != BatchAction.DELETE and self.data is None:
+            raise ValueError(f"{self.action.value} requires data")
+        if self.asset_ref is not None:
+            if self.kind != BatchKind.SAVING or self.action == BatchAction.DELETE:
+                raise ValueError("asset_ref only applies to saving create and update")
+            if "asset_id" in self.data:
+                raise ValueError("asset_ref and data.asset_id are mutually exclusive")
+        if self.action != BatchAction.DELETE:
+            self._payload = BATCH_INPUT_MODELS[(self.kind, self.action)].model_validate(self.data)
+        return self
+    
+    @property
+    def payload(self) -> Optional[SQLModel]:
+        return self._payload
+
+
+class BatchRequest(SQLModel):
+    operations: List[BatchOperation] = Field(min_length=1, max_length=100)
+
+
 class Token(SQLModel):
     access_token: str
     token_type: str
@@ -0,0 +1,32 @@
+"""
+Fixed-point money.
+
+Amounts are stored and aggregated as integers in minor units (cents), so
+totals are exact no matter how many rows are summed or how often a running
+balance is adjusted. The API keeps exchanging decimal amounts: request
+models convert to minor units on the way in, and response models and the
+budget payload builders convert back on the way out.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional
+
+# Minor units per major unit
+MINOR_UNITS = 100
+
+_ONE_MINOR_UNIT = Decimal(1)
+
+
+def to_minor_units(amount: Optional[float]) -> Optional[int]:
+    """Convert a decimal amount to minor units, rounding half away from zero."""
+    if amount is None:
+        return None
+    # Going through str() keeps 0.29 as 0.29 rather than 0.28999...
+    return int((Decimal(str(amount)) * MINOR_UNITS).quantize(_ONE_MINOR_UNIT, rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(amount: Optional[int]) -> Optional[float]:
+    """Convert minor units back to a decimal amount for the API."""
+    if amount is None:
+        return None
+    return amount / MINOR_UNITS
@@ -0,0 +1,134 @@
+"""
+Hash partitioning of incomes, expenses and savings by user_id (PostgreSQL).
+
+Every read of the calendar and summary filters these tables by user, so
+partitioning them by a hash of user_id keeps each scan (and each VACUUM)
+to a fraction of the rows. Migration 0004 partitions a new database when
+TRANSACTION_PARTITIONS is set; this command partitions an existing one,
+changes the partition count, or turns partitioning off again, at any
+schema version:
+
+    python partitioning.py                   # show each table's partition count
+    python partitioning.py --partitions 16   # rebuild with 16 partitions
+    python partitioning.py --partitions 0    # rebuild as plain tables
+
+Each table is rebuilt with the same columns, defaults, constraints, foreign
+keys and indexes (including the search indexes) and its rows copied over.
+The primary key becomes (id, user_id) while partitioned, since a
+partitioned table's keys must include the partition key; ids keep coming
+from the existing sequence. The rebuild runs in one transaction and locks
+the tables, so run it in a maintenance window on large databases. Tables
+already at the requested count are left alone, so it is safe to re-run.
+"""
+
+import argparse
+import json
+import logging
+import os
+
+from sqlalchemy import text
+
+logger = logging.getLogger("nassets.partitioning")
+
+TABLES = ("incomes", "expenses", "savings")
+
+# Partition count migration 0004 gives a new database
+TRANSACTION_PARTITIONS = int(os.getenv("TRANSACTION_PARTITIONS", "0"))
+
+
+def partition_count(conn, table: str) -> int:
+    """Number of hash partitions of table; 0 if it is a plain table."""
+    return conn.execute(text(
+        "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(:table)"
+    ), {"table": table}).scalar()
+
+
+def _rebuild(conn, table: str, partitions: int) -> None:
+    """Rebuild table with the same columns, hash-partitioned or plain."""
+    old = f"{table}_old"
+    sequence = conn.execute(
+        text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}
+    ).scalar()
+    foreign_keys = conn.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+    ), {"table": table}).all()
+    # Partitions' own copies of the indexes come back with the parent's
+    indexes = conn.execute(text(
+        "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+        "LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.contype = 'p' "
+        "WHERE i.indrelid = to_regclass(:table) AND c.oid IS NULL"
+    ), {"table": table}).scalars().all()
+
+    # Old partitions keep their names when the parent is renamed
+    old_partitions = conn.execute(text(
+        "SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars().all()
+    for partition in old_partitions:
+        conn.execute(text(f"ALTER TABLE {partition} RENAME TO {partition.split('.')[-1]}_old"))
+    conn.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+    partition_by = " PARTITION BY HASH (user_id)" if partitions else ""
+    conn.execute(text(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){partition_by}"
+    ))
+    for remainder in range(partitions):
+        conn.execute(text(
+            f"CREATE TABLE {table}_p{remainder} PARTITION OF {table} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
+
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {old}"))
+    # The sequence belongs to the old table's column and would be dropped with it
+    conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    conn.execute(text(f"DROP TABLE {old}"))
+
+    primary_key = "id, user_id" if partitions else "id"
+    conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})"))
+    for name, definition in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+    for definition in indexes:
+        # Read before the rename, so they are on the new table
+        conn.execute(text(definition))
+    conn.execute(text(f"ANALYZE {table}"))
+
+
+def partition_tables(conn, partitions: int) -> dict:
+    """
+    Bring every transaction table to the given partition count (0 for
+    plain tables) on a PostgreSQL connection. Returns each table's count
+    before and after.
+    """
+    report = {}
+    for table in TABLES:
+        before = partition_count(conn, table)
+        if before != partitions:
+            logger.info("Rebuilding %s: %d -> %d partitions", table, before, partitions)
+            _rebuild(conn, table, partitions)
+        report[table] = {"before": before, "after": partitions}
+    return report
+
+
+if __name__ == "__main__":
+    from database import MIGRATION_LOCK_ID, engine
+
+    parser = argparse.ArgumentParser(description="Hash-partition the transaction tables by user_id (PostgreSQL)")
+    parser.add_argument(
+        "--partitions", type=int,
+        help="rebuild with this many partitions, 0 for plain tables (default: only report)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if engine.dialect.name != "postgresql":
+        parser.error("partitioning needs PostgreSQL")
+    if args.partitions is not None and args.partitions < 0:
+        parser.error("--partitions must be 0 or more")
+
+    with engine.begin() as conn:
+        if args.partitions is None:
+            report = {table: partition_count(conn, table) for table in TABLES}
+        else:
+            # Waits for, and blocks, migrations run by starting API workers
+            conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+            report = partition_tables(conn, args.partitions)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,105 @@
+"""
+Asset portfolio summary.
+
+For each of a user's assets: progress towards its target amount, how many
+savings are linked to it, the average monthly contribution over a trailing
+window and the next scheduled contribution. Two queries regardless of the
+number of assets: the assets with their savings counts (one GROUP BY over
+the hot and archived savings), and the linked savings that can occur in
+the window or later. Recurrences are then expanded in Python.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from budget import occurrence_dates
+from models import Asset, AssetResponse, RecurrenceType
+from money import from_minor_units
+from queries import linked_savings
+
+# Trailing window of the average monthly contribution
+ASSET_SUMMARY_MONTHS = 12
+
+
+def _next_occurrence(saving, today: date) -> Optional[date]:
+    if saving.date >= today:
+        return saving.date
+    if saving.recurrence_type == RecurrenceType.NONE:
+        return None
+    # Every recurrence occurs at least once a year while it lasts
+    return next(occurrence_dates(saving, today, today + relativedelta(years=1)), None)
+
+
+def _progress(contributed: int, amount: int) -> Optional[float]:
+    return round(contributed * 100 / amount, 2) if amount > 0 else None
+
+
+def build_asset_summary(
+    session: Session,
+    user_id: int,
+    months: int = ASSET_SUMMARY_MONTHS,
+    today: Optional[date] = None
+) -> dict:
+    """The /api/assets/summary payload for a user."""
+    today = today or date.today()
+    window_start = today - relativedelta(months=months) + timedelta(days=1)
+
+    linked = linked_savings(user_id)
+    counts = (
+        select(linked.c.asset_id, func.count().label("savings_count"))
+        .group_by(linked.c.asset_id)
+        .subquery()
+    )
+    assets = session.exec(
+        select(Asset, func.coalesce(counts.c.savings_count, 0))
+        .outerjoin(counts, counts.c.asset_id == Asset.id)
+        .where(Asset.user_id == user_id)
+        .order_by(Asset.id)
+    ).all()
+
+    savings_by_asset = defaultdict(list)
+    relevant = linked_savings(user_id, since=window_start)
+    for saving in session.execute(select(*relevant.c)):
+        savings_by_asset[saving.asset_id].append(saving)
+
+    summaries = []
+    for asset, savings_count in assets:
+        savings = savings_by_asset[asset.id]
+        trailing_total = sum(
+            saving.amount * len(list(occurrence_dates(saving, window_start, today)))
+            for saving in savings
+        )
+
+        next_contribution = None
+        upcoming = [(_next_occurrence(saving, today), saving.amount) for saving in savings]
+        upcoming_dates = [occurs for occurs, _ in upcoming if occurs is not None]
+        if upcoming_dates:
+            next_date = min(upcoming_dates)
+            next_contribution = {
+                "date": next_date,
+                "amount": from_minor_units(sum(amount for occurs, amount in upcoming if occurs == next_date)),
+            }
+
+        summaries.append({
+            **AssetResponse.model_validate(asset).model_dump(),
+            "progress_percent": _progress(asset.contributed, asset.amount),
+            "savings_count": savings_count,
+            "average_monthly_contribution": from_minor_units(round(trailing_total / months)),
+            "next_contribution": next_contribution,
+        })
+
+    total_amount = sum(asset.amount for asset, _ in assets)
+    total_contributed = sum(asset.contributed for asset, _ in assets)
+    return {
+        "as_of": today,
+        "trailing_months": months,
+        "total_amount": from_minor_units(total_amount),
+        "total_contributed": from_minor_units(total_contributed),
+        "progress_percent": _progress(total_contributed, total_amount),
+        "assets": summaries,
+    }
@@ -0,0 +1,316 @@
+"""
+Production diagnostics: on-demand request profiling and a slow-query log.
+
+Request profiling is opt-in per request and restricted to administrators.
+Sending `X-Profile: 1` (or `?profile=1`) with an admin token samples the
+handler's thread stack every PROFILE_INTERVAL_MS while it runs. The result
+is kept in a small in-memory ring and its id returned in the `X-Profile-Id`
+response header; fetch it from /api/admin/profiles/{id}.
+
+The slow-query log records every statement slower than SLOW_QUERY_MS as a
+single JSON line on the `nassets.slow_query` logger, with the SQL text, the
+shape (not the values) of its parameters, its duration and the route that
+issued it.
+"""
+
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Optional
+import asyncio
+import contextlib
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger("nassets.slow_query")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_STORE_SIZE = int(os.getenv("PROFILE_STORE_SIZE", "50"))
+PROFILE_TOP_STACKS = 50
+
+# ASGI scope of the request being handled, for attributing queries to routes
+current_scope: ContextVar[Optional[dict]] = ContextVar("current_scope", default=None)
+# Profiler attached to the request being handled, if profiling was requested
+current_profiler: ContextVar[Optional["SamplingProfiler"]] = ContextVar("current_profiler", default=None)
+
+
+def describe_route(scope: Optional[dict]) -> dict:
+    if scope is None:
+        return {"route": None, "endpoint": None}
+    endpoint = scope.get("endpoint")
+    return {
+        "route": f"{scope.get('method', '')} {scope.get('path', '')}".strip(),
+        "endpoint": getattr(endpoint, "__name__", None),
+    }
+
+
+# Request profiling
+class SamplingProfiler:
+    """Samples the stacks of the threads running one request's handler."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._thread_ids: set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> float:
+        """Stop sampling and return the wall time profiled, in milliseconds."""
+        self._stop.set()
+        self._sampler.join()
+        return (time.perf_counter() - self._started) * 1000
+
+    @contextlib.contextmanager
+    def attach_current_thread(self):
+        """Sample the calling thread until the block exits."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._thread_ids.add(thread_id)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._thread_ids.discard(thread_id)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                thread_ids = list(self._thread_ids)
+            if not thread_ids:
+                continue
+
+            frames = sys._current_frames()
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+                    self.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def report(self, duration_ms: float) -> dict:
+        leaf_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+
+        return {
+            "duration_ms": round(duration_ms, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "top_frames": [
+                {"frame": frame, "samples": count} for frame, count in leaf_counts.most_common(20)
+            ],
+            # Collapsed stacks, root first; feed to flamegraph tooling as "stack count" lines
+            "stacks": [
+                {"stack": stack, "samples": count} for stack, count in self.stacks.most_common(PROFILE_TOP_STACKS)
+            ],
+        }
+
+
+class ProfileStore:
+    """Bounded in-memory store of recent request profiles."""
+
+    def __init__(self, size: int = PROFILE_STORE_SIZE):
+        self._profiles: deque = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, profile: dict) -> int:
+        with self._lock:
+            profile_id = next(self._ids)
+            self._profiles.append({"id": profile_id, **profile})
+            return profile_id
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        with self._lock:
+            return next((p for p in self._profiles if p["id"] == profile_id), None)
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return [
+                {key: p[key] for key in ("id", "route", "endpoint", "recorded_at", "duration_ms", "samples")}
+                for p in reversed(self._profiles)
+            ]
+
+
+profile_store = ProfileStore()
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute that lets an active request profiler see the handler's thread.
+
+    Sync handlers run in the threadpool, so the endpoint is wrapped to
+    register its thread with the profiler for the duration of the call.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+        if call is not None and not _is_async(call):
+            self.dependant.call = _attach_profiler(call)
+
+
+def _is_async(call) -> bool:
+    return asyncio.iscoroutinefunction(call) or inspect.isasyncgenfunction(call)
+
+
+def _attach_profiler(call):
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        profiler = current_profiler.get()
+        if profiler is None:
+            return call(*args, **kwargs)
+        with profiler.attach_current_thread():
+            return call(*args, **kwargs)
+    return wrapper
+
+
+def _profiling_requested(scope: dict) -> bool:
+    headers = dict(scope.get("headers") or [])
+    if headers.get(b"x-profile", b"").lower() in (b"1", b"true"):
+        return True
+    query = scope.get("query_string", b"").decode("latin-1")
+    return any(part in ("profile=1", "profile=true") for part in query.split("&"))
+
+
+def _bearer_token(scope: dict) -> Optional[str]:
+    headers = dict(scope.get("headers") or [])
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+class DiagnosticsMiddleware:
+    """
+    ASGI middleware recording the request scope for the slow-query log and
+    running the sampling profiler on requests that ask for it.
+
+    `authorize` receives the request's bearer token and decides whether the
+    caller may profile; requests it rejects run unprofiled.
+    """
+
+    def __init__(self, app, authorize: Callable[[str], bool]):
+        self.app = app
+        self.authorize = authorize
+
+    def _may_profile(self, scope: dict) -> bool:
+        if not _profiling_requested(scope):
+            return False
+        token = _bearer_token(scope)
+        return token is not None and self.authorize(token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        scope_token = current_scope.set(scope)
+        try:
+            if not self._may_profile(scope):
+                await self.app(scope, receive, send)
+                return
+
+            profiler = SamplingProfiler()
+            profiler_token = current_profiler.set(profiler)
+            profile_id = None
+
+            async def send_with_profile_id(message):
+                nonlocal profile_id
+                if message["type"] == "http.response.start":
+                    profile_id = _finish_profile(profiler, scope)
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", str(profile_id).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            profiler.start()
+            try:
+                await self.app(scope, receive, send_with_profile_id)
+            finally:
+                current_profiler.reset(profiler_token)
+                if profile_id is None:
+                    _finish_profile(profiler, scope)
+        finally:
+            current_scope.reset(scope_token)
+
+
+def _finish_profile(profiler: SamplingProfiler, scope: dict) -> int:
+    duration_ms = profiler.stop()
+    return profile_store.add({
+        **describe_route(scope),
+        "recorded_at": datetime.utcnow().isoformat(),
+        **profiler.report(duration_ms),
+    })
+
+
+# Slow-query log
+def _parameters_shape(parameters, executemany: bool):
+    def shape(params):
+        if isinstance(params, dict):
+            return {key: type(value).__name__ for key, value in params.items()}
+        if isinstance(params, (list, tuple)):
+            return [type(value).__name__ for value in params]
+        return type(params).__name__
+
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": shape(rows[0]) if rows else None}
+    return shape(parameters)
+
+
+def install_slow_query_log(engine: Engine, threshold_ms: float = SLOW_QUERY_MS) -> None:
+    """Log statements on this engine that take at least threshold_ms."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start_time"):
+            connection.info["query_start_time"].pop()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _log_slow_query(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+        if duration_ms < threshold_ms:
+            return
+
+        slow_query_logger.warning(json.dumps({
+            "event": "slow_query",
+            "duration_ms": round(duration_ms, 3),
+            "statement": " ".join(statement.split()),
+            "parameters": _parameters_shape(parameters, executemany),
+            "database": engine.url.render_as_string(hide_password=True).rsplit("@", 1)[-1],
+            **describe_route(current_scope.get()),
+        }, default=str))
@@ -0,0 +1,181 @@
+"""
+Read-path data access for the calendar and budget endpoints.
+
+Fetches incomes, expenses and savings for one or more users in a single
+UNION ALL statement, projecting only the columns the caller needs and
+returning lightweight named tuples instead of hydrated SQLModel instances.
+The same queries run against the archive tables for archived history,
+and linked_savings is the subquery of asset-linked savings shared by the
+asset summary and contribution reconciliation.
+"""
+
+from collections import namedtuple
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, cast, literal, null, or_, union_all
+from sqlmodel import Session, select
+
+from models import (
+    Income, Expense, Saving, RecurrenceType,
+    income_archive, expense_archive, saving_archive
+)
+
+KIND_MODELS = {
+    "income": Income,
+    "expense": Expense,
+    "saving": Saving,
+}
+
+KIND_ARCHIVES = {
+    "income": income_archive,
+    "expense": expense_archive,
+    "saving": saving_archive,
+}
+
+# Columns of each kind returned to clients in /api/calendar items
+CALENDAR_COLUMNS = {
+    "income": (
+        "id", "user_id", "title", "amount", "date",
+        "recurrence_type", "recurrence_end_date", "description"
+    ),
+    "expense": (
+        "id", "user_id", "title", "amount", "date", "category",
+        "recurrence_type", "recurrence_end_date", "description"
+    ),
+    "saving": (
+        "id", "user_id", "asset_id", "title", "amount", "date",
+        "recurrence_type", "recurrence_end_date", "description", "percentage"
+    ),
+}
+
+# Columns needed to expand recurrences and aggregate amounts
+SUMMARY_COLUMNS = {
+    kind: ("user_id", "amount", "date", "recurrence_type", "recurrence_end_date")
+    for kind in KIND_MODELS
+}
+
+_row_types: dict[tuple[str, tuple[str, ...]], type] = {}
+
+
+def _row_type(kind: str, columns: tuple[str, ...]) -> type:
+    key = (kind, columns)
+    if key not in _row_types:
+        _row_types[key] = namedtuple(f"{kind.title()}Row", columns)
+    return _row_types[key]
+
+
+def fetch_transactions(
+    session: Session,
+    user_ids: Iterable[int],
+    columns: dict[str, tuple[str, ...]] = CALENDAR_COLUMNS,
+    archived: bool = False
+) -> dict[str, list]:
+    """
+    Fetch the given users' rows of every kind in one round trip.
+
+    `columns` maps each kind to the columns to project. Columns a kind does
+    not have are selected as typed NULLs so the branches line up, and are
+    dropped again when building that kind's tuples. With `archived`, rows
+    come from the archive tables instead of the hot ones.
+
+    Returns {"income": [...], "expense": [...], "saving": [...]} with rows in
+    primary key order within each kind.
+    """
+    user_ids = list(user_ids)
+    tables = {
+        kind: KIND_ARCHIVES[kind] if archived else model.__table__
+        for kind, model in KIND_MODELS.items()
+    }
+    all_columns: list[str] = []
+    for kind_columns in columns.values():
+        all_columns.extend(c for c in kind_columns if c not in all_columns)
+
+    column_types = {}
+    for table in tables.values():
+        for name in all_columns:
+            if name not in column_types and name in table.c:
+                column_types[name] = table.c[name].type
+
+    branches = []
+    for kind, kind_columns in columns.items():
+        table = tables[kind]
+        projected = [literal(kind).label("kind")]
+        for name in all_columns:
+            if name in kind_columns:
+                projected.append(table.c[name].label(name))
+            else:
+                projected.append(cast(null(), column_types[name]).label(name))
+        branches.append(
+            select(*projected).where(table.c.user_id.in_(user_ids))
+        )
+
+    statement = union_all(*branches)
+    if "id" in all_columns:
+        statement = statement.order_by("kind", "id")
+
+    results: dict[str, list] = {kind: [] for kind in columns}
+    positions = {
+        kind: [all_columns.index(c) + 1 for c in kind_columns]
+        for kind, kind_columns in columns.items()
+    }
+    row_types = {kind: _row_type(kind, kind_columns) for kind, kind_columns in columns.items()}
+
+    for row in session.exec(statement):
+        kind = row[0]
+        results[kind].append(row_types[kind]._make(row[i] for i in positions[kind]))
+    return results
+
+
+def fetch_history(
+    session: Session,
+    user_ids: Iterable[int],
+    columns: dict[str, tuple[str, ...]] = CALENDAR_COLUMNS
+) -> dict[str, list]:
+    """
+    Like fetch_transactions, but including archived rows, for months before
+    the users' archive cutoff. Costs a second round trip.
+    """
+    user_ids = list(user_ids)
+    hot = fetch_transactions(session, user_ids, columns)
+    archived = fetch_transactions(session, user_ids, columns, archived=True)
+    results = {kind: hot[kind] + archived[kind] for kind in hot}
+    if all("id" in kind_columns for kind_columns in columns.values()):
+        for rows in results.values():
+            rows.sort(key=lambda row: row.id)
+    return results
+
+
+def linked_savings(
+    user_id: Optional[int] = None,
+    asset_id: Optional[int] = None,
+    since: Optional[date] = None
+):
+    """
+    The savings linked to an asset, hot and archived, as a subquery of
+    asset_id, amount, date, recurrence_type and recurrence_end_date.
+
+    Optionally restricted to one user, one asset, and rows that can still
+    occur on or after `since`.
+    """
+    branches = []
+    for table in (Saving.__table__, saving_archive):
+        branch = select(
+            table.c.asset_id, table.c.amount, table.c.date,
+            table.c.recurrence_type, table.c.recurrence_end_date
+        ).where(table.c.asset_id.is_not(None))
+        if user_id is not None:
+            branch = branch.where(table.c.user_id == user_id)
+        if asset_id is not None:
+            branch = branch.where(table.c.asset_id == asset_id)
+        if since is not None:
+            # Rows with no occurrence on or after `since` cannot contribute
+            branch = branch.where(or_(
+                and_(table.c.recurrence_type == RecurrenceType.NONE, table.c.date >= since),
+                and_(
+                    table.c.recurrence_type != RecurrenceType.NONE,
+                    or_(table.c.recurrence_end_date.is_(None), table.c.recurrence_end_date >= since)
+                )
+            ))
+        branches.append(branch)
+    return union_all(*branches).subquery()
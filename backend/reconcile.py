@@ -0,0 +1,171 @@
+"""
+Reconciliation of Asset.contributed.
+
+contributed is a running total that the saving handlers adjust row by row,
+so it drifts whenever a write fails partway or a saving moves between
+assets. Its correct value is opening_contributed (the amount set when the
+asset was created or last edited by hand, less its savings at that time)
+plus the sum of the asset's savings, archived ones included.
+
+Reconciliation finds the drifted assets with one GROUP BY over savings and
+writes the corrections back in batches (one UPDATE ... FROM (VALUES ...)
+per batch on PostgreSQL). Run it nightly:
+
+    python reconcile.py               # every asset
+    python reconcile.py --user-id 42  # one user's assets
+    python reconcile.py --dry-run     # report only
+
+It is also available per user at POST /api/assets/reconcile and for every
+user at POST /api/admin/reconcile.
+"""
+
+from typing import Iterable, Optional
+import argparse
+import json
+import logging
+import os
+
+from sqlalchemy import BigInteger, Integer, bindparam, column, func, update, values
+from sqlmodel import Session, select
+
+from models import Asset
+from money import from_minor_units
+from queries import linked_savings
+
+logger = logging.getLogger("nassets.reconcile")
+
+RECONCILE_BATCH_SIZE = int(os.getenv("RECONCILE_BATCH_SIZE", "1000"))
+# Drifted assets listed individually in a report; the totals cover all of them
+RECONCILE_REPORT_LIMIT = 100
+
+
+def linked_savings_total(session: Session, asset_id: int) -> int:
+    """Sum of the amounts of the savings linked to an asset, in minor units."""
+    linked = linked_savings(asset_id=asset_id)
+    return int(session.exec(select(func.coalesce(func.sum(linked.c.amount), 0))).one())
+
+
+def find_drift(session: Session, user_id: Optional[int] = None) -> list:
+    """
+    Assets whose recorded contribution differs from the one implied by
+    their savings, as rows of (asset_id, user_id, recorded, expected).
+    """
+    linked = linked_savings(user_id)
+    totals = (
+        select(linked.c.asset_id, func.sum(linked.c.amount).label("total"))
+        .group_by(linked.c.asset_id)
+        .subquery()
+    )
+
+    expected = Asset.opening_contributed + func.coalesce(totals.c.total, 0)
+    statement = (
+        select(Asset.id, Asset.user_id, Asset.contributed, expected.label("expected"))
+        .outerjoin(totals, totals.c.asset_id == Asset.id)
+        .where(Asset.contributed != expected)
+        .order_by(Asset.id)
+    )
+    if user_id is not None:
+        statement = statement.where(Asset.user_id == user_id)
+    return session.exec(statement).all()
+
+
+def _batches(rows: list, size: int) -> Iterable[list]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def apply_corrections(session: Session, drifted: list, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """
+    Write the expected contributions back in batches. A row is only updated
+    if it still holds the value that was read, so a saving written meanwhile
+    is never overwritten; the next run picks that asset up again.
+
+    Returns the number of assets corrected.
+    """
+    corrected = 0
+    for batch in _batches(drifted, batch_size):
+        rows = [(row.id, row.contributed, int(row.expected)) for row in batch]
+        if session.get_bind().dialect.name == "postgresql":
+            corrected += _update_from_values(session, rows)
+        else:
+            corrected += _update_many(session, rows)
+    return corrected
+
+
+def _update_from_values(session: Session, rows: list[tuple[int, int, int]]) -> int:
+    """One UPDATE ... FROM (VALUES ...) statement for the whole batch."""
+    corrections = values(
+        column("asset_id", Integer),
+        column("recorded", BigInteger),
+        column("expected", BigInteger),
+        name="corrections",
+    ).data(rows)
+
+    statement = (
+        update(Asset)
+        .where(Asset.id == corrections.c.asset_id, Asset.contributed == corrections.c.recorded)
+        .values(contributed=corrections.c.expected)
+        .execution_options(synchronize_session=False)
+    )
+    return session.execute(statement).rowcount
+
+
+def _update_many(session: Session, rows: list[tuple[int, int, int]]) -> int:
+    """The same guarded update as an executemany, for SQLite."""
+    assets = Asset.__table__
+    statement = (
+        update(assets)
+        .where(assets.c.id == bindparam("asset_id"), assets.c.contributed == bindparam("recorded"))
+        .values(contributed=bindparam("expected"))
+    )
+    params = [{"asset_id": a, "recorded": r, "expected": e} for a, r, e in rows]
+    return session.execute(statement, params).rowcount
+
+
+def reconcile_contributions(session: Session, user_id: Optional[int] = None, dry_run: bool = False) -> dict:
+    """
+    Recompute Asset.contributed for every asset, or one user's, and report
+    the drift found. Commits the corrections unless dry_run is set.
+    """
+    drifted = find_drift(session, user_id)
+    corrected = 0
+    if drifted and not dry_run:
+        corrected = apply_corrections(session, drifted)
+        session.commit()
+
+    drift_total = sum(int(row.expected) - row.contributed for row in drifted)
+    report = {
+        "user_id": user_id,
+        "dry_run": dry_run,
+        "assets_drifted": len(drifted),
+        "assets_corrected": corrected,
+        "net_drift": from_minor_units(drift_total),
+        "assets": [
+            {
+                "asset_id": row.id,
+                "user_id": row.user_id,
+                "recorded": from_minor_units(row.contributed),
+                "expected": from_minor_units(int(row.expected)),
+                "drift": from_minor_units(int(row.expected) - row.contributed),
+            }
+            for row in drifted[:RECONCILE_REPORT_LIMIT]
+        ],
+    }
+    logger.info(
+        "Reconciled contributions: %d drifted, %d corrected, net drift %s",
+        len(drifted), corrected, report["net_drift"]
+    )
+    return report
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Recompute Asset.contributed from savings")
+    parser.add_argument("--user-id", type=int, help="only reconcile this user's assets")
+    parser.add_argument("--dry-run", action="store_true", help="report drift without correcting it")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with Session(engine) as session:
+        print(json.dumps(reconcile_contributions(session, args.user_id, args.dry_run), indent=2))
@@ -0,0 +1,205 @@
+"""
+In-database recurrence expansion for the budget summary (PostgreSQL only).
+
+With RECURRENCE_ENGINE=postgres, /api/budget/summary expands recurring
+incomes, expenses and savings inside PostgreSQL with generate_series and
+fetches one aggregated row per (kind, day) instead of every item, so heavy
+users no longer pay for the expansion in Python. Any other dialect keeps
+using the Python engine in budget.py.
+
+generate_series steps a timestamp by adding the interval to the previous
+value, just like occurrence_dates adds a relativedelta, so monthly and
+yearly rules drift after short months in the same way (Jan 31, Feb 29,
+Mar 29, ...). Daily and weekly series start at their first occurrence in
+the window rather than at the item's date, which skips the history without
+changing the result.
+
+tests/test_recurrence_sql.py checks that both engines agree on fixed edge
+cases (run with TEST_POSTGRES_URL set). Compare them on real data before
+switching:
+
+    python recurrence_sql.py --from 2024-01 --to 2026-12
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+import argparse
+import os
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from budget import build_budget_summary, month_bounds, summary_from_daily_totals
+from models import RecurrenceType
+
+# "python" (default) or "postgres"
+RECURRENCE_ENGINE = os.getenv("RECURRENCE_ENGINE", "python").lower()
+
+# Recurrence types are stored by enum name
+_ITEMS_BRANCH = """
+    SELECT '{kind}' AS kind, amount, "date", CAST(recurrence_type AS text) AS recurrence,
+           recurrence_end_date
+    FROM {table}
+    WHERE user_id = :user_id AND "date" <= :end_date
+"""
+
+DAILY_TOTALS_SQL = text(f"""
+WITH items AS (
+    {_ITEMS_BRANCH.format(kind="income", table="incomes")}
+    UNION ALL
+    {_ITEMS_BRANCH.format(kind="expense", table="expenses")}
+    UNION ALL
+    {_ITEMS_BRANCH.format(kind="saving", table="savings")}
+),
+occurrences AS (
+    SELECT kind, amount, CAST("date" AS timestamp) AS occurrence
+    FROM items
+    WHERE recurrence = :none AND "date" >= :start_date
+    UNION ALL
+    SELECT kind, amount, series.occurrence
+    FROM items
+    CROSS JOIN LATERAL generate_series(
+        CAST(CASE recurrence
+            WHEN :daily THEN GREATEST("date", :start_date)
+            WHEN :weekly THEN "date" + (GREATEST(:start_date - "date", 0) + 6) / 7 * 7
+            ELSE "date"
+        END AS timestamp),
+        CAST(LEAST(COALESCE(recurrence_end_date, :end_date), :end_date) AS timestamp),
+        CASE recurrence
+            WHEN :daily THEN INTERVAL '1 day'
+            WHEN :weekly THEN INTERVAL '7 days'
+            WHEN :monthly THEN INTERVAL '1 month'
+            ELSE INTERVAL '1 year'
+        END
+    ) AS series(occurrence)
+    WHERE recurrence <> :none
+)
+SELECT kind, CAST(EXTRACT(DAY FROM occurrence) AS integer) AS day, SUM(amount) AS total
+FROM occurrences
+WHERE occurrence >= :start_date
+GROUP BY kind, day
+""").bindparams(
+    none=RecurrenceType.NONE.name,
+    daily=RecurrenceType.DAILY.name,
+    weekly=RecurrenceType.WEEKLY.name,
+    monthly=RecurrenceType.MONTHLY.name,
+)
+
+
+def database_engine_enabled(session: Session) -> bool:
+    """Whether summaries for this session should be computed in the database."""
+    return RECURRENCE_ENGINE == "postgres" and session.get_bind().dialect.name == "postgresql"
+
+
+def daily_totals(session: Session, user_id: int, start_date: date, end_date: date) -> dict[str, dict[int, int]]:
+    """
+    Per-day totals, in minor units, of each kind's occurrences within one
+    calendar month.
+
+    Returns {"income": {day: total}, "expense": {...}, "saving": {...}};
+    days without occurrences are absent. The window must not span months,
+    since days are keyed by day of month.
+    """
+    totals: dict[str, dict[int, int]] = {"income": {}, "expense": {}, "saving": {}}
+    rows = session.execute(DAILY_TOTALS_SQL, {
+        "user_id": user_id,
+        "start_date": start_date,
+        "end_date": end_date,
+    })
+    for kind, day, total in rows:
+        # SUM over BIGINT comes back as NUMERIC
+        totals[kind][day] = int(total)
+    return totals
+
+
+def build_budget_summary_in_database(session: Session, user_id: int, year: int, month: int) -> dict:
+    """The /api/budget/summary payload, with recurrences expanded by PostgreSQL."""
+    start_date, end_date = month_bounds(year, month)
+    totals = daily_totals(session, user_id, start_date, end_date)
+    return summary_from_daily_totals(totals["income"], totals["expense"], totals["saving"], year, month)
+
+
+# Engine comparison
+def _months_between(first: tuple[int, int], last: tuple[int, int]) -> list[tuple[int, int]]:
+    months = []
+    year, month = first
+    while (year, month) <= last:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def compare_engines(session: Session, user_ids: list[int], months: list[tuple[int, int]]) -> dict:
+    """
+    Build every (user, month) summary with both engines and report the
+    mismatches and the time each engine spent.
+    """
+    from queries import fetch_transactions, SUMMARY_COLUMNS
+
+    timings = defaultdict(float)
+    mismatches = []
+
+    for user_id in user_ids:
+        started = time.perf_counter()
+        rows = fetch_transactions(session, [user_id], SUMMARY_COLUMNS)
+        python_summaries = {
+            (year, month): build_budget_summary(rows["income"], rows["expense"], rows["saving"], year, month)
+            for year, month in months
+        }
+        timings["python"] += time.perf_counter() - started
+
+        for year, month in months:
+            started = time.perf_counter()
+            database_summary = build_budget_summary_in_database(session, user_id, year, month)
+            timings["postgres"] += time.perf_counter() - started
+
+            # Amounts are summed as integers, so both engines must agree exactly
+            if python_summaries[(year, month)] != database_summary:
+                mismatches.append({"user_id": user_id, "year": year, "month": month})
+
+    return {
+        "users": len(user_ids),
+        "months": len(months),
+        "mismatches": mismatches,
+        "python_ms": round(timings["python"] * 1000, 3),
+        "postgres_ms": round(timings["postgres"] * 1000, 3),
+    }
+
+
+def _parse_month(value: str) -> tuple[int, int]:
+    year, month = value.split("-")
+    return int(year), int(month)
+
+
+if __name__ == "__main__":
+    from sqlmodel import select
+
+    from database import engine
+    from models import User
+
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Compare the Python and PostgreSQL recurrence engines")
+    parser.add_argument("--from", dest="first", type=_parse_month, default=(today.year - 1, 1),
+                        help="first month, YYYY-MM (default: January last year)")
+    parser.add_argument("--to", dest="last", type=_parse_month, default=(today.year + 1, 12),
+                        help="last month, YYYY-MM (default: December next year)")
+    parser.add_argument("--user-id", type=int, action="append", help="limit to these users")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        if session.get_bind().dialect.name != "postgresql":
+            parser.error("the database engine requires PostgreSQL")
+        user_ids: Optional[list[int]] = args.user_id
+        if not user_ids:
+            user_ids = list(session.exec(select(User.id).order_by(User.id)).all())
+
+        report = compare_engines(session, user_ids, _months_between(args.first, args.last))
+
+    for mismatch in report["mismatches"]:
+        print(f"mismatch: user {mismatch['user_id']} {mismatch['year']}-{mismatch['month']:02d}")
+    print(
+        f"{report['users']} users x {report['months']} months, {len(report['mismatches'])} mismatches; "
+        f"python {report['python_ms']} ms, postgres {report['postgres_ms']} ms"
+    )
@@ -0,0 +1,180 @@
+"""
+What-if evaluation of budget scenarios.
+
+A scenario is a list of hypothetical changes to the user's rows: add a
+transaction, remove one, or scale one (or every row of a kind) by a
+factor. Any number of scenarios are evaluated in one call without writing
+anything, so views and caches stay valid.
+
+The user's rows are expanded over the window once and summed into per-day
+and per-month base totals shared by every scenario. A scenario is then a
+sparse set of per-day deltas from the occurrences it changes, and its
+results are the base totals plus those deltas; its cost does not depend on
+how many rows it leaves alone.
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+
+from sqlmodel import Session
+
+from archive import get_archived_before, get_transaction
+from budget import month_bounds, occurrence_dates
+from models import ScenarioAction, ScenarioChange, ScenarioRequest
+from money import from_minor_units
+from queries import fetch_history, fetch_transactions, KIND_MODELS
+
+SCENARIO_COLUMNS = {
+    kind: ("id", "amount", "date", "recurrence_type", "recurrence_end_date")
+    for kind in ("income", "expense", "saving")
+}
+
+# Effect of each kind on the running balance
+BALANCE_SIGNS = {"income": 1, "expense": -1, "saving": -1}
+
+
+class _Window:
+    """The evaluated days, with the month each one falls in."""
+
+    def __init__(self, year: int, month: int, months: int):
+        self.start = date(year, month, 1)
+        last = self.start + relativedelta(months=months - 1)
+        self.end = month_bounds(last.year, last.month)[1]
+        firsts = [self.start + relativedelta(months=i) for i in range(months)]
+        self.months = [(first.year, first.month) for first in firsts]
+        self.days = (self.end - self.start).days + 1
+        self.month_of_day = [
+            (day.year - self.start.year) * 12 + day.month - self.start.month
+            for day in (self.start + timedelta(days=i) for i in range(self.days))
+        ]
+
+    def day_indexes(self, item) -> list[int]:
+        return [(occurrence - self.start).days for occurrence in occurrence_dates(item, self.start, self.end)]
+
+
+class _Totals:
+    """Per-day net amounts and per-month totals by kind, in minor units."""
+
+    def __init__(self, window: _Window, sparse: bool = False):
+        self.window = window
+        self.daily = defaultdict(int) if sparse else [0] * window.days
+        self.monthly = {
+            kind: defaultdict(int) if sparse else [0] * len(window.months)
+            for kind in BALANCE_SIGNS
+        }
+
+    def add(self, kind: str, amount: int, day_indexes: list[int]) -> None:
+        signed = BALANCE_SIGNS[kind] * amount
+        for index in day_indexes:
+            self.daily[index] += signed
+            self.monthly[kind][self.window.month_of_day[index]] += amount
+
+
+def _apply(base: dict, change: ScenarioChange, amounts: dict, delta: _Totals) -> None:
+    """Add the change to delta; amounts holds the scenario's current amount per row."""
+    kind = change.kind.value
+    if change.action == ScenarioAction.ADD:
+        delta.add(kind, change.amount, delta.window.day_indexes(change))
+        return
+
+    if change.id is not None:
+        if (kind, change.id) not in base:
+            raise ValueError(f"{kind} {change.id} not found")
+        keys = [(kind, change.id)]
+    else:
+        keys = [key for key in base if key[0] == kind]
+
+    for key in keys:
+        current = amounts.get(key, base[key][0])
+        if change.action == ScenarioAction.REMOVE:
+            new = 0
+        else:
+            new = round(current * change.factor)
+        amounts[key] = new
+        delta.add(kind, new - current, base[key][1])
+
+
+def _result(name: str, window: _Window, base: _Totals, opening_balance: int, delta: _Totals = None) -> dict:
+    months = []
+    for i, (year, month) in enumerate(window.months):
+        totals = {
+            kind: base.monthly[kind][i] + (delta.monthly[kind].get(i, 0) if delta else 0)
+            for kind in BALANCE_SIGNS
+        }
+        months.append({
+            "year": year,
+            "month": month,
+            "total_income": from_minor_units(totals["income"]),
+            "total_expenses": from_minor_units(totals["expense"]),
+            "total_savings": from_minor_units(totals["saving"]),
+            "remaining": from_minor_units(totals["income"] - totals["expense"] - totals["saving"]),
+        })
+
+    balance = opening_balance
+    lowest, lowest_day = None, None
+    for i in range(window.days):
+        balance += base.daily[i] + (delta.daily.get(i, 0) if delta else 0)
+        if lowest is None or balance < lowest:
+            lowest, lowest_day = balance, i
+
+    return {
+        "name": name,
+        "months": months,
+        "lowest_balance": {
+            "date": window.start + timedelta(days=lowest_day),
+            "balance": from_minor_units(lowest),
+        },
+        "ending_balance": from_minor_units(balance),
+    }
+
+
+def evaluate_scenarios(session: Session, user_id: int, request: ScenarioRequest) -> dict:
+    """
+    Monthly totals and running balance of the user's budget as it is
+    (baseline) and under each scenario, over request.months months.
+    Raises ValueError if a change refers to a row the user does not have.
+    """
+    window = _Window(request.year, request.month, request.months)
+
+    archived_before = get_archived_before(session, user_id)
+    if archived_before is not None and window.start < archived_before:
+        rows = fetch_history(session, [user_id], SCENARIO_COLUMNS)
+    else:
+        rows = fetch_transactions(session, [user_id], SCENARIO_COLUMNS)
+
+    # One expansion of the user's rows, shared by every scenario
+    base = {}
+    base_totals = _Totals(window)
+    for kind, kind_rows in rows.items():
+        for row in kind_rows:
+            day_indexes = window.day_indexes(row)
+            base[(kind, row.id)] = (row.amount, day_indexes)
+            base_totals.add(kind, row.amount, day_indexes)
+
+    # Rows archived before the window are not fetched, but still exist;
+    # changing them changes nothing in the window
+    for scenario in request.scenarios:
+        for change in scenario.changes:
+            key = (change.kind.value, change.id)
+            if change.id is None or key in base:
+                continue
+            row = get_transaction(session, KIND_MODELS[key[0]], change.id, user_id)
+            if row is not None:
+                base[key] = (row.amount, [])
+
+    results = []
+    for scenario in request.scenarios:
+        delta = _Totals(window, sparse=True)
+        amounts = {}
+        for change in scenario.changes:
+            _apply(base, change, amounts, delta)
+        results.append(_result(scenario.name, window, base_totals, request.opening_balance, delta))
+
+    return {
+        "start": window.start,
+        "end": window.end,
+        "opening_balance": from_minor_units(request.opening_balance),
+        "baseline": _result("baseline", window, base_totals, request.opening_balance),
+        "scenarios": results,
+    }
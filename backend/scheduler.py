@@ -0,0 +1,305 @@
+"""
+Background precomputation of upcoming-month views.
+
+Builds the calendar and budget summary payloads for active users ahead of
+time and writes them to the view store, so the first dashboard load of a
+month (when every user crosses into it at once) is served from storage
+instead of recomputing recurrences on demand.
+
+Users are processed in batches across a process pool, with a cap on how
+many batches are in flight. Run it as a separate worker:
+
+    python scheduler.py            # loop forever, every PRECOMPUTE_INTERVAL_HOURS
+    python scheduler.py --once     # single run, e.g. from cron
+
+or set PRECOMPUTE_IN_PROCESS=true to start the loop inside the API process.
+Prefer the separate worker when running several uvicorn workers, since each
+of them would otherwise start its own loop.
+
+Progress is saved to precompute_runs, where /api/admin/precompute reads it
+whichever process runs the loop. A run that fails (e.g. because the
+database or its migrations are not ready yet) is retried after
+PRECOMPUTE_RETRY_SECONDS, doubling up to the regular interval.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+from typing import Iterable, Optional
+import argparse
+import logging
+import multiprocessing
+import os
+import threading
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlmodel import Session, delete, select
+
+from budget import build_budget_summary, build_calendar
+from database import engine
+from models import User, MonthlyView, PrecomputeRun
+from queries import fetch_transactions, CALENDAR_COLUMNS
+from view_store import get_data_versions, store_views, VIEW_CALENDAR, VIEW_SUMMARY
+
+logger = logging.getLogger("nassets.scheduler")
+
+PRECOMPUTE_BATCH_SIZE = int(os.getenv("PRECOMPUTE_BATCH_SIZE", "200"))
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", str(os.cpu_count() or 2)))
+PRECOMPUTE_MAX_IN_FLIGHT = int(os.getenv("PRECOMPUTE_MAX_IN_FLIGHT", str(PRECOMPUTE_WORKERS * 2)))
+PRECOMPUTE_INTERVAL_HOURS = float(os.getenv("PRECOMPUTE_INTERVAL_HOURS", "6"))
+PRECOMPUTE_RETRY_SECONDS = float(os.getenv("PRECOMPUTE_RETRY_SECONDS", "30"))
+
+# Runs kept in precompute_runs
+PRECOMPUTE_RUNS_KEPT = 20
+
+
+class PrecomputeProgress:
+    """
+    Counters for the current (or last) precompute run of this process,
+    saved to the run's precompute_runs row by save().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, months: Optional[list[tuple[int, int]]]) -> None:
+        with self._lock:
+            self.run_id: Optional[int] = None
+            self.months = months or []
+            self.running = months is not None
+            self.started_at: Optional[datetime] = datetime.utcnow() if months else None
+            self.finished_at: Optional[datetime] = None
+            self.users_total = 0
+            self.users_done = 0
+            self.views_written = 0
+            self.batches_total = 0
+            self.batches_done = 0
+            self.batches_failed = 0
+            self.last_error: Optional[str] = None
+
+    def update(self, **changes) -> None:
+        with self._lock:
+            for key, value in changes.items():
+                setattr(self, key, value)
+
+    def increment(self, **deltas) -> None:
+        with self._lock:
+            for key, value in deltas.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "months": [{"year": y, "month": m} for y, m in self.months],
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "users_total": self.users_total,
+                "users_done": self.users_done,
+                "views_written": self.views_written,
+                "batches_total": self.batches_total,
+                "batches_done": self.batches_done,
+                "batches_failed": self.batches_failed,
+                "last_error": self.last_error,
+            }
+
+    def save(self) -> None:
+        """Write the counters to the run's row, creating it on the first save."""
+        snapshot = self.snapshot()
+        with Session(engine) as session:
+            run = session.get(PrecomputeRun, self.run_id) if self.run_id is not None else None
+            if run is None:
+                # Runs of a scheduler that was stopped mid-run never finish
+                session.execute(
+                    update(PrecomputeRun)
+                    .where(PrecomputeRun.running == True)  # noqa: E712
+                    .values(running=False, last_error="interrupted")
+                )
+                run = PrecomputeRun(months=snapshot["months"])
+            for key, value in snapshot.items():
+                setattr(run, key, value)
+            session.add(run)
+            session.flush()
+            session.exec(delete(PrecomputeRun).where(PrecomputeRun.id <= run.id - PRECOMPUTE_RUNS_KEPT))
+            session.commit()
+            self.run_id = run.id
+
+
+progress = PrecomputeProgress()
+
+
+def load_progress(session: Session) -> dict:
+    """Progress of the latest precompute run, whichever process ran it."""
+    statement = select(PrecomputeRun).order_by(PrecomputeRun.id.desc())
+    run = session.exec(statement).first()
+    if run is None:
+        return PrecomputeProgress().snapshot()
+    return run.model_dump(exclude={"id"})
+
+
+def upcoming_months(today: Optional[date] = None) -> list[tuple[int, int]]:
+    """The current and next month, as (year, month) pairs."""
+    today = today or date.today()
+    following = today + relativedelta(months=1)
+    return [(today.year, today.month), (following.year, following.month)]
+
+
+def active_user_ids(session: Session) -> list[int]:
+    statement = select(User.id).where(User.is_active == True).order_by(User.id)  # noqa: E712
+    return list(session.exec(statement).all())
+
+
+def _group_by_user(rows) -> dict[int, list]:
+    grouped: dict[int, list] = {}
+    for row in rows:
+        grouped.setdefault(row.user_id, []).append(row)
+    return grouped
+
+
+def compute_batch(user_ids: list[int], months: list[tuple[int, int]]) -> int:
+    """
+    Precompute and store the views for one batch of users.
+
+    Runs in a pool process with its own connections. Data versions are read
+    before the rows, so a write that lands mid-batch leaves the stored view
+    tagged with the older version and it is never served.
+
+    Returns the number of views written.
+    """
+    with Session(engine) as session:
+        versions = get_data_versions(session, user_ids)
+
+        rows = fetch_transactions(session, user_ids, CALENDAR_COLUMNS)
+        incomes = _group_by_user(rows["income"])
+        expenses = _group_by_user(rows["expense"])
+        savings = _group_by_user(rows["saving"])
+
+        views = []
+        for user_id in user_ids:
+            user_rows = (incomes.get(user_id, []), expenses.get(user_id, []), savings.get(user_id, []))
+            for year, month in months:
+                payloads = {
+                    VIEW_CALENDAR: build_calendar(*user_rows, year, month),
+                    VIEW_SUMMARY: build_budget_summary(*user_rows, year, month),
+                }
+                for view, payload in payloads.items():
+                    views.append(MonthlyView(
+                        user_id=user_id,
+                        view=view,
+                        year=year,
+                        month=month,
+                        data_version=versions[user_id],
+                        payload=jsonable_encoder(payload)
+                    ))
+
+        store_views(session, views)
+        session.commit()
+        return len(views)
+
+
+def _batches(user_ids: list[int], batch_size: int) -> Iterable[list[int]]:
+    for start in range(0, len(user_ids), batch_size):
+        yield user_ids[start:start + batch_size]
+
+
+def precompute(
+    months: Optional[list[tuple[int, int]]] = None,
+    batch_size: int = PRECOMPUTE_BATCH_SIZE,
+    workers: int = PRECOMPUTE_WORKERS,
+    max_in_flight: int = PRECOMPUTE_MAX_IN_FLIGHT
+) -> dict:
+    """
+    Precompute views for all active users and return the run's progress.
+
+    At most max_in_flight batches are submitted to the pool at a time, which
+    bounds both memory and the number of concurrent DB connections.
+    """
+    months = months or upcoming_months()
+    progress.reset(months)
+
+    with Session(engine) as session:
+        user_ids = active_user_ids(session)
+
+    batches = list(_batches(user_ids, batch_size))
+    progress.update(users_total=len(user_ids), batches_total=len(batches))
+    progress.save()
+    logger.info("Precomputing %s for %d users in %d batches", months, len(user_ids), len(batches))
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = {}
+        remaining = iter(batches)
+
+        while True:
+            while len(pending) < max_in_flight:
+                batch = next(remaining, None)
+                if batch is None:
+                    break
+                pending[pool.submit(compute_batch, batch, months)] = batch
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = pending.pop(future)
+                try:
+                    written = future.result()
+                except Exception as exc:
+                    logger.exception("Precompute batch starting at user %d failed", batch[0])
+                    progress.increment(batches_failed=1)
+                    progress.update(last_error=repr(exc))
+                    continue
+                progress.increment(batches_done=1, users_done=len(batch), views_written=written)
+
+            progress.save()
+            snapshot = progress.snapshot()
+            logger.info(
+                "Precompute progress: %d/%d users, %d failed batches",
+                snapshot["users_done"], snapshot["users_total"], snapshot["batches_failed"]
+            )
+
+    progress.update(running=False, finished_at=datetime.utcnow())
+    progress.save()
+    return progress.snapshot()
+
+
+def run_forever(
+    stop: threading.Event,
+    interval_hours: float = PRECOMPUTE_INTERVAL_HOURS,
+    retry_seconds: float = PRECOMPUTE_RETRY_SECONDS
+) -> None:
+    """Run precompute every interval until stop is set, retrying failed runs sooner."""
+    interval = interval_hours * 3600
+    delay = retry_seconds
+    while not stop.is_set():
+        try:
+            precompute()
+        except Exception:
+            logger.exception("Precompute run failed, retrying in %.0f seconds", min(delay, interval))
+            stop.wait(min(delay, interval))
+            delay *= 2
+            continue
+        delay = retry_seconds
+        stop.wait(interval)
+
+
+def start_background_scheduler() -> threading.Event:
+    """Start the precompute loop on a daemon thread; set the returned event to stop it."""
+    stop = threading.Event()
+    thread = threading.Thread(target=run_forever, args=(stop,), name="precompute", daemon=True)
+    thread.start()
+    return stop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute upcoming-month calendar and summary views")
+    parser.add_argument("--once", action="store_true", help="run a single precompute pass and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        precompute()
+    else:
+        run_forever(threading.Event())
@@ -0,0 +1,118 @@
+"""
+Search over transaction titles, descriptions and categories.
+
+A query matches a case-insensitive substring of the title, description or
+(for expenses) category of the user's incomes, expenses and savings,
+archived ones included, all fetched in one UNION ALL statement. On
+PostgreSQL the ILIKE filters are served by pg_trgm GIN indexes (migration
+0006), which is why queries need at least SEARCH_QUERY_MIN_LENGTH
+characters; SQLite scans the user's rows.
+
+Results are ranked by where the query matched (start of the title, rest of
+the title, category, description) and newest first within a rank. Pages
+are read with one row of lookahead, so the last page is known without
+counting every match.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import String, and_, case, cast, desc, literal, null, or_, union_all
+from sqlmodel import Session, select
+
+from money import from_minor_units
+from queries import KIND_MODELS, KIND_ARCHIVES
+
+SEARCH_LIMIT_MAX = 100
+
+# pg_trgm indexes only serve patterns with at least one whole trigram;
+# shorter queries would scan every row of every table
+SEARCH_QUERY_MIN_LENGTH = 3
+
+# Rank of a match by the column it was found in
+RANK_TITLE_PREFIX = 4
+RANK_TITLE = 3
+RANK_CATEGORY = 2
+RANK_DESCRIPTION = 1
+
+
+def _like_pattern(query: str, prefix: bool = False) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%" if prefix else f"%{escaped}%"
+
+
+def _branch(kind: str, table, user_id: int, query: str, archived: bool):
+    contains = _like_pattern(query)
+    title = table.c.title
+    description = table.c.description
+    category = table.c.category if "category" in table.c else cast(null(), String)
+
+    rank = case(
+        (title.ilike(_like_pattern(query, prefix=True), escape="\\"), RANK_TITLE_PREFIX),
+        (title.ilike(contains, escape="\\"), RANK_TITLE),
+        (category.ilike(contains, escape="\\"), RANK_CATEGORY),
+        else_=RANK_DESCRIPTION,
+    )
+    matches = [title.ilike(contains, escape="\\"), description.ilike(contains, escape="\\")]
+    if "category" in table.c:
+        matches.append(category.ilike(contains, escape="\\"))
+
+    return select(
+        literal(kind).label("kind"),
+        literal(archived).label("archived"),
+        table.c.id.label("id"),
+        title.label("title"),
+        description.label("description"),
+        category.label("category"),
+        table.c.amount.label("amount"),
+        table.c.date.label("date"),
+        table.c.recurrence_type.label("recurrence_type"),
+        rank.label("rank"),
+    ).where(and_(table.c.user_id == user_id, or_(*matches)))
+
+
+def search_transactions(
+    session: Session,
+    user_id: int,
+    query: str,
+    kinds: Optional[Iterable[str]] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> dict:
+    """
+    One page of the user's transactions matching `query`, best matches
+    first. `kinds` restricts the search to some of income, expense and
+    saving. next_offset is None on the last page.
+    """
+    kinds = list(kinds or KIND_MODELS)
+    branches = []
+    for kind in kinds:
+        branches.append(_branch(kind, KIND_MODELS[kind].__table__, user_id, query, archived=False))
+        branches.append(_branch(kind, KIND_ARCHIVES[kind], user_id, query, archived=True))
+
+    statement = (
+        union_all(*branches)
+        .order_by(desc("rank"), desc("date"), "kind", desc("id"))
+        .limit(limit + 1)
+        .offset(offset)
+    )
+    rows = session.exec(statement).all()
+
+    results = [
+        {
+            "kind": row.kind,
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
+            **({"category": row.category} if row.kind == "expense" else {}),
+            "amount": from_minor_units(row.amount),
+            "date": row.date,
+            "recurrence_type": row.recurrence_type,
+            "archived": row.archived,
+        }
+        for row in rows[:limit]
+    ]
+    return {
+        "query": query,
+        "results": results,
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
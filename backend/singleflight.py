@@ -0,0 +1,76 @@
+"""
+Coalescing of identical concurrent computations.
+
+Duplicate requests for the same month commonly arrive together (StrictMode
+double mounts, query invalidation bursts, several open tabs). SingleFlight
+lets the first caller for a key run the computation while concurrent
+callers with the same key wait for and share its result.
+
+Keys should include the user's data version, so a request issued after a
+write never joins a computation that started before it.
+"""
+
+from typing import Any, Callable, Hashable, Optional
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time, sharing its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(
+        self, key: Hashable, fn: Callable[[], Any], before_wait: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Return fn()'s result, or the result of an identical in-flight call.
+
+        Exceptions raised by the computation propagate to every caller
+        that shared it. A caller that is about to wait for another's
+        computation calls before_wait first, e.g. to give its database
+        connection back to the pool instead of holding it while blocked.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            if before_wait is not None:
+                before_wait()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"in_flight": in_flight, "executed": self.executed, "coalesced": self.coalesced}
@@ -0,0 +1,91 @@
+"""
+Shared fixtures: the API against throwaway SQLite databases.
+
+The backend modules read their configuration when imported, so the
+environment is set up here before any of them is.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+DATA_DIR = tempfile.mkdtemp(prefix="nassets-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATA_DIR, 'primary.db')}"
+os.environ["ADMIN_USERNAMES"] = "admin"
+os.environ["ADMISSION_PER_USER_LIMIT"] = "100"
+# Scratch PostgreSQL database for the tests that need one; skipped without it
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+for name in ("REPLICA_DATABASE_URL", "CACHE_URL", "PRECOMPUTE_IN_PROCESS", "RECURRENCE_ENGINE"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    """Every test starts with an empty in-memory cache."""
+    from cache import MemoryCache, set_cache
+
+    set_cache(MemoryCache())
+    yield
+
+
+@pytest.fixture
+def register(client):
+    """Register and log in a new user; returns their Authorization headers."""
+    def register(username: str = None) -> dict:
+        username = username or f"user-{uuid.uuid4().hex[:12]}"
+        password = "Passw0rd!"
+        response = client.post("/api/auth/register", json={
+            "email": f"{username}@example.com", "username": username, "password": password
+        })
+        assert response.status_code == 201, response.text
+        response = client.post("/api/auth/login", data={"username": username, "password": password})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register
+
+
+@pytest.fixture(scope="module")
+def pg_engine():
+    """
+    An engine on a throwaway schema of TEST_POSTGRES_URL with every table
+    created, dropped afterwards. Skips the test without PostgreSQL.
+    """
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+
+    from sqlmodel import SQLModel, create_engine
+    import models  # noqa: F401 - registers the tables
+
+    schema = f"nassets_test_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(TEST_POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {schema}"))
+    except OperationalError as error:
+        pytest.skip(f"PostgreSQL is not available: {error}")
+
+    try:
+        SQLModel.metadata.create_all(engine)
+        yield engine
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        engine.dispose()
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from admission import AdmissionController
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_users_over_their_limit_are_shed_with_429():
+    controller = AdmissionController(capacity=10, per_user_limit=2)
+
+    async def scenario():
+        await controller.acquire("alice")
+        await controller.acquire("alice")
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire("alice")
+        # Other users are unaffected
+        await controller.acquire("bob")
+        controller.release("alice")
+        await controller.acquire("alice")
+        return shed.value
+
+    shed = run(scenario())
+    assert shed.status_code == 429
+    assert shed.headers == {"Retry-After": "1"}
+    stats = controller.stats()
+    assert (stats["admitted"], stats["shed_user_limit"], stats["in_use"]) == (4, 1, 3)
+
+
+def test_requests_are_shed_with_503_when_the_queue_is_full():
+    controller = AdmissionController(capacity=2, queue_size=1, queue_timeout=2.5)
+
+    async def scenario():
+        await controller.acquire("alice", cost=2)
+        queued = asyncio.ensure_future(controller.acquire("bob"))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire("carol")
+
+        controller.release("alice", cost=2)
+        await queued
+        return shed.value
+
+    shed = run(scenario())
+    assert shed.status_code == 503
+    assert shed.headers == {"Retry-After": "3"}
+    stats = controller.stats()
+    assert (stats["queued"], stats["shed_queue_full"], stats["in_use"], stats["users_in_flight"]) == (1, 1, 1, 1)
+
+
+def test_queued_requests_time_out_with_503():
+    controller = AdmissionController(capacity=1, queue_timeout=0.05)
+
+    async def scenario():
+        await controller.acquire("alice")
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire("bob")
+        return shed.value
+
+    shed = run(scenario())
+    assert shed.status_code == 503
+    assert shed.headers == {"Retry-After": "1"}
+    stats = controller.stats()
+    assert (stats["shed_timeout"], stats["queue_depth"], stats["in_use"]) == (1, 0, 1)
+    assert controller._user_in_flight == {"alice": 1}
+
+
+def test_a_slot_granted_to_a_cancelled_waiter_goes_to_the_next_one():
+    controller = AdmissionController(capacity=1, queue_timeout=5)
+
+    async def scenario():
+        await controller.acquire("alice")
+        bob = asyncio.ensure_future(controller.acquire("bob"))
+        carol = asyncio.ensure_future(controller.acquire("carol"))
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 2
+
+        # Bob is granted the slot, then his client disconnects before he resumes
+        controller.release("alice")
+        bob.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await bob
+        await asyncio.wait_for(carol, 1)
+
+    run(scenario())
+    stats = controller.stats()
+    assert (stats["in_use"], stats["queue_depth"], stats["admitted"]) == (1, 0, 2)
+    assert controller._user_in_flight == {"carol": 1}
@@ -0,0 +1,94 @@
+from datetime import date
+
+from sqlmodel import Session, select
+
+import archive
+import database
+from archive import archive_user, archived_view
+from models import MonthSnapshot
+from view_store import get_data_versions
+
+
+def test_new_rows_never_reuse_archived_ids(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    old = client.post("/api/incomes", json={"title": "old", "amount": 5, "date": "2020-01-01"}, headers=headers).json()
+
+    with Session(database.engine) as session:
+        report = archive_user(session, user_id, date(2024, 1, 1))
+    assert report["rows_archived"] == 1
+
+    new = client.post("/api/incomes", json={"title": "new", "amount": 7, "date": "2026-01-01"}, headers=headers).json()
+    assert new["id"] != old["id"]
+
+    listed = client.get("/api/incomes", headers=headers).json()
+    assert sorted(income["id"] for income in listed) == sorted([old["id"], new["id"]])
+    assert client.get(f"/api/incomes/{old['id']}", headers=headers).json()["title"] == "old"
+    assert client.get(f"/api/incomes/{new['id']}", headers=headers).json()["title"] == "new"
+
+    # Editing the archived row moves it back next to the new one
+    response = client.put(f"/api/incomes/{old['id']}", json={"amount": 6}, headers=headers)
+    assert response.status_code == 200
+    assert len(client.get("/api/incomes", headers=headers).json()) == 2
+
+
+def test_archived_month_is_served_from_its_snapshot(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    client.post("/api/expenses", json={"title": "rent", "amount": 100, "date": "2020-03-01"}, headers=headers)
+    before = client.get("/api/budget/summary?year=2020&month=3", headers=headers).json()
+
+    with Session(database.engine) as session:
+        archive_user(session, user_id, date(2024, 1, 1))
+
+    assert client.get("/api/budget/summary?year=2020&month=3", headers=headers).json() == before
+
+
+def snapshots(user_id: int) -> set:
+    with Session(database.engine) as session:
+        return set(session.exec(
+            select(MonthSnapshot.view, MonthSnapshot.year, MonthSnapshot.month).where(MonthSnapshot.user_id == user_id)
+        ).all())
+
+
+def test_archived_months_without_a_snapshot_are_snapshotted_when_read(client, register, monkeypatch):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    client.post("/api/expenses", json={"title": "rent", "amount": 100, "date": "2020-03-01"}, headers=headers)
+    with Session(database.engine) as session:
+        archive_user(session, user_id, date(2024, 1, 1))
+    assert ("summary", 2019, 12) not in snapshots(user_id)
+
+    # A month before the user's first row
+    first = client.get("/api/budget/summary?year=2019&month=12", headers=headers).json()
+    assert ("summary", 2019, 12) in snapshots(user_id)
+
+    def fail(*args):
+        raise AssertionError("served from history instead of the snapshot")
+
+    monkeypatch.setattr(archive, "fetch_history", fail)
+    assert client.get("/api/budget/summary?year=2019&month=12", headers=headers).json() == first
+    monkeypatch.undo()
+
+    # A month whose snapshot a write dropped
+    client.post("/api/expenses", json={"title": "late fee", "amount": 5, "date": "2020-03-02"}, headers=headers)
+    assert ("calendar", 2020, 3) not in snapshots(user_id)
+    calendar = client.get("/api/calendar?year=2020&month=3", headers=headers).json()
+    assert ("calendar", 2020, 3) in snapshots(user_id)
+    assert sorted(expense["title"] for expense in calendar["expenses"]) == ["late fee", "rent"]
+
+
+def test_reads_older_than_a_write_do_not_store_snapshots(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    client.post("/api/incomes", json={"title": "pay", "amount": 10, "date": "2020-01-01"}, headers=headers)
+    with Session(database.engine) as session:
+        archive_user(session, user_id, date(2024, 1, 1))
+        version = get_data_versions(session, [user_id])[user_id]
+    client.post("/api/incomes", json={"title": "more", "amount": 1, "date": "2026-01-01"}, headers=headers)
+
+    with Session(database.engine) as session:
+        assert archived_view(session, user_id, "summary", 2018, 5, version) is not None
+        assert archived_view(session, user_id, "summary", 2018, 6, version + 1) is not None
+    assert ("summary", 2018, 5) not in snapshots(user_id)
+    assert ("summary", 2018, 6) in snapshots(user_id)
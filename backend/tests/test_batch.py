@@ -0,0 +1,72 @@
+def batch(client, headers, *operations):
+    return client.post("/api/batch", json={"operations": list(operations)}, headers=headers)
+
+
+def test_results_show_each_row_as_of_its_operation(client, register):
+    headers = register()
+    asset_id = client.post("/api/assets", json={"name": "house", "amount": 1000}, headers=headers).json()["id"]
+    saving_id = client.post("/api/savings", json={
+        "title": "deposit", "amount": 5, "date": "2026-01-01", "asset_id": asset_id
+    }, headers=headers).json()["id"]
+    income_id = client.post("/api/incomes", json={
+        "title": "pay", "amount": 100, "date": "2026-01-15"
+    }, headers=headers).json()["id"]
+
+    response = batch(
+        client, headers,
+        {"kind": "saving", "action": "update", "id": saving_id, "data": {"amount": 7}},
+        {"kind": "asset", "action": "update", "id": asset_id, "data": {"name": "home"}},
+        {"kind": "saving", "action": "update", "id": saving_id, "data": {"amount": 9}},
+        {"kind": "income", "action": "update", "id": income_id, "data": {"amount": 150}},
+        {"kind": "income", "action": "delete", "id": income_id},
+    )
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+
+    assert [result["row"]["amount"] for result in results[:3:2]] == [7.0, 9.0]
+    assert results[1]["row"]["contributed"] == 7.0
+    assert results[3]["row"]["amount"] == 150.0
+    assert results[4] == {"kind": "income", "action": "delete", "id": income_id, "row": None}
+    assert response.json()["assets"][0]["contributed"] == 9.0
+
+
+def test_contributions_are_folded_per_asset(client, register):
+    headers = register()
+    first = client.post("/api/assets", json={"name": "a", "amount": 1000, "contributed": 10}, headers=headers).json()
+    savings = [
+        client.post("/api/savings", json={
+            "title": f"s{i}", "amount": 10, "date": "2026-01-01", "asset_id": first["id"]
+        }, headers=headers).json()["id"]
+        for i in range(3)
+    ]
+
+    response = batch(
+        client, headers,
+        {"kind": "asset", "action": "create", "data": {"name": "b", "amount": 500}},
+        *({"kind": "saving", "action": "update", "id": saving_id, "asset_ref": 0, "data": {}} for saving_id in savings[:2]),
+        {"kind": "saving", "action": "create", "data": {
+            "title": "new", "amount": 2.5, "date": "2026-01-02", "asset_id": first["id"]
+        }},
+    )
+    assert response.status_code == 200, response.text
+    assets = {asset["name"]: asset["contributed"] for asset in response.json()["assets"]}
+    assert assets == {"a": 22.5, "b": 20.0}
+
+    report = client.post("/api/assets/reconcile?dry_run=true", headers=headers).json()
+    assert report["assets_corrected"] == 0
+
+
+def test_failed_operation_rolls_back_the_batch(client, register):
+    headers = register()
+    expense_id = client.post("/api/expenses", json={
+        "title": "rent", "amount": 500, "date": "2026-01-01"
+    }, headers=headers).json()["id"]
+
+    response = batch(
+        client, headers,
+        {"kind": "expense", "action": "update", "id": expense_id, "data": {"amount": 1}},
+        {"kind": "saving", "action": "delete", "id": 999999},
+    )
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Operation 1: Saving not found"
+    assert client.get(f"/api/expenses/{expense_id}", headers=headers).json()["amount"] == 500.0
@@ -0,0 +1,63 @@
+import time
+
+import cache
+from cache import MemoryCache, RedisCache
+
+# Nothing listens on port 1, so connections are refused right away
+UNREACHABLE_URL = "redis://127.0.0.1:1/0"
+
+
+def test_memory_cache_expires_and_evicts():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", {"n": 1}, ttl=60)
+    memory.set("b", {"n": 2}, ttl=0.01)
+    assert memory.get("a") == {"n": 1}
+    time.sleep(0.02)
+    assert memory.get("b") is None
+
+    memory.set("c", [3], ttl=60)
+    memory.set("d", [4], ttl=60)
+    assert memory.get("a") is None
+    assert memory.get("d") == [4]
+
+
+def test_memory_cache_invalidates_by_prefix():
+    memory = MemoryCache()
+    memory.set("view:1:calendar", 1, ttl=60)
+    memory.set("view:12:calendar", 2, ttl=60)
+    memory.invalidate("view:1:")
+    assert memory.get("view:1:calendar") is None
+    assert memory.get("view:12:calendar") == 2
+
+
+def test_unreachable_redis_degrades_to_misses():
+    redis_cache = RedisCache(UNREACHABLE_URL)
+    assert redis_cache.get("user:alice") is None
+    redis_cache.set("user:alice", {"id": 1}, ttl=60)
+    redis_cache.invalidate("view:1:")
+    assert redis_cache.get("user:alice") is None
+
+    stats = redis_cache.stats()
+    assert stats["available"] is False
+    assert stats["errors"] >= 1
+    assert not redis_cache.healthy()
+    redis_cache.close()
+
+
+def test_api_works_when_cache_url_is_unreachable(client, register, monkeypatch):
+    headers = register()
+    monkeypatch.setattr(cache, "CACHE_URL", UNREACHABLE_URL)
+    monkeypatch.setattr(cache, "_cache", None)
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+    response = client.post("/api/incomes", json={"title": "pay", "amount": 10, "date": "2026-01-01"}, headers=headers)
+    assert response.status_code == 200
+    response = client.get("/api/calendar?year=2026&month=1", headers=headers)
+    assert response.status_code == 200
+    assert isinstance(cache.get_cache(), RedisCache)
+
+
+def test_invalid_cache_url_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_URL", "http://not-redis")
+    monkeypatch.setattr(cache, "_cache", None)
+    assert isinstance(cache.get_cache(), MemoryCache)
@@ -0,0 +1,197 @@
+import asyncio
+
+import pytest
+
+import events
+
+
+class RecordingBroker(events.EventBroker):
+    """Records what would be pushed to each user's channel."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, user_id: int, event: dict) -> None:
+        self.published.append((user_id, event))
+
+
+@pytest.fixture
+def broker():
+    previous = events.get_broker()
+    broker = RecordingBroker()
+    events.set_broker(broker)
+    yield broker
+    events.set_broker(previous)
+
+
+def test_saving_cannot_point_at_another_users_asset(client, register, broker):
+    victim, attacker = register(), register()
+    asset = client.post("/api/assets", json={
+        "name": "secret-fund", "amount": 5000, "contributed": 100
+    }, headers=victim).json()
+    saving_id = client.post("/api/savings", json={
+        "title": "mine", "amount": 50, "date": "2026-01-01"
+    }, headers=attacker).json()["id"]
+
+    response = client.put(f"/api/savings/{saving_id}", json={"asset_id": asset["id"]}, headers=attacker)
+    assert response.status_code == 404
+
+    assert client.get(f"/api/assets/{asset['id']}", headers=victim).json()["contributed"] == 100
+    assert client.get(f"/api/savings/{saving_id}", headers=attacker).json()["asset_id"] is None
+    assert all(event["assets"] == [] for _, event in broker.published)
+
+
+def test_events_only_carry_the_publishing_users_assets(client, register, broker):
+    import main
+    from database import engine
+    from sqlmodel import Session
+
+    other = client.post("/api/assets", json={"name": "secret-fund", "amount": 5000}, headers=register()).json()
+    headers = register()
+    own = client.post("/api/assets", json={"name": "mine", "amount": 10}, headers=headers).json()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+
+    with Session(engine) as session:
+        main.publish_change(session, user_id, "asset", "reconciled", asset_ids=[own["id"], other["id"]])
+
+    assert [asset["name"] for asset in broker.published[-1][1]["assets"]] == ["mine"]
+
+
+def test_a_failed_publish_does_not_fail_the_committed_write(client, register, broker, monkeypatch):
+    import main
+
+    def fail(*args):
+        raise RuntimeError("totals unavailable")
+
+    monkeypatch.setattr(main, "month_totals", fail)
+    headers = register()
+    response = client.post("/api/incomes", json={"title": "pay", "amount": 100, "date": "2026-01-15"}, headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert len(client.get("/api/incomes", headers=headers).json()) == 1
+    assert broker.published[-1][1] == {"type": "resync"}
+
+
+def test_saving_events_carry_the_row_assets_and_month_totals(client, register, broker):
+    headers = register()
+    asset_id = client.post("/api/assets", json={"name": "house", "amount": 1000}, headers=headers).json()["id"]
+    client.post("/api/incomes", json={"title": "pay", "amount": 100, "date": "2026-03-01"}, headers=headers)
+    saving = client.post("/api/savings", json={
+        "title": "deposit", "amount": 25, "date": "2026-03-10", "asset_id": asset_id
+    }, headers=headers).json()
+
+    _, event = broker.published[-1]
+    assert event["type"] == "saving.created"
+    assert event["id"] == saving["id"]
+    assert event["row"] == saving
+    assert [(asset["id"], asset["contributed"]) for asset in event["assets"]] == [(asset_id, 25.0)]
+    assert [(t["year"], t["month"], t["total_income"], t["total_savings"]) for t in event["totals"]] == [
+        (2026, 3, 100.0, 25.0)
+    ]
+
+    client.delete(f"/api/savings/{saving['id']}", headers=headers)
+    _, event = broker.published[-1]
+    assert (event["type"], event["id"], event["row"]) == ("saving.deleted", saving["id"], None)
+    assert event["assets"][0]["contributed"] == 0.0
+    assert event["totals"][0]["total_savings"] == 0.0
+
+
+def test_broker_fans_out_to_each_subscriber_of_the_user():
+    broker = events.InProcessBroker()
+
+    async def scenario():
+        first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+        pending = [asyncio.ensure_future(stream.__anext__()) for stream in (first, second, other)]
+        await asyncio.sleep(0)
+        assert broker.has_subscribers(1) and broker.has_subscribers(2)
+
+        # Writes publish from the threadpool
+        await asyncio.to_thread(broker.publish, 1, {"type": "income.created"})
+        received = await asyncio.wait_for(asyncio.gather(*pending[:2]), 1)
+        await asyncio.sleep(0.01)
+        assert not pending[2].done()
+
+        pending[2].cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending[2]
+        for stream in (first, second, other):
+            await stream.aclose()
+        return received
+
+    assert asyncio.run(scenario()) == [{"type": "income.created"}] * 2
+    assert not broker.has_subscribers(1) and not broker.has_subscribers(2)
+
+
+def test_slow_subscribers_are_told_to_resync(monkeypatch):
+    monkeypatch.setattr(events, "SUBSCRIBER_QUEUE_SIZE", 2)
+    broker = events.InProcessBroker()
+
+    async def scenario():
+        stream = broker.subscribe(1)
+        first = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        # The third event finds the queue full and replaces its backlog
+        for index in range(4):
+            broker.publish(1, {"type": "income.created", "id": index})
+        await asyncio.sleep(0.01)
+        received = [await first, await stream.__anext__()]
+        await stream.aclose()
+        return received
+
+    assert asyncio.run(scenario()) == [{"type": "resync"}, {"type": "income.created", "id": 3}]
+
+
+def test_sse_stream_sends_events_keepalives_and_stops_on_disconnect(monkeypatch):
+    broker = events.InProcessBroker()
+    monkeypatch.setattr(events, "_broker", broker)
+    monkeypatch.setattr(events, "KEEPALIVE_INTERVAL", 0.05)
+    disconnected = asyncio.Event()
+
+    async def is_disconnected():
+        return disconnected.is_set()
+
+    async def scenario():
+        stream = events.sse_stream(7, is_disconnected)
+        messages = [await stream.__anext__()]
+        messages.append(await stream.__anext__())
+        broker.publish(7, {"type": "saving.deleted", "id": 3})
+        messages.append(await stream.__anext__())
+        disconnected.set()
+        messages.extend([message async for message in stream])
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert messages[:2] == ["retry: 3000\n\n", ": keepalive\n\n"]
+    assert messages[2] == 'id: 1\nevent: saving.deleted\ndata: {"type":"saving.deleted","id":3}\n\n'
+    assert all(message == ": keepalive\n\n" for message in messages[3:])
+    assert not broker.has_subscribers(7)
+
+
+def test_event_stream_opens_with_a_short_lived_events_token(client, register, monkeypatch):
+    import main
+
+    opened = []
+
+    async def one_message(user_id, is_disconnected):
+        opened.append(user_id)
+        yield "retry: 3000\n\n"
+
+    monkeypatch.setattr(main, "sse_stream", one_message)
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    access_token = headers["Authorization"].split()[1]
+
+    assert client.post("/api/events/token").status_code == 401
+    token = client.post("/api/events/token", headers=headers).json()
+    assert token["expires_in"] == main.EVENTS_TOKEN_EXPIRE_SECONDS
+
+    assert client.get("/api/events").status_code == 401
+    assert client.get("/api/events", params={"token": access_token}).status_code == 401
+    # Events tokens open the stream only, never the rest of the API
+    assert client.get("/api/auth/me", headers={"Authorization": f"Bearer {token['token']}"}).status_code == 401
+
+    response = client.get("/api/events", params={"token": token["token"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == "retry: 3000\n\n"
+    assert opened == [user_id]
@@ -0,0 +1,61 @@
+import importlib.util
+import os
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, text
+
+from money import from_minor_units, to_minor_units
+
+
+def test_round_trip_is_exact():
+    assert to_minor_units(0.29) == 29
+    assert to_minor_units(10.005) == 1001
+    assert from_minor_units(to_minor_units(1234.56)) == 1234.56
+
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "-Infinity"])
+def test_non_finite_amounts_are_rejected(client, register, amount):
+    headers = register()
+    # Python's JSON parser accepts these literals
+    body = '{"title": "pay", "amount": %s, "date": "2026-01-01"}' % amount
+    response = client.post(
+        "/api/incomes", content=body, headers={**headers, "Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+    assert client.get("/api/incomes", headers=headers).json() == []
+
+
+def test_non_finite_contribution_is_rejected(client, register):
+    headers = register()
+    body = '{"name": "house", "amount": 1000, "contributed": NaN}'
+    response = client.post(
+        "/api/assets", content=body, headers={**headers, "Content-Type": "application/json"}
+    )
+    assert response.status_code == 422
+
+
+def test_sqlite_migration_rounds_like_the_api(tmp_path):
+    path = os.path.join(os.path.dirname(__file__), "..", "migrations", "versions", "0002_money_minor_units.py")
+    spec = importlib.util.spec_from_file_location("money_minor_units", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    amounts = [1.005, 0.285, -1.005, 0.29, 2.675]
+    engine = create_engine(f"sqlite:///{tmp_path / 'floats.db'}")
+    with engine.begin() as conn:
+        for table in ("incomes", "expenses", "savings"):
+            conn.execute(text(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY, amount FLOAT NOT NULL)"))
+        conn.execute(text(
+            "CREATE TABLE assets (id INTEGER PRIMARY KEY, amount FLOAT NOT NULL, contributed FLOAT NOT NULL)"
+        ))
+        conn.execute(text("INSERT INTO incomes (amount) VALUES (:amount)"), [{"amount": a} for a in amounts])
+        conn.execute(text("INSERT INTO assets (amount, contributed) VALUES (10.005, 1.115)"))
+
+        with Operations.context(MigrationContext.configure(conn)):
+            migration.upgrade()
+
+        stored = conn.execute(text("SELECT amount FROM incomes ORDER BY id")).scalars().all()
+        assert stored == [to_minor_units(amount) for amount in amounts] == [101, 29, -101, 29, 268]
+        assert conn.execute(text("SELECT amount, contributed FROM assets")).one() == (1001, 112)
@@ -0,0 +1,61 @@
+"""Rebuilding the transaction tables between partition counts, on PostgreSQL."""
+
+from datetime import date
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from models import Asset, Income, Saving, User
+from partitioning import TABLES, partition_count, partition_tables
+
+
+def indexes(conn, table: str) -> set:
+    return set(conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table AND schemaname = current_schema()"
+    ), {"table": table}).scalars())
+
+
+def foreign_keys(conn, table: str) -> set:
+    return set(conn.execute(text(
+        "SELECT pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+    ), {"table": table}).scalars())
+
+
+def test_tables_can_be_repartitioned_at_any_time(pg_engine):
+    with Session(pg_engine) as session:
+        user = User(email="p@example.com", username="partitioned", hashed_password="x")
+        session.add(user)
+        session.flush()
+        asset = Asset(user_id=user.id, name="fund", amount=100)
+        session.add(asset)
+        session.flush()
+        session.add(Income(user_id=user.id, title="pay", amount=100, date=date(2026, 1, 1)))
+        session.add(Saving(user_id=user.id, title="put", amount=5, date=date(2026, 1, 1), asset_id=asset.id))
+        session.commit()
+        user_id, asset_id = user.id, asset.id
+
+    with pg_engine.begin() as conn:
+        # Stands in for the search indexes of migration 0006
+        conn.execute(text("CREATE INDEX ix_incomes_title_lower ON incomes (lower(title))"))
+        before = {table: (indexes(conn, table), foreign_keys(conn, table)) for table in TABLES}
+
+    for partitions in (4, 4, 2, 0):
+        with pg_engine.begin() as conn:
+            report = partition_tables(conn, partitions)
+            assert all(counts["after"] == partitions for counts in report.values())
+            for table in TABLES:
+                assert partition_count(conn, table) == partitions
+                assert foreign_keys(conn, table) == before[table][1]
+                assert indexes(conn, table) - {f"{table}_pkey"} == before[table][0] - {f"{table}_pkey"}
+
+    with pg_engine.begin() as conn:
+        assert report == {table: {"before": 2, "after": 0} for table in TABLES}
+        assert conn.execute(text("SELECT count(*) FROM incomes")).scalar() == 1
+
+    # Ids keep coming from the same sequences
+    with Session(pg_engine) as session:
+        income = Income(user_id=user_id, title="more", amount=1, date=date(2026, 2, 1))
+        saving = Saving(user_id=user_id, title="more", amount=1, date=date(2026, 2, 1), asset_id=asset_id)
+        session.add_all([income, saving])
+        session.commit()
+        assert (income.id, saving.id) == (2, 2)
@@ -0,0 +1,54 @@
+from datetime import date
+
+from sqlmodel import Session
+
+import database
+from archive import archive_user
+from portfolio import build_asset_summary
+
+
+def post(client, headers, path, **row):
+    response = client.post(path, json=row, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_summary_totals_and_contributions_include_archived_savings(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    house = post(client, headers, "/api/assets", name="house", amount=1000, contributed=100)
+    post(client, headers, "/api/assets", name="car", amount=0)
+    post(client, headers, "/api/savings", title="old", amount=200, date="2020-05-01", asset_id=house)
+    post(client, headers, "/api/savings", title="monthly", amount=50, date="2026-01-10",
+         recurrence_type="monthly", asset_id=house)
+    post(client, headers, "/api/savings", title="extra", amount=30, date="2026-07-10", asset_id=house)
+    post(client, headers, "/api/savings", title="unlinked", amount=999, date="2026-05-01")
+    others = register()
+    other_asset = post(client, others, "/api/assets", name="theirs", amount=500)
+    post(client, others, "/api/savings", title="theirs", amount=40, date="2026-05-01", asset_id=other_asset)
+
+    with Session(database.engine) as session:
+        assert archive_user(session, user_id, date(2024, 1, 1))["rows_archived"] == 1
+        summary = build_asset_summary(session, user_id, months=3, today=date(2026, 6, 15))
+
+    assert (summary["as_of"], summary["trailing_months"]) == (date(2026, 6, 15), 3)
+    assert (summary["total_amount"], summary["total_contributed"], summary["progress_percent"]) == (1000.0, 380.0, 38.0)
+    by_name = {asset["name"]: asset for asset in summary["assets"]}
+    assert list(by_name) == ["house", "car"]
+
+    house_summary = by_name["house"]
+    # The archived saving is counted and contributed, but is outside the window
+    assert (house_summary["contributed"], house_summary["progress_percent"], house_summary["savings_count"]) == (
+        380.0, 38.0, 3
+    )
+    # April, May and June occurrences of the monthly saving over three months
+    assert house_summary["average_monthly_contribution"] == 50.0
+    assert house_summary["next_contribution"] == {"date": date(2026, 7, 10), "amount": 80.0}
+
+    car_summary = by_name["car"]
+    assert (car_summary["progress_percent"], car_summary["savings_count"]) == (None, 0)
+    assert (car_summary["average_monthly_contribution"], car_summary["next_contribution"]) == (0.0, None)
+
+    # Reconciliation counts the same linked savings, archived ones included
+    report = client.post("/api/assets/reconcile", params={"dry_run": True}, headers=headers).json()
+    assert report["assets_drifted"] == 0
@@ -0,0 +1,93 @@
+"""
+Parity of the PostgreSQL recurrence engine with the Python one on fixed
+fixtures. Needs a scratch PostgreSQL database in TEST_POSTGRES_URL (see
+the pg_engine fixture).
+"""
+
+from datetime import date
+import uuid
+
+import pytest
+from sqlmodel import Session
+
+from budget import build_budget_summary, month_bounds
+from models import Expense, Income, RecurrenceType, Saving, User
+from recurrence_sql import build_budget_summary_in_database, daily_totals
+
+MODELS = {"income": Income, "expense": Expense, "saving": Saving}
+
+DAILY = RecurrenceType.DAILY
+WEEKLY = RecurrenceType.WEEKLY
+MONTHLY = RecurrenceType.MONTHLY
+YEARLY = RecurrenceType.YEARLY
+NONE = RecurrenceType.NONE
+
+# name: (rows as (kind, amount, date, recurrence, end date), {(year, month): {kind: days}})
+CASES = {
+    "monthly from Jan 31 clamps and drifts": (
+        [("expense", 1000, date(2025, 1, 31), MONTHLY, None)],
+        {(2025, 2): {"expense": [28]}, (2025, 3): {"expense": [28]}, (2025, 4): {"expense": [28]}},
+    ),
+    "yearly from Feb 29": (
+        [("income", 5000, date(2024, 2, 29), YEARLY, None)],
+        {(2024, 2): {"income": [29]}, (2025, 2): {"income": [28]}, (2028, 2): {"income": [28]}},
+    ),
+    "weekly and daily starting before the window": (
+        [
+            ("saving", 250, date(2025, 12, 3), WEEKLY, None),
+            ("expense", 99, date(2025, 11, 20), DAILY, date(2026, 2, 3)),
+        ],
+        {(2026, 2): {"saving": [4, 11, 18, 25], "expense": [1, 2, 3]}},
+    ),
+    "end date on the boundary day": (
+        [
+            ("income", 700, date(2025, 1, 15), MONTHLY, date(2025, 3, 15)),
+            ("expense", 10, date(2026, 3, 30), DAILY, date(2026, 3, 31)),
+            ("saving", 20, date(2026, 2, 20), DAILY, date(2026, 2, 28)),
+        ],
+        {
+            (2025, 3): {"income": [15]},
+            (2025, 4): {},
+            (2026, 3): {"expense": [30, 31]},
+        },
+    ),
+    "month without occurrences": (
+        [
+            ("income", 300, date(2025, 6, 10), YEARLY, None),
+            ("expense", 40, date(2026, 1, 5), NONE, None),
+        ],
+        {(2026, 3): {}},
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def pg_session(pg_engine):
+    with Session(pg_engine) as session:
+        yield session
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_engines_agree(pg_session, name):
+    rows, expected = CASES[name]
+    user = User(email=f"{uuid.uuid4().hex}@example.com", username=uuid.uuid4().hex, hashed_password="x")
+    pg_session.add(user)
+    pg_session.flush()
+
+    items = {kind: [] for kind in MODELS}
+    for kind, amount, start, recurrence, end in rows:
+        item = MODELS[kind](
+            user_id=user.id, title=name, amount=amount, date=start,
+            recurrence_type=recurrence, recurrence_end_date=end
+        )
+        pg_session.add(item)
+        items[kind].append(item)
+    pg_session.commit()
+
+    for (year, month), days in expected.items():
+        start_date, end_date = month_bounds(year, month)
+        totals = daily_totals(pg_session, user.id, start_date, end_date)
+        assert {kind: sorted(by_day) for kind, by_day in totals.items() if by_day} == days
+
+        python_summary = build_budget_summary(items["income"], items["expense"], items["saving"], year, month)
+        assert build_budget_summary_in_database(pg_session, user.id, year, month) == python_summary
@@ -0,0 +1,110 @@
+"""
+Read routing against a primary and a stand-in replica: a copy of the
+primary's SQLite file taken at the start of each test, which then stays
+stale.
+"""
+
+from datetime import date
+import shutil
+import time
+
+import pytest
+from sqlmodel import Session, create_engine
+
+import database
+from cache import MemoryCache, RedisCache, set_cache
+from models import Income
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    path = tmp_path / "replica.db"
+
+    def take_copy():
+        database.engine.dispose()
+        shutil.copyfile(database.engine.url.database, path)
+        replica_engine = create_engine(f"sqlite:///{path}")
+        monkeypatch.setattr(database, "replica_engine", replica_engine)
+        return replica_engine
+
+    yield take_copy
+    if database.replica_engine is not None:
+        database.replica_engine.dispose()
+
+
+def user_id(client, headers) -> int:
+    return client.get("/api/auth/me", headers=headers).json()["id"]
+
+
+def add_income_on_primary(user_id: int, title: str) -> None:
+    """A write the replica has not replayed, made without pinning anyone."""
+    with Session(database.engine) as session:
+        session.add(Income(user_id=user_id, title=title, amount=100, date=date(2026, 1, 1)))
+        session.commit()
+
+
+def titles(client, headers) -> list:
+    return sorted(income["title"] for income in client.get("/api/incomes", headers=headers).json())
+
+
+def test_gets_are_served_by_the_replica(client, register, replica):
+    headers = register()
+    owner = user_id(client, headers)
+    replica()
+
+    add_income_on_primary(owner, "not replicated")
+    assert titles(client, headers) == []
+
+
+def test_write_pins_reads_to_the_primary_until_expiry(client, register, replica, monkeypatch):
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", 0.3)
+    headers = register()
+    owner = user_id(client, headers)
+    replica()
+
+    response = client.post("/api/incomes", json={"title": "written", "amount": 1, "date": "2026-01-01"}, headers=headers)
+    assert response.status_code == 200
+    assert titles(client, headers) == ["written"]
+    # The pin is shared, so a fresh instance (another worker) sees it too
+    assert database.PrimaryPins().is_pinned(owner)
+
+    time.sleep(0.4)
+    assert not database.PrimaryPins().is_pinned(owner)
+    assert titles(client, headers) == []
+
+
+def test_user_missing_from_replica_is_read_from_primary(client, register, replica):
+    replica()
+    headers = register()
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert client.get("/api/incomes", headers=headers).status_code == 200
+
+
+def test_reads_stay_on_the_primary_while_the_cache_is_down(client, register, replica):
+    headers = register()
+    owner = user_id(client, headers)
+    replica()
+    add_income_on_primary(owner, "not replicated")
+
+    redis_cache = RedisCache("redis://127.0.0.1:1/0")
+    set_cache(redis_cache)
+    try:
+        assert database.PrimaryPins().is_pinned(owner)
+        assert titles(client, headers) == ["not replicated"]
+    finally:
+        redis_cache.close()
+
+
+def test_replica_requires_a_shared_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "replica_engine", create_engine(f"sqlite:///{tmp_path / 'replica.db'}"))
+
+    set_cache(MemoryCache())
+    with pytest.raises(RuntimeError, match="CACHE_URL"):
+        database.check_replica_setup()
+
+    redis_cache = RedisCache("redis://127.0.0.1:1/0")
+    set_cache(redis_cache)
+    database.check_replica_setup()
+    redis_cache.close()
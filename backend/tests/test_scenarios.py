@@ -0,0 +1,101 @@
+from datetime import date
+
+from sqlmodel import Session
+
+import database
+from archive import archive_user
+
+
+def post(client, headers, path, **row):
+    response = client.post(path, json=row, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def evaluate(client, headers, *scenarios, year=2026, month=1, months=2, opening_balance=0):
+    return client.post("/api/budget/scenarios", json={
+        "year": year, "month": month, "months": months, "opening_balance": opening_balance,
+        "scenarios": [{"name": f"s{i}", "changes": changes} for i, changes in enumerate(scenarios)],
+    }, headers=headers)
+
+
+def totals(result) -> list:
+    return [
+        (m["month"], m["total_income"], m["total_expenses"], m["total_savings"], m["remaining"])
+        for m in result["months"]
+    ]
+
+
+def test_changes_apply_as_deltas_on_the_baseline(client, register):
+    headers = register()
+    pay = post(client, headers, "/api/incomes", title="pay", amount=1000, date="2026-01-01", recurrence_type="monthly")
+    post(client, headers, "/api/incomes", title="bonus", amount=250, date="2026-02-20")
+    rent = post(client, headers, "/api/expenses", title="rent", amount=300, date="2026-01-10")
+    post(client, headers, "/api/savings", title="pot", amount=50, date="2026-01-03", recurrence_type="monthly")
+
+    response = evaluate(
+        client, headers,
+        [{"action": "scale", "kind": "income", "id": pay, "factor": 0.5}],
+        [
+            {"action": "remove", "kind": "expense", "id": rent},
+            {"action": "add", "kind": "expense", "amount": 19.99, "date": "2026-02-15"},
+        ],
+        # Scales compound on the row's scenario amount, and kind-wide ones hit every row
+        [
+            {"action": "scale", "kind": "income", "id": pay, "factor": 2},
+            {"action": "scale", "kind": "income", "factor": 0.5},
+        ],
+        [{"action": "scale", "kind": "saving", "factor": 0}],
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    assert totals(body["baseline"]) == [(1, 1000.0, 300.0, 50.0, 650.0), (2, 1250.0, 0.0, 50.0, 1200.0)]
+    halved, swapped, compounded, no_savings = body["scenarios"]
+    assert totals(halved) == [(1, 500.0, 300.0, 50.0, 150.0), (2, 750.0, 0.0, 50.0, 700.0)]
+    assert totals(swapped) == [(1, 1000.0, 0.0, 50.0, 950.0), (2, 1250.0, 19.99, 50.0, 1180.01)]
+    assert totals(compounded) == [(1, 1000.0, 300.0, 50.0, 650.0), (2, 1125.0, 0.0, 50.0, 1075.0)]
+    assert totals(no_savings) == [(1, 1000.0, 300.0, 0.0, 700.0), (2, 1250.0, 0.0, 0.0, 1250.0)]
+    assert [result["ending_balance"] for result in (body["baseline"], halved, swapped)] == [1850.0, 850.0, 2130.01]
+
+
+def test_lowest_balance_is_the_minimum_running_balance(client, register):
+    headers = register()
+    post(client, headers, "/api/expenses", title="deposit", amount=600, date="2026-01-05")
+    post(client, headers, "/api/incomes", title="pay", amount=1000, date="2026-01-15")
+
+    body = evaluate(
+        client, headers,
+        [{"action": "add", "kind": "saving", "amount": 2000, "date": "2026-02-01"}],
+        opening_balance=100,
+    ).json()
+
+    assert body["baseline"]["lowest_balance"] == {"date": "2026-01-05", "balance": -500.0}
+    assert body["baseline"]["ending_balance"] == 500.0
+    assert body["scenarios"][0]["lowest_balance"] == {"date": "2026-02-01", "balance": -1500.0}
+    assert body["scenarios"][0]["ending_balance"] == -1500.0
+
+
+def test_archived_rows_can_be_changed_and_unknown_rows_are_rejected(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    old = post(client, headers, "/api/expenses", title="old", amount=80, date="2020-06-01")
+    post(client, headers, "/api/incomes", title="pay", amount=100, date="2026-01-01")
+    with Session(database.engine) as session:
+        assert archive_user(session, user_id, date(2024, 1, 1))["rows_archived"] == 1
+
+    response = evaluate(
+        client, headers,
+        [{"action": "remove", "kind": "expense", "id": old}],
+        [{"action": "scale", "kind": "expense", "id": old, "factor": 3}],
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    # Archived rows have no occurrences in the window
+    assert all(totals(result) == totals(body["baseline"]) for result in body["scenarios"])
+
+    assert evaluate(client, headers, [{"action": "remove", "kind": "income", "id": 10**9}]).status_code == 422
+    others = post(client, register(), "/api/expenses", title="theirs", amount=5, date="2026-01-01")
+    response = evaluate(client, headers, [{"action": "remove", "kind": "expense", "id": others}])
+    assert response.status_code == 422
+    assert response.json()["detail"] == f"expense {others} not found"
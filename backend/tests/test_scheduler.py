@@ -0,0 +1,48 @@
+import scheduler
+
+
+def test_progress_endpoint_reads_the_saved_run(client, register):
+    register()
+    admin = register("admin")
+
+    report = scheduler.precompute(months=[(2026, 1)], workers=1)
+    assert report["running"] is False
+    # The endpoint must not depend on this process having run it
+    scheduler.progress.reset(None)
+
+    progress = client.get("/api/admin/precompute", headers=admin).json()
+    assert progress["running"] is False
+    assert progress["months"] == [{"year": 2026, "month": 1}]
+    assert progress["users_total"] >= 2
+    assert progress["users_done"] == progress["users_total"]
+    assert progress["views_written"] == 2 * progress["users_total"]
+    assert progress["finished_at"] is not None
+
+
+class _Stop:
+    """Stands in for the stop event and records how long each wait was."""
+
+    def __init__(self, waits: int):
+        self.waits = []
+        self.remaining = waits
+
+    def is_set(self) -> bool:
+        return self.remaining == 0
+
+    def wait(self, seconds: float) -> None:
+        self.waits.append(seconds)
+        self.remaining -= 1
+
+
+def test_failed_runs_are_retried_with_backoff(monkeypatch):
+    outcomes = iter([RuntimeError("no such table"), RuntimeError("no such table"), None, None])
+
+    def precompute():
+        outcome = next(outcomes)
+        if outcome is not None:
+            raise outcome
+
+    monkeypatch.setattr(scheduler, "precompute", precompute)
+    stop = _Stop(waits=4)
+    scheduler.run_forever(stop, interval_hours=1, retry_seconds=30)
+    assert stop.waits == [30, 60, 3600, 3600]
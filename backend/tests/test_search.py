@@ -0,0 +1,83 @@
+from datetime import date
+
+from sqlmodel import Session
+
+import database
+from archive import archive_user
+
+
+def post(client, headers, path, **row):
+    response = client.post(path, json=row, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def search(client, headers, **params):
+    response = client.get("/api/search", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_results_are_ranked_by_where_the_query_matched(client, register):
+    headers = register()
+    user_id = client.get("/api/auth/me", headers=headers).json()["id"]
+    described = post(client, headers, "/api/savings", title="pot", amount=5, date="2026-03-01", description="for the Rent")
+    categorised = post(client, headers, "/api/expenses", title="flat", amount=400, date="2026-02-01", category="rent")
+    inside = post(client, headers, "/api/expenses", title="back rent", amount=50, date="2026-01-01")
+    prefix_old = post(client, headers, "/api/incomes", title="Rental income", amount=700, date="2020-01-01")
+    prefix_new = post(client, headers, "/api/incomes", title="rent share", amount=300, date="2026-01-15")
+    post(client, headers, "/api/expenses", title="groceries", amount=80, date="2026-01-02")
+    post(client, register(), "/api/incomes", title="rent", amount=1, date="2026-01-01")
+    with Session(database.engine) as session:
+        archive_user(session, user_id, date(2024, 1, 1))
+
+    body = search(client, headers, q="RENT")
+    assert [(r["kind"], r["id"]) for r in body["results"]] == [
+        ("income", prefix_new), ("income", prefix_old), ("expense", inside),
+        ("expense", categorised), ("saving", described),
+    ]
+    assert [r["archived"] for r in body["results"]] == [False, True, False, False, False]
+    assert body["results"][3]["category"] == "rent"
+    assert "category" not in body["results"][0]
+    assert body["next_offset"] is None
+
+    assert [r["id"] for r in search(client, headers, q="rent", kind="saving")["results"]] == [described]
+
+
+def test_like_wildcards_in_the_query_match_literally(client, register):
+    headers = register()
+    percent = post(client, headers, "/api/expenses", title="tip 15% extra", amount=3, date="2026-01-01")
+    underscore = post(client, headers, "/api/expenses", title="file_a", amount=1, date="2026-01-01")
+    backslash = post(client, headers, "/api/expenses", title="dir\\x", amount=2, date="2026-01-01")
+    post(client, headers, "/api/expenses", title="tip 15 extra", amount=4, date="2026-01-01")
+    post(client, headers, "/api/expenses", title="fileba", amount=1, date="2026-01-01")
+    post(client, headers, "/api/expenses", title="dirx", amount=2, date="2026-01-01")
+
+    assert [r["id"] for r in search(client, headers, q="15%")["results"]] == [percent]
+    assert [r["id"] for r in search(client, headers, q="e_a")["results"]] == [underscore]
+    assert [r["id"] for r in search(client, headers, q="r\\x")["results"]] == [backslash]
+
+
+def test_pages_end_where_the_lookahead_row_runs_out(client, register):
+    headers = register()
+    ids = [
+        post(client, headers, "/api/incomes", title=f"pay {day}", amount=10, date=f"2026-01-{day:02d}")
+        for day in range(1, 6)
+    ]
+    newest_first = ids[::-1]
+
+    first = search(client, headers, q="pay", limit=2)
+    second = search(client, headers, q="pay", limit=2, offset=first["next_offset"])
+    last = search(client, headers, q="pay", limit=2, offset=second["next_offset"])
+    assert [r["id"] for page in (first, second, last) for r in page["results"]] == newest_first
+    assert (first["next_offset"], second["next_offset"], last["next_offset"]) == (2, 4, None)
+
+    # A page that holds exactly the remaining rows is the last one
+    assert search(client, headers, q="pay", limit=5)["next_offset"] is None
+    assert search(client, headers, q="pay", limit=4)["next_offset"] == 4
+
+
+def test_queries_shorter_than_a_trigram_are_rejected(client, register):
+    headers = register()
+    assert client.get("/api/search", params={"q": "pa"}, headers=headers).status_code == 422
+    assert client.get("/api/search", params={"q": "pay", "kind": "asset"}, headers=headers).status_code == 422
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_with_follower(flight: SingleFlight, fn):
+    """Call fn as leader while a second caller joins; returns both outcomes and the follower's waits."""
+    started, release = threading.Event(), threading.Event()
+    waited = []
+    outcomes = {}
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    def call(name, fn, before_wait=None):
+        try:
+            outcomes[name] = flight.do("key", fn, before_wait)
+        except Exception as error:
+            outcomes[name] = error
+
+    leader = threading.Thread(target=call, args=("leader", leader_fn))
+    leader.start()
+    started.wait(5)
+
+    def follower_fn():
+        raise AssertionError("the follower must not compute")
+
+    follower = threading.Thread(target=call, args=("follower", follower_fn, lambda: waited.append(True)))
+    follower.start()
+    while flight.stats()["coalesced"] < 1:
+        threading.Event().wait(0.01)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    return outcomes, waited
+
+
+def test_followers_share_the_leaders_result():
+    flight = SingleFlight()
+    outcomes, waited = run_with_follower(flight, lambda: {"total": 42})
+
+    assert outcomes["leader"] == {"total": 42}
+    assert outcomes["follower"] is outcomes["leader"]
+    # The follower released its resources before blocking
+    assert waited == [True]
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 1}
+
+
+def test_errors_propagate_to_every_caller():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    outcomes, _ = run_with_follower(flight, fail)
+    assert isinstance(outcomes["leader"], ValueError)
+    assert outcomes["follower"] is outcomes["leader"]
+
+    # The failed call is forgotten; the next caller computes again
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 1}
+
+
+def test_leaders_do_not_call_before_wait():
+    flight = SingleFlight()
+    with pytest.raises(KeyError):
+        flight.do("a", lambda: {}["missing"], before_wait=lambda: pytest.fail("leader waited"))
+    assert flight.do("b", lambda: "ok", before_wait=lambda: pytest.fail("leader waited")) == "ok"
+
+
+def test_identical_calendar_requests_are_computed_once(client, register, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    import main
+
+    build_calendar = main.build_calendar
+    builds = []
+
+    def slow_build_calendar(*args):
+        builds.append(args[-2:])
+        time.sleep(0.3)
+        return build_calendar(*args)
+
+    monkeypatch.setattr(main, "build_calendar", slow_build_calendar)
+    monkeypatch.setattr(main, "month_views", SingleFlight())
+    headers = register()
+    client.post("/api/incomes", json={"title": "pay", "amount": 100, "date": "2026-05-01"}, headers=headers)
+
+    with ThreadPoolExecutor(4) as pool:
+        responses = list(pool.map(
+            lambda _: client.get("/api/calendar?year=2026&month=5", headers=headers), range(4)
+        ))
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all(response.json() == responses[0].json() for response in responses)
+    assert builds == [(2026, 5)]
+    assert main.month_views.stats()["coalesced"] == 3
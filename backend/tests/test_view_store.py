@@ -0,0 +1,57 @@
+import threading
+import uuid
+
+from sqlmodel import Session
+
+from models import DataVersion, User
+from view_store import bump_data_version, get_data_versions
+
+
+def new_user(session: Session) -> int:
+    name = uuid.uuid4().hex
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x")
+    session.add(user)
+    session.commit()
+    return user.id
+
+
+def test_bumps_start_at_one_and_count_every_write(client):
+    from database import engine
+
+    with Session(engine) as session:
+        user_id = new_user(session)
+        assert get_data_versions(session, [user_id]) == {user_id: 0}
+        for _ in range(3):
+            bump_data_version(session, user_id)
+            session.commit()
+        assert get_data_versions(session, [user_id]) == {user_id: 3}
+
+
+def test_concurrent_first_writes_both_commit(pg_engine):
+    with Session(pg_engine) as session:
+        user_id = new_user(session)
+
+    first = Session(pg_engine)
+    bump_data_version(first, user_id)
+
+    # Blocks on the first session's uncommitted row, then updates it
+    errors = []
+
+    def second_write():
+        try:
+            with Session(pg_engine) as second:
+                bump_data_version(second, user_id)
+                second.commit()
+        except Exception as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=second_write)
+    thread.start()
+    thread.join(0.2)
+    first.commit()
+    first.close()
+    thread.join(5)
+
+    assert errors == []
+    with Session(pg_engine) as session:
+        assert session.get(DataVersion, user_id).version == 2
@@ -0,0 +1,95 @@
+"""
+Store of precomputed monthly views.
+
+Calendar and summary payloads are computed ahead of time by the scheduler
+and tagged with the user's data version. Every write bumps that version, so
+a stored view is only served while it still reflects the user's rows; stale
+entries are simply ignored until the next precompute run replaces them.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select, delete
+
+from cache import get_cache, user_views_prefix
+from models import DataVersion, MonthlyView
+
+VIEW_CALENDAR = "calendar"
+VIEW_SUMMARY = "summary"
+
+
+def bump_data_version(session: Session, user_id: int) -> None:
+    """
+    Mark the user's data as changed. Call before committing a write. Also
+    drops the user's cached views on every worker; they are keyed by data
+    version, so this only frees them early.
+    """
+    # One upsert, so two first writes of a user cannot both try to insert
+    session.exec(
+        conflict_insert(session, DataVersion)
+        .values(user_id=user_id, version=1)
+        .on_conflict_do_update(
+            index_elements=[DataVersion.user_id],
+            set_={"version": DataVersion.version + 1}
+        )
+    )
+    get_cache().invalidate(user_views_prefix(user_id))
+
+
+def ensure_data_version(session: Session, user_id: int) -> None:
+    """Create the user's data version row at 0 unless it exists, even if a first write races it."""
+    session.exec(
+        conflict_insert(session, DataVersion)
+        .values(user_id=user_id, version=0)
+        .on_conflict_do_nothing(index_elements=[DataVersion.user_id])
+    )
+
+
+def conflict_insert(session: Session, table):
+    """INSERT supporting ON CONFLICT on the session's database (PostgreSQL or SQLite)."""
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql_insert(table)
+    return sqlite_insert(table)
+
+
+def get_data_versions(session: Session, user_ids: Iterable[int]) -> dict[int, int]:
+    """Current data version for each user; users that never wrote are at 0."""
+    user_ids = list(user_ids)
+    statement = select(DataVersion).where(DataVersion.user_id.in_(user_ids))
+    versions = {row.user_id: row.version for row in session.exec(statement)}
+    return {user_id: versions.get(user_id, 0) for user_id in user_ids}
+
+
+def load_view(session: Session, user_id: int, view: str, year: int, month: int) -> Optional[dict]:
+    """Return the stored payload if it matches the user's current data, else None."""
+    statement = (
+        select(MonthlyView.payload)
+        .outerjoin(DataVersion, DataVersion.user_id == MonthlyView.user_id)
+        .where(
+            MonthlyView.user_id == user_id,
+            MonthlyView.view == view,
+            MonthlyView.year == year,
+            MonthlyView.month == month,
+            MonthlyView.data_version == func.coalesce(DataVersion.version, 0)
+        )
+    )
+    return session.exec(statement).first()
+
+
+def store_views(session: Session, views: list[MonthlyView]) -> None:
+    """Replace the stored payloads for the given (user, view, month) entries."""
+    keys = {(v.view, v.year, v.month) for v in views}
+    for view, year, month in keys:
+        user_ids = [v.user_id for v in views if (v.view, v.year, v.month) == (view, year, month)]
+        session.exec(
+            delete(MonthlyView).where(
+                MonthlyView.user_id.in_(user_ids),
+                MonthlyView.view == view,
+                MonthlyView.year == year,
+                MonthlyView.month == month
+            )
+        )
+    session.add_all(views)
@@ -1,5 +1,6 @@
 export * from './useAssets';
 export * from './useAuth';
 export * from './useCalendar';
+export * from './useEvents';
 export * from './useTransactions';
 
@@ -0,0 +1,93 @@
+import { useQueryClient } from '@tanstack/react-query';
+import { useEffect } from 'react';
+
+import { API_URL, api } from '@/lib/api';
+
+const QUERY_KEYS = {
+  incomes: ['incomes'],
+  expenses: ['expenses'],
+  savings: ['savings'],
+  assets: ['assets'],
+  calendar: ['calendar'],
+  budget: ['budget'],
+};
+
+// Event names sent by GET /api/events
+const EVENT_TYPES = [
+  ...['income', 'expense', 'asset', 'saving'].flatMap((kind) =>
+    ['created', 'updated', 'deleted'].map((action) => `${kind}.${action}`)
+  ),
+  'asset.reconciled',
+  'batch.applied',
+  'resync',
+];
+
+const RECONNECT_DELAY_MS = 3000;
+
+interface EventsToken {
+  token: string;
+  expires_in: number;
+}
+
+/**
+ * Refetch budget data when it changes elsewhere (another tab or device).
+ *
+ * EventSource cannot send the Authorization header, so every connection
+ * opens with a short-lived token from /api/events/token. The token is only
+ * valid for a minute, so after an error the stream is reopened with a new
+ * one instead of letting EventSource retry with the stale URL.
+ */
+export const useBudgetEvents = (enabled = true) => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    if (!enabled) return;
+
+    let source: EventSource | null = null;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+    let stopped = false;
+    let reconnecting = false;
+
+    const invalidateAll = () => {
+      Object.values(QUERY_KEYS).forEach((queryKey) => queryClient.invalidateQueries({ queryKey }));
+    };
+
+    const scheduleReconnect = () => {
+      if (stopped) return;
+      reconnecting = true;
+      reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+    };
+
+    const connect = async () => {
+      try {
+        const response = await api.post<EventsToken>('/api/events/token');
+        if (stopped) return;
+
+        source = new EventSource(
+          `${API_URL}/api/events?token=${encodeURIComponent(response.data.token)}`
+        );
+        source.onopen = () => {
+          // Changes made while disconnected were never delivered
+          if (reconnecting) invalidateAll();
+          reconnecting = false;
+        };
+        source.onerror = () => {
+          source?.close();
+          source = null;
+          scheduleReconnect();
+        };
+        EVENT_TYPES.forEach((type) => source?.addEventListener(type, invalidateAll));
+      } catch {
+        scheduleReconnect();
+      }
+    };
+
+    connect();
+
+    return () => {
+      stopped = true;
+      clearTimeout(reconnectTimer);
+      source?.close();
+    };
+  }, [enabled, queryClient]);
+};
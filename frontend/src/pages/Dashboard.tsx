@@ -29,7 +29,14 @@ import {
     TransactionTypeSelector,
     UpcomingTransactions,
 } from '@/components';
-import { useBudgetSummary, useCalendar, useCreateSaving, useCurrentUser, useLogout } from '@/hooks';
+import {
+    useBudgetEvents,
+    useBudgetSummary,
+    useCalendar,
+    useCreateSaving,
+    useCurrentUser,
+    useLogout,
+} from '@/hooks';
 import { RecurrenceType } from '@/types';
 
 interface DroppedAsset {
@@ -66,6 +73,7 @@ const Dashboard: React.FC = () => {
   const { data: budgetSummary } = useBudgetSummary(year, month);
   const { data: calendar } = useCalendar(year, month);
   const createSaving = useCreateSaving();
+  useBudgetEvents();
 
   useEffect(() => {
     const handleEsc = (e: KeyboardEvent) => {